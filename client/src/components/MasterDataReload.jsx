@@ -1,12 +1,12 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { reloadTechnicalData, reloadFundamentalData, getMasterDataStats } from '../services/api';
+import { reloadTechnicalData, reloadFundamentalData, getMasterDataStats, subscribeReloadProgress } from '../services/api';
 
 function MasterDataReload() {
     const [stats, setStats] = useState(null);
     const [loading, setLoading] = useState({ technical: false, fundamental: false });
     const [progress, setProgress] = useState({ technical: null, fundamental: null });
     const [showPanel, setShowPanel] = useState(false);
-    const pollingIntervalRef = useRef(null);
+    const wasRunningRef = useRef({ technical: false, fundamental: false });
 
     const fetchStats = async () => {
         try {
@@ -17,39 +17,14 @@ function MasterDataReload() {
         }
     };
 
-    const fetchProgress = async () => {
-        try {
-            const response = await fetch('http://localhost:8000/v1/master-data/reload/progress');
-            const data = await response.json();
-            setProgress({
-                technical: data.technical,
-                fundamental: data.fundamental
-            });
-
-            // If both are not running, stop polling and refresh stats
-            if (!data.technical.is_running && !data.fundamental.is_running) {
-                if (pollingIntervalRef.current) {
-                    clearInterval(pollingIntervalRef.current);
-                    pollingIntervalRef.current = null;
-                    fetchStats(); // Refresh stats after completion
-                }
-            }
-        } catch (error) {
-            console.error('Error fetching progress:', error);
-        }
-    };
-
-    const startPolling = () => {
-        if (!pollingIntervalRef.current) {
-            pollingIntervalRef.current = setInterval(fetchProgress, 2000); // Poll every 2 seconds
-        }
-    };
+    const handleProgress = (data) => {
+        setProgress((prev) => ({ ...prev, [data.dataset]: data }));
 
-    const stopPolling = () => {
-        if (pollingIntervalRef.current) {
-            clearInterval(pollingIntervalRef.current);
-            pollingIntervalRef.current = null;
+        // Refresh stats when a reload finishes
+        if (wasRunningRef.current[data.dataset] && !data.is_running) {
+            fetchStats();
         }
+        wasRunningRef.current[data.dataset] = data.is_running;
     };
 
     const handleReloadTechnical = async () => {
@@ -62,7 +37,6 @@ function MasterDataReload() {
                 alert('Technical data reload already in progress!');
             } else {
                 alert(`Technical data reload started! Estimated time: ${response.estimated_time_minutes} minutes`);
-                startPolling(); // Start polling for progress
             }
         } catch (error) {
             alert(`Error: ${error.message}`);
@@ -81,7 +55,6 @@ function MasterDataReload() {
                 alert('Fundamental data reload already in progress!');
             } else {
                 alert(`Fundamental data reload started! Estimated time: ${response.estimated_time_minutes} minutes`);
-                startPolling(); // Start polling for progress
             }
         } catch (error) {
             alert(`Error: ${error.message}`);
@@ -91,16 +64,18 @@ function MasterDataReload() {
     };
 
     useEffect(() => {
-        if (showPanel) {
-            fetchStats();
-            fetchProgress(); // Initial progress check
-        }
-    }, [showPanel]);
+        if (!showPanel) return;
 
-    useEffect(() => {
-        // Cleanup on unmount
-        return () => stopPolling();
-    }, []);
+        fetchStats();
+
+        // Server pushes current state on connect, then every progress change
+        const unsubscribe = subscribeReloadProgress(handleProgress, (error) => {
+            console.error('Progress stream error:', error);
+        });
+
+        // Close stream when panel is hidden or on unmount
+        return () => unsubscribe();
+    }, [showPanel]);
 
     const renderProgressBar = (progressData) => {
         if (!progressData || !progressData.is_running) return null;
@@ -124,6 +99,9 @@ function MasterDataReload() {
                 <div className="flex justify-between text-xs text-slate-500 dark:text-slate-500 mt-1">
                     <span>✓ {progressData.successful} successful</span>
                     <span>✗ {progressData.failed} failed</span>
+                    {progressData.eta_seconds != null && (
+                        <span>ETA {Math.ceil(progressData.eta_seconds / 60)} min</span>
+                    )}
                 </div>
             </div>
         );
@@ -237,7 +215,7 @@ function MasterDataReload() {
                                     <p className="font-medium mb-1">About Reload:</p>
                                     <ul className="list-disc list-inside space-y-1">
                                         <li>Fetches latest data from yfinance</li>
-                                        <li>Progress updates every 2 seconds</li>
+                                        <li>Live progress updates</li>
                                         <li>Runs in background</li>
                                         <li>Anti-rate-limiting enabled</li>
                                     </ul>
@@ -12,12 +12,6 @@ const InputSection = ({ onAnalyze, isLoading }) => {
             return;
         }
 
-        // Validate file size (max 10MB)
-        if (file.size > 10 * 1024 * 1024) {
-            alert('Ukuran file terlalu besar. Maksimal 10MB');
-            return;
-        }
-
         setSelectedFile(file);
     };
 
@@ -136,7 +130,7 @@ const InputSection = ({ onAnalyze, isLoading }) => {
                                 </p>
                                 <div className="flex items-center gap-2 text-xs text-slate-400 dark:text-slate-500">
                                     <span className="material-symbols-outlined text-[16px]">info</span>
-                                    <span>Supported format: .json (max 10MB)</span>
+                                    <span>Supported format: .json</span>
                                 </div>
                             </>
                         )}
@@ -200,7 +200,7 @@ export const getMasterDataStats = async () => {
     return response.json();
 };
 
-export const reloadTechnicalData = async (batchSize = 300, delay = 30, maxWorkers = 5) => {
+export const reloadTechnicalData = async (batchSize = 300, delay = 0, maxWorkers = 5) => {
     const response = await fetch(
         `${API_BASE_URL}/v1/master-data/reload/technical?batch_size=${batchSize}&delay=${delay}&max_workers=${maxWorkers}`,
         {
@@ -219,7 +219,7 @@ export const reloadTechnicalData = async (batchSize = 300, delay = 30, maxWorker
     return response.json();
 };
 
-export const reloadFundamentalData = async (batchSize = 300, delay = 30, maxWorkers = 5) => {
+export const reloadFundamentalData = async (batchSize = 300, delay = 0, maxWorkers = 5) => {
     const response = await fetch(
         `${API_BASE_URL}/v1/master-data/reload/fundamental?batch_size=${batchSize}&delay=${delay}&max_workers=${maxWorkers}`,
         {
@@ -236,4 +236,18 @@ export const reloadFundamentalData = async (batchSize = 300, delay = 30, maxWork
     }
 
     return response.json();
-};
\ No newline at end of file
+};
+// Live reload progress via Server-Sent Events; returns a function that closes the stream
+export const subscribeReloadProgress = (onProgress, onError) => {
+    const source = new EventSource(`${API_BASE_URL}/v1/master-data/reload/stream`);
+
+    source.addEventListener('progress', (event) => {
+        onProgress(JSON.parse(event.data));
+    });
+
+    if (onError) {
+        source.onerror = onError;
+    }
+
+    return () => source.close();
+};
@@ -0,0 +1,255 @@
+"""
+Benchmark: Row-Rescan vs Transaction-Table Accumulation Detection
+Runs detect_accumulation on synthetic broker summary uploads
+(brokers x days x stocks) and checks both implementations return identical results.
+Broker names of the summary built from the same table are checked against the
+previous per-group rule (response broker_name, else get_broker_name()).
+The table build is timed separately (uploads share it with the broker summary).
+"""
+
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Add server directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.service_stock.accumulation import detector
+from api.service_stock.accumulation.detector import detect_accumulation
+from api.service_stock.broker_summary import broker_summary
+from api.service_stock.broker_summary.broker_summary import get_broker_name, summarize_transaction_table
+from api.service_stock.broker_summary.transactions import build_transaction_table
+
+# Synthetic stock codes have no master data or prices; keep lookups out of the timing
+detector.get_sector = lambda stock_code: None
+detector.get_stock_fundamental_data = lambda stock_code: None
+broker_summary.enrich_stocks_with_prices = lambda stocks: stocks
+
+# Rescan implementation is O(stocks x rows) per transaction; larger uploads only with --full
+REFERENCE_MAX_ROWS = 300_000
+
+
+def detect_accumulation_rescan(broker_data_list: List[Dict]) -> Dict[str, Any]:
+    """Previous detector: rescans buy_data/sell_data for every stock of a transaction"""
+    broker_transactions = defaultdict(list)
+
+    for entry in broker_data_list:
+        broker_code = entry.get('broker', 'UNKNOWN')
+        broker_summary = entry.get('response', {}).get('data', {}).get('broker_summary', {})
+        if not broker_summary:
+            continue
+
+        stocks_in_transaction = []
+        for row in broker_summary.get('brokers_buy', []) + broker_summary.get('brokers_sell', []):
+            stock_code = row.get('netbs_stock_code')
+            if stock_code and stock_code not in stocks_in_transaction:
+                stocks_in_transaction.append(stock_code)
+
+        if stocks_in_transaction:
+            broker_transactions[broker_code].append({
+                'date': entry.get('periode', {}).get('from', 'unknown'),
+                'stocks': stocks_in_transaction,
+                'buy_data': broker_summary.get('brokers_buy', []),
+                'sell_data': broker_summary.get('brokers_sell', [])
+            })
+
+    results = {'total_brokers': len(broker_transactions), 'brokers': {}}
+
+    for broker_code, transactions in broker_transactions.items():
+        total_transactions = len(transactions)
+        stock_appearances = defaultdict(lambda: {
+            'count': 0, 'dates': [],
+            'buy_volumes': [], 'sell_volumes': [], 'buy_values': [], 'sell_values': []
+        })
+
+        for transaction in transactions:
+            for stock_code in transaction['stocks']:
+                stock_appearances[stock_code]['count'] += 1
+                stock_appearances[stock_code]['dates'].append(transaction['date'])
+
+                for buy_entry in transaction['buy_data']:
+                    if buy_entry.get('netbs_stock_code') == stock_code:
+                        try:
+                            volume = float(buy_entry.get('blot', 0))
+                            value = float(buy_entry.get('bval', 0))
+                            stock_appearances[stock_code]['buy_volumes'].append(volume)
+                            stock_appearances[stock_code]['buy_values'].append(value)
+                        except (ValueError, TypeError):
+                            pass
+
+                for sell_entry in transaction['sell_data']:
+                    if sell_entry.get('netbs_stock_code') == stock_code:
+                        try:
+                            volume = float(sell_entry.get('slot', 0))
+                            value = float(sell_entry.get('sval', 0))
+                            stock_appearances[stock_code]['sell_volumes'].append(volume)
+                            stock_appearances[stock_code]['sell_values'].append(value)
+                        except (ValueError, TypeError):
+                            pass
+
+        accumulating_stocks = []
+        for stock_code, data in stock_appearances.items():
+            appearance_rate = (data['count'] / total_transactions) * 100
+            if appearance_rate != 100.0:
+                continue
+
+            total_buy_volume = sum(data['buy_volumes'])
+            total_sell_volume = sum(data['sell_volumes'])
+            total_buy_value = sum(data['buy_values'])
+            total_sell_value = sum(data['sell_values'])
+            total_volume = total_buy_volume + total_sell_volume
+            total_value = total_buy_value + total_sell_value
+
+            accumulating_stocks.append({
+                'stock_code': stock_code,
+                'sector': 'Unknown',
+                'industry': 'Unknown',
+                'appearances': data['count'],
+                'appearance_rate': appearance_rate,
+                'total_transactions': total_transactions,
+                'buy_volume': int(total_buy_volume),
+                'sell_volume': int(total_sell_volume),
+                'net_volume': int(total_buy_volume - total_sell_volume),
+                'buy_value': int(total_buy_value),
+                'sell_value': int(total_sell_value),
+                'net_value': int(total_buy_value - total_sell_value),
+                'avg_price': round((total_value / total_volume) if total_volume > 0 else 0, 2),
+                'first_seen': min(data['dates']),
+                'last_seen': max(data['dates']),
+                'transaction_dates': sorted(list(set(data['dates'])))
+            })
+
+        accumulating_stocks.sort(key=lambda x: abs(x['net_volume']), reverse=True)
+
+        results['brokers'][broker_code] = {
+            'broker_code': broker_code,
+            'total_transactions': total_transactions,
+            'total_stocks_analyzed': len(stock_appearances),
+            'accumulating_stocks_count': len(accumulating_stocks),
+            'accumulating_stocks': accumulating_stocks
+        }
+
+    return results
+
+
+def make_upload(n_brokers: int, n_days: int, n_stocks: int, seed: int = 42) -> List[Dict]:
+    """
+    Stockbit XHR entries: one page per broker and day, each stock bought or sold.
+    Even brokers carry a broker_name in the response, odd ones leave it out.
+    """
+    rng = np.random.default_rng(seed)
+    codes = [f"S{i:03d}" for i in range(n_stocks)]
+    start = date(2025, 1, 1)
+
+    entries = []
+    for b in range(n_brokers):
+        # A core set every broker trades daily (accumulation candidates), the rest at random
+        core = set(rng.choice(n_stocks, size=max(1, n_stocks // 20), replace=False).tolist())
+
+        for d in range(n_days):
+            day = (start + timedelta(days=d)).isoformat()
+            traded = rng.random(n_stocks) < 0.8
+            buy_side = rng.random(n_stocks) < 0.5
+            lots = rng.integers(1, 50_000, n_stocks)
+            prices = rng.integers(50, 10_000, n_stocks)
+
+            buys, sells = [], []
+            for i, code in enumerate(codes):
+                if not (traded[i] or i in core):
+                    continue
+                lot, value = str(lots[i]), str(lots[i] * 100 * prices[i])
+                if buy_side[i]:
+                    buys.append({'netbs_stock_code': code, 'blot': lot, 'bval': value})
+                else:
+                    sells.append({'netbs_stock_code': code, 'slot': lot, 'sval': value})
+
+            data = {'broker_summary': {'brokers_buy': buys, 'brokers_sell': sells}}
+            if b % 2 == 0:
+                data['broker_name'] = f"Sekuritas B{b:02d}"
+            entries.append({
+                'broker': f"B{b:02d}",
+                'periode': {'from': day, 'to': day},
+                'response': {'data': data}
+            })
+
+    return entries
+
+
+def strip(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Comparable part of a result (last_updated differs, ties in the sort may be ordered differently)"""
+    return {
+        'total_brokers': result['total_brokers'],
+        'brokers': {
+            code: {
+                **broker,
+                'accumulating_stocks': sorted(broker['accumulating_stocks'], key=lambda s: s['stock_code'])
+            }
+            for code, broker in result['brokers'].items()
+        }
+    }
+
+
+def check_broker_names(entries: List[Dict], table) -> None:
+    """Summary broker names match the first page of each group, like process_grouped_entries() did"""
+    expected = {}
+    for entry in entries:
+        key = (entry['broker'], entry['periode']['from'], entry['periode']['to'])
+        response_data = entry['response']['data']
+        expected.setdefault(key, response_data.get('broker_name', get_broker_name(entry['broker'])))
+
+    for summary in summarize_transaction_table(table)['broker_summaries']:
+        info = summary['broker_info']
+        key = (info['broker_code'], info['date_start'], info['date_end'])
+        assert info['broker_name'] == expected[key], f"{key}: broker_name {info['broker_name']!r}"
+
+
+def time_it(fn, *args, repeat: int = 3) -> tuple:
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(full: bool = False):
+    print("=" * 80)
+    print("BENCHMARK: detect_accumulation (brokers x days x stocks)")
+    print("=" * 80)
+
+    for n_brokers, n_days, n_stocks in ((5, 20, 50), (10, 60, 100), (20, 60, 300), (100, 60, 300)):
+        entries = make_upload(n_brokers, n_days, n_stocks)
+        rows = sum(
+            len(e['response']['data']['broker_summary']['brokers_buy'])
+            + len(e['response']['data']['broker_summary']['brokers_sell'])
+            for e in entries
+        )
+
+        build_time, table = time_it(build_transaction_table, entries)
+        group_time, table_result = time_it(detect_accumulation, table)
+        table_time = build_time + group_time
+        label = f"{n_brokers:>3} x {n_days} x {n_stocks:>3} ({rows:>9,} rows)"
+        timings = f"table: {build_time * 1000:7.1f} + {group_time * 1000:7.1f} ms"
+
+        if rows > REFERENCE_MAX_ROWS and not full:
+            print(f"{label} | rescan: {'skipped':>10} | {timings}")
+            continue
+
+        check_broker_names(entries, table)
+        rescan_time, rescan_result = time_it(detect_accumulation_rescan, entries, repeat=1)
+        assert strip(table_result) == strip(rescan_result), "Table result differs from rescan"
+
+        print(
+            f"{label} | rescan: {rescan_time * 1000:8.1f} ms | {timings}"
+            f" | speedup: {rescan_time / table_time:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark(full='--full' in sys.argv)
@@ -0,0 +1,156 @@
+"""
+Benchmark: Default FastAPI JSON Rendering vs FastJSONResponse
+Renders synthetic payloads shaped like the largest responses
+(/v1/accumulation/stocks, /v1/stock/broker-summary/upload, /v1/{symbol}/get-news)
+through FastAPI's default path (jsonable_encoder + JSONResponse) and through
+FastJSONResponse, and reports bytes on the wire with and without gzip.
+"""
+
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Add server directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.helper import fast_json
+from api.helper.fast_json import FastJSONResponse
+from api.service_stock.broker_summary import broker_summary
+from api.service_stock.broker_summary.broker_summary import summarize_transaction_table
+from api.service_stock.broker_summary.transactions import build_transaction_table
+from benchmark_accumulation import make_upload
+
+# Synthetic stock codes have no prices; keep lookups out of the payload build
+broker_summary.enrich_stocks_with_prices = lambda stocks: stocks
+
+# Same level as the GZipMiddleware in main.py
+GZIP_LEVEL = 6
+
+
+def accumulation_payload(n_stocks: int, n_days: int, seed: int = 42) -> Dict[str, Any]:
+    """/v1/accumulation/stocks: flattened accumulating stocks with transaction_dates"""
+    rng = random.Random(seed)
+    dates = [(date(2025, 1, 1) + timedelta(days=i)).isoformat() for i in range(n_days)]
+    stocks = []
+    for i in range(n_stocks):
+        buy_volume, sell_volume = rng.randint(1, 10**6), rng.randint(1, 10**6)
+        buy_value, sell_value = buy_volume * rng.randint(50, 9000), sell_volume * rng.randint(50, 9000)
+        stocks.append({
+            'stock_code': f"S{i % 900:03d}",
+            'sector': 'Financials',
+            'industry': 'Banks',
+            'appearances': n_days,
+            'appearance_rate': 100.0,
+            'total_transactions': n_days,
+            'buy_volume': buy_volume,
+            'sell_volume': sell_volume,
+            'net_volume': buy_volume - sell_volume,
+            'buy_value': buy_value,
+            'sell_value': sell_value,
+            'net_value': buy_value - sell_value,
+            'avg_price': round((buy_value + sell_value) / (buy_volume + sell_volume), 2),
+            'first_seen': dates[0],
+            'last_seen': dates[-1],
+            'transaction_dates': dates,
+            'broker_code': f"B{i % 40:02d}"
+        })
+    return {
+        "message": "Accumulating stocks retrieved successfully",
+        "total_stocks": len(stocks),
+        "stocks": stocks,
+        "status_code": 200
+    }
+
+
+def upload_payload(n_brokers: int, n_days: int, n_stocks: int) -> Dict[str, Any]:
+    """/v1/stock/broker-summary/upload: the parse_xhr_response result"""
+    result = summarize_transaction_table(build_transaction_table(make_upload(n_brokers, n_days, n_stocks)))
+    return {"message": "File broker summary berhasil diproses", "data": result, "status_code": 200}
+
+
+def news_payload(n_items: int, paragraphs: int, seed: int = 42) -> Dict[str, Any]:
+    """/v1/{symbol}/get-news: news items with the TradingView detail tree and full_content"""
+    rng = random.Random(seed)
+    words = "gold price fed rate dollar inflation yield demand supply market traders said".split()
+
+    def sentence() -> str:
+        return " ".join(rng.choice(words) for _ in range(20)).capitalize() + "."
+
+    items = []
+    for i in range(n_items):
+        texts = [" ".join(sentence() for _ in range(4)) for _ in range(paragraphs)]
+        items.append({
+            'id': f"tag:reuters.com,2025:newsml_L{i:08d}:0",
+            'title': sentence(),
+            'provider': 'reuters',
+            'published': 1735689600 + i * 600,
+            'relatedSymbols': [{'symbol': 'OANDA:XAUUSD'}, {'symbol': 'TVC:DXY'}],
+            'full_content': "\n\n".join(texts),
+            'detail': {
+                'shortDescription': texts[0][:200],
+                'astDescription': {
+                    'type': 'root',
+                    'children': [{'type': 'p', 'children': [text]} for text in texts]
+                }
+            }
+        })
+    return {"message": "Daftar berita berhasil diambil", "total_items": len(items), "data": items, "status_code": 200}
+
+
+def render_default(content: Any) -> bytes:
+    """FastAPI without a response class: jsonable_encoder, then json.dumps"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def render_fast(content: Any) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def time_it(fn, *args, repeat: int = 5) -> tuple:
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark():
+    print("=" * 80)
+    print("BENCHMARK: response rendering (default FastAPI vs FastJSONResponse)")
+    print(f"JSON backend: {'orjson' if fast_json.orjson is not None else 'json (orjson not installed)'}")
+    print("=" * 80)
+
+    payloads = [
+        ("accumulation/stocks 2000 x 60d", accumulation_payload(2000, 60)),
+        ("broker-summary/upload 20x20x300", upload_payload(20, 20, 300)),
+        ("get-news 50 items", news_payload(50, 12)),
+    ]
+
+    for label, content in payloads:
+        default_time, default_body = time_it(render_default, content)
+        fast_time, fast_body = time_it(render_fast, content)
+        assert json.loads(default_body) == json.loads(fast_body), f"{label}: rendered payloads differ"
+
+        gzip_time, compressed = time_it(gzip.compress, fast_body, GZIP_LEVEL)
+        print(
+            f"{label:<34} | default: {default_time * 1000:8.1f} ms | fast: {fast_time * 1000:7.1f} ms "
+            f"({default_time / fast_time:4.1f}x)"
+        )
+        print(
+            f"{'':<34} | bytes: {len(default_body) / 1024:8.0f} KB -> {len(fast_body) / 1024:6.0f} KB "
+            f"| gzip: {len(compressed) / 1024:6.0f} KB in {gzip_time * 1000:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,134 @@
+"""
+Benchmark: Per-Stock Loop vs Vectorized Panel Engine
+Runs calculate_advanced_technical's indicator math on a synthetic universe
+and checks both implementations return identical results.
+Incremental indicator states seeded from the same bars are checked against
+the batch technical and quant results.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add server directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.service_stock.technical_analyze import analyze_technical_history, analyze_technical_per_stock
+from api.service_stock.quant_technical import analyze_quant_history
+from api.service_stock.indicators import compute_technical_panel
+from api.service_stock.indicators.state import IndicatorState
+from api.service_stock.master_data.ohlcv_store import BAR_DTYPE
+
+
+def make_universe(n_stocks: int, n_bars: int = 250, seed: int = 42) -> pd.DataFrame:
+    """Random-walk OHLCV bars in yf.download(group_by='ticker') layout"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars)
+
+    frames = {}
+    for i in range(n_stocks):
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+        open_price = close * (1 + rng.normal(0, 0.01, n_bars))
+        high = np.maximum(open_price, close) * (1 + np.abs(rng.normal(0, 0.01, n_bars)))
+        low = np.minimum(open_price, close) * (1 - np.abs(rng.normal(0, 0.01, n_bars)))
+        volume = rng.integers(10_000, 5_000_000, n_bars).astype(float)
+
+        df = pd.DataFrame(
+            {'Open': open_price, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+            index=index
+        )
+        # Some stocks are suspended or newly listed
+        if i % 50 == 0:
+            df.iloc[: rng.integers(1, n_bars - 30)] = np.nan
+        frames[f"S{i:03d}.JK"] = df
+
+    return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+
+
+def with_gaps(data: pd.DataFrame, seed: int = 7) -> pd.DataFrame:
+    """Copy with a few missing High/Volume/Open values (partial yfinance rows, kept in the bar store)"""
+    rng = np.random.default_rng(seed)
+    data = data.copy()
+    tickers = data.columns.get_level_values(0).unique()
+    for i, ticker in enumerate(tickers[::7]):
+        rows = rng.choice(len(data), size=3, replace=False)
+        data.loc[data.index[rows], (ticker, ['High', 'Volume', 'Open'][i % 3])] = np.nan
+    return data
+
+
+def stored_bars(df: pd.DataFrame) -> np.ndarray:
+    """Single-ticker frame as OHLCV store bars (rows without a close are never stored)"""
+    df = df.dropna(subset=['Close'])
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars['date'] = df.index.values.astype('datetime64[D]')
+    for field in ('open', 'high', 'low', 'close', 'volume'):
+        bars[field] = df[field.capitalize()].to_numpy(dtype=float)
+    return bars
+
+
+def snapshots(states: dict, read) -> list:
+    results = []
+    for stock, state in states.items():
+        result = read(state, stock)
+        if result:
+            results.append(result)
+    return results
+
+
+def time_it(fn, *args, repeat: int = 3) -> tuple:
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark():
+    print("=" * 80)
+    print("BENCHMARK: calculate_advanced_technical indicator engine")
+    print("=" * 80)
+
+    for n_stocks in (1, 10, 100, 900):
+        data = make_universe(n_stocks)
+        stocks = [f"S{i:03d}" for i in range(n_stocks)]
+
+        loop_time, loop_result = time_it(analyze_technical_per_stock, data, stocks)
+        panel_time, panel_result = time_it(compute_technical_panel, data, stocks)
+
+        assert loop_result == panel_result, "Panel engine result differs from per-stock loop"
+
+        print(
+            f"{n_stocks:>4} stocks | per-stock loop: {loop_time * 1000:9.1f} ms"
+            f" | panel: {panel_time * 1000:7.1f} ms | speedup: {loop_time / panel_time:6.1f}x"
+        )
+
+    print("-" * 80)
+    print("Incremental indicator state vs batch (technical + quant)")
+    for n_stocks in (10, 100, 900):
+        data = with_gaps(make_universe(n_stocks))
+        stocks = [f"S{i:03d}" for i in range(n_stocks)]
+        states = {stock: IndicatorState.from_bars(stored_bars(data[f"{stock}.JK"])) for stock in stocks}
+
+        batch_time, (technical, quant) = time_it(
+            lambda: (analyze_technical_history(data, stocks), analyze_quant_history(data, stocks))
+        )
+        state_time, (state_technical, state_quant) = time_it(
+            lambda: (snapshots(states, IndicatorState.technical), snapshots(states, IndicatorState.quant))
+        )
+
+        assert technical == state_technical, "Incremental technical result differs from batch"
+        assert quant == state_quant, "Incremental quant result differs from batch"
+
+        print(
+            f"{n_stocks:>4} stocks | batch: {batch_time * 1000:9.1f} ms"
+            f" | from state: {state_time * 1000:7.1f} ms | speedup: {batch_time / state_time:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,186 @@
+"""
+Execution Layer for Blocking Work
+Runs blocking providers (yfinance, feedparser, file parsing) and CPU-bound
+indicator math outside the asyncio event loop, with per-endpoint concurrency limits
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+
+# Thread pool for I/O-bound providers (yfinance, RSS, JSON files)
+IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", "16"))
+
+# Process pool for CPU-bound indicator math (0 = run CPU work on the I/O pool)
+CPU_MAX_WORKERS = int(os.getenv("CPU_MAX_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+# Max concurrent executions per endpoint (override with ENDPOINT_LIMIT_<NAME>)
+DEFAULT_ENDPOINT_LIMITS = {
+    "broker_analyze": 4,
+    "technical": 4,
+    "quant": 4,
+    "fundamental": 4,
+    "news": 4,
+    "broker_upload": 2,
+}
+
+
+class EndpointLimiter:
+    """
+    Bounded concurrency for a single endpoint with queue-depth metrics.
+    Only touched from the event loop thread, so counters need no lock.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for a free slot, then hold it for the duration of the block"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.queued += 1
+        if self._semaphore.locked():
+            self.max_queued = max(self.max_queued, self.queued)
+        wait_start = time.perf_counter()
+
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        run_start = time.perf_counter()
+        self.total_wait_ms += (run_start - wait_start) * 1000
+
+        try:
+            yield
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+        finally:
+            self.total_run_ms += (time.perf_counter() - run_start) * 1000
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        finished = self.completed + self.failed
+
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queued,
+            'max_queue_depth': self.max_queued,
+            'completed': self.completed,
+            'failed': self.failed,
+            'avg_wait_ms': round(self.total_wait_ms / finished, 2) if finished else 0,
+            'avg_run_ms': round(self.total_run_ms / finished, 2) if finished else 0
+        }
+
+
+class ExecutionLayer:
+    """
+    Thread pool for I/O-bound work, process pool for CPU-bound work,
+    and one EndpointLimiter per heavy endpoint
+    """
+
+    def __init__(
+        self,
+        io_workers: int = IO_MAX_WORKERS,
+        cpu_workers: int = CPU_MAX_WORKERS,
+        endpoint_limits: Optional[Dict[str, int]] = None
+    ):
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = max(0, cpu_workers)
+        self.io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="io-worker")
+        self._cpu_pool: Optional[ProcessPoolExecutor] = None
+
+        limits = dict(DEFAULT_ENDPOINT_LIMITS)
+        limits.update(endpoint_limits or {})
+        self.limiters: Dict[str, EndpointLimiter] = {
+            name: EndpointLimiter(name, int(os.getenv(f"ENDPOINT_LIMIT_{name.upper()}", limit)))
+            for name, limit in limits.items()
+        }
+
+    def _get_cpu_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Create process pool lazily so importing the app stays cheap"""
+        if self.cpu_workers == 0:
+            return None
+        if self._cpu_pool is None:
+            self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+        return self._cpu_pool
+
+    def limit(self, endpoint: str):
+        """Concurrency slot for an endpoint (unknown endpoints get a default limiter)"""
+        if endpoint not in self.limiters:
+            self.limiters[endpoint] = EndpointLimiter(endpoint, 4)
+        return self.limiters[endpoint].slot()
+
+    async def run_io(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run blocking I/O-bound function on the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_pool, partial(fn, *args, **kwargs))
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run CPU-bound function on the process pool.
+        fn and its arguments must be picklable (module-level functions, DataFrames).
+        Falls back to the thread pool if the process pool is disabled or broken.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_cpu_pool()
+
+        if pool is None:
+            return await self.run_io(fn, *args, **kwargs)
+
+        try:
+            return await loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+        except BrokenProcessPool:
+            print("Process pool broken, recreating and falling back to thread pool")
+            self._cpu_pool = None
+            return await self.run_io(fn, *args, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool and per-endpoint statistics"""
+        return {
+            'io_pool': {
+                'max_workers': self.io_workers,
+                'queue_depth': self.io_pool._work_queue.qsize()
+            },
+            'cpu_pool': {
+                'max_workers': self.cpu_workers,
+                'started': self._cpu_pool is not None
+            },
+            'endpoints': {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+        }
+
+    def shutdown(self):
+        """Shutdown pools (called on app shutdown)"""
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+            self._cpu_pool = None
+
+
+# Global execution layer instance
+execution = ExecutionLayer()
@@ -0,0 +1,70 @@
+"""
+Fast JSON
+orjson when installed (parses bytes directly, several times faster than the
+standard library), json otherwise. Decode errors are json.JSONDecodeError either way.
+
+FastJSONResponse renders with the same backend; endpoints with large payloads
+return it directly so FastAPI skips its jsonable_encoder pass.
+"""
+
+import dataclasses
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Union
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # numpy arrays/scalars natively; non-str dict keys (e.g. int ids) as strings
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """Types neither backend serializes on its own"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Parse a JSON document from bytes or text"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON. NaN/inf become null with orjson (the standard json
+    fallback writes them as NaN/Infinity like before).
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps()"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
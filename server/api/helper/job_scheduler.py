@@ -0,0 +1,458 @@
+"""
+Background Job Scheduler
+Bounded worker pool for long-running work (master data reloads, upload
+post-processing, cache warmers) with job IDs, priorities, cancel/pause,
+throughput-based ETA and persisted job history
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from api.helper.rate_limiter import yf_limiter
+
+
+# Concurrent background jobs (jobs beyond this wait in the priority queue)
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+
+# Finished jobs kept in history
+MAX_HISTORY = 200
+
+HISTORY_FILE = Path(__file__).parent.parent / "data" / "job_history.json"
+
+# Lower value runs first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+ACTIVE_STATUSES = ('queued', 'running', 'paused')
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next progress report after cancel()"""
+
+
+class Job:
+    """
+    One unit of background work.
+
+    The job function receives the Job as first argument and reports through
+    report_progress(), which has the same signature as the master data
+    progress_callback. Pause and cancel take effect at the next report.
+    """
+
+    def __init__(self, kind: str, fn: Callable, args: tuple, kwargs: dict,
+                 name: Optional[str] = None, priority: int = PRIORITY_NORMAL,
+                 resources: Tuple[str, ...] = ()):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.name = name or kind
+        self.priority = priority
+        self.resources = tuple(resources)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+        self.status = 'queued'
+        self.progress_status = 'queued'
+        self.current = 0
+        self.total = 0
+        self.successful = 0
+        self.failed = 0
+        self.skipped = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.completed_at: Optional[str] = None
+
+        self._run_started: Optional[float] = None
+        self._run_ended: Optional[float] = None
+        self._paused_since: Optional[float] = None
+        self._paused_seconds = 0.0
+        self._throttled_at_start = 0
+        self.rate_limited = 0
+
+        self._cancel = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+
+        # Set by the scheduler: called after every progress report or status change
+        self.on_change: Optional[Callable[['Job'], None]] = None
+
+    def notify(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    # ---------- Called from the job thread ----------
+
+    def report_progress(self, current: int, total: int, status: str,
+                        successful: int = 0, failed: int = 0, skipped: int = 0):
+        """Progress callback for job functions; blocks while paused, raises JobCancelled"""
+        self.current = current
+        self.total = total
+        self.progress_status = status
+        self.successful = successful
+        self.failed = failed
+        self.skipped = skipped
+        self.rate_limited = yf_limiter.throttled - self._throttled_at_start
+        self.notify()
+
+        if status != 'complete':
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Cooperative pause/cancel point"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+        if not self._resume.is_set():
+            self.status = 'paused'
+            self._paused_since = time.monotonic()
+            self.notify()
+            while not self._resume.wait(timeout=1.0):
+                if self._cancel.is_set():
+                    break
+            self._paused_seconds += time.monotonic() - self._paused_since
+            self._paused_since = None
+
+            if self._cancel.is_set():
+                raise JobCancelled()
+            self.status = 'running'
+            self.notify()
+
+    # ---------- Metrics ----------
+
+    def active_seconds(self) -> float:
+        """Running time excluding pauses"""
+        if self._run_started is None:
+            return 0.0
+        end = self._run_ended or time.monotonic()
+        paused = self._paused_seconds
+        if self._paused_since is not None:
+            paused += end - self._paused_since
+        return max(0.0, end - self._run_started - paused)
+
+    def throughput(self) -> float:
+        """Processed items per second of active time"""
+        seconds = self.active_seconds()
+        return self.current / seconds if seconds > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time from observed throughput (None until something was processed)"""
+        if self.status not in ('running', 'paused'):
+            return None
+        rate = self.throughput()
+        if rate <= 0 or self.total <= 0:
+            return None
+        return round(max(0, self.total - self.current) / rate, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'name': self.name,
+            'priority': self.priority,
+            'resources': list(self.resources),
+            'status': self.status,
+            'progress_status': self.progress_status,
+            'current': self.current,
+            'total': self.total,
+            'successful': self.successful,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'throughput_per_sec': round(self.throughput(), 3),
+            'eta_seconds': self.eta_seconds(),
+            'elapsed_seconds': round(self.active_seconds(), 1),
+            'rate_limited_429': self.rate_limited,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'completed_at': self.completed_at,
+            'error': self.error,
+            'result': self.result
+        }
+
+
+class JobScheduler:
+    """
+    Priority queue drained by a fixed number of daemon worker threads.
+
+    - submit(): enqueue a job, returns it immediately (workers start lazily)
+    - jobs sharing a resource (e.g. the 'technical' dataset) never run at the
+      same time; a blocked job waits in the queue while others go ahead
+    - cancel()/pause()/resume(): queued jobs react at once, running jobs at their next progress report
+    - finished jobs are appended to a JSON history file
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, history_file: Path = HISTORY_FILE):
+        self.max_workers = max(1, max_workers)
+        self.history_file = history_file
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._seq = itertools.count()
+        self._queue: List[tuple] = []
+        self._jobs: Dict[str, Job] = {}
+        self._busy: set = set()  # resources held by running jobs
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+
+        self._history: Optional[List[Dict[str, Any]]] = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    # ---------- Listeners ----------
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Receive a job snapshot after every progress report or status change (any thread)"""
+        self._listeners.append(listener)
+
+    def _notify(self, job: Job):
+        if not self._listeners:
+            return
+        snapshot = job.to_dict()
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"Error in job listener: {e}")
+
+    # ---------- History ----------
+
+    def _load_history(self) -> List[Dict[str, Any]]:
+        if self._history is None:
+            self._history = []
+            if self.history_file.exists():
+                try:
+                    with open(self.history_file, 'r', encoding='utf-8') as f:
+                        self._history = json.load(f)
+                except Exception as e:
+                    print(f"Error loading job history: {e}")
+        return self._history
+
+    def _record(self, job: Job):
+        """Move a finished job to the persisted history"""
+        with self._lock:
+            history = self._load_history()
+            history.append(job.to_dict())
+            del history[:-MAX_HISTORY]
+            self._jobs.pop(job.id, None)
+
+            try:
+                self.history_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.history_file.with_suffix('.tmp')
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(history, f, default=str)
+                os.replace(tmp_file, self.history_file)
+            except Exception as e:
+                print(f"Error saving job history: {e}")
+
+        self._notify(job)
+
+    # ---------- Workers ----------
+
+    def _ensure_workers(self):
+        """Start worker threads on first submit so importing the app stays cheap"""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"job-worker-{len(self._workers)}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self) -> Optional[Job]:
+        """Highest-priority queued job that is not paused or blocked on a resource (called with the lock held)"""
+        for index, (_, _, job) in enumerate(self._queue):
+            if job._resume.is_set() and self._busy.isdisjoint(job.resources):
+                del self._queue[index]
+                self._busy.update(job.resources)
+                return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._wakeup:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._wakeup.wait()
+                    job = self._next_job()
+                if self._stopping:
+                    return
+                job.status = 'running'
+
+            self._run(job)
+
+    def _run(self, job: Job):
+        job.started_at = datetime.now().isoformat()
+        job._run_started = time.monotonic()
+        job._throttled_at_start = yf_limiter.throttled
+        print(f"Job {job.id} ({job.name}) started")
+        self._notify(job)
+
+        try:
+            job.result = job.fn(job, *job.args, **job.kwargs)
+            job.status = 'completed'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            traceback.print_exc()
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job._run_ended = time.monotonic()
+            job.completed_at = datetime.now().isoformat()
+            job.rate_limited = yf_limiter.throttled - job._throttled_at_start
+            print(f"Job {job.id} ({job.name}) {job.status} in {job.active_seconds():.1f}s")
+            with self._wakeup:
+                self._busy.difference_update(job.resources)
+                self._wakeup.notify_all()
+            self._record(job)
+
+    # ---------- Public API ----------
+
+    def submit(self, kind: str, fn: Callable, *args, name: Optional[str] = None,
+               priority: int = PRIORITY_NORMAL, resources: Tuple[str, ...] = (), **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs); resources are held exclusively while it runs"""
+        job = Job(kind, fn, args, kwargs, name=name, priority=priority, resources=resources)
+        job.on_change = self._notify
+
+        with self._wakeup:
+            self._jobs[job.id] = job
+            self._queue.append((priority, next(self._seq), job))
+            self._queue.sort(key=lambda item: item[:2])
+            self._ensure_workers()
+            self._wakeup.notify()
+
+        self._notify(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Active job or history entry"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+            for entry in reversed(self._load_history()):
+                if entry['job_id'] == job_id:
+                    return entry
+        return None
+
+    def get_active(self, kind: str) -> Optional[Job]:
+        """Queued, running or paused job of a kind"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.kind == kind and job.status in ACTIVE_STATUSES:
+                    return job
+        return None
+
+    def latest(self, kind: str) -> Optional[Dict[str, Any]]:
+        """Active job of a kind, else its most recent history entry"""
+        job = self.get_active(kind)
+        if job is not None:
+            return job.to_dict()
+        with self._lock:
+            for entry in reversed(self._load_history()):
+                if entry['kind'] == kind:
+                    return entry
+        return None
+
+    def list_jobs(self, kind: Optional[str] = None, limit: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            active = [job.to_dict() for job in self._jobs.values() if kind in (None, job.kind)]
+            history = [entry for entry in reversed(self._load_history()) if kind in (None, entry['kind'])]
+
+        return {'active': active, 'history': history[:limit]}
+
+    def estimate_seconds(self, kind: str, total: int, samples: int = 5) -> Optional[float]:
+        """Expected duration from the throughput of recent completed jobs of a kind"""
+        with self._lock:
+            rates = [
+                entry['throughput_per_sec'] for entry in reversed(self._load_history())
+                if entry['kind'] == kind and entry['status'] == 'completed' and entry.get('throughput_per_sec')
+            ][:samples]
+
+        if not rates:
+            return None
+        return round(total / (sum(rates) / len(rates)), 1)
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATUSES:
+                return False
+
+            job._cancel.set()
+            queued = [item for item in self._queue if item[2] is job]
+            for item in queued:
+                self._queue.remove(item)
+
+        if queued:
+            job.status = 'cancelled'
+            job.completed_at = datetime.now().isoformat()
+            self._record(job)
+        return True
+
+    def pause(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ('queued', 'running'):
+                return False
+            job._resume.clear()
+            if job.status == 'queued':
+                job.status = 'paused'
+
+        self._notify(job)
+        return True
+
+    def resume(self, job_id: str) -> bool:
+        with self._wakeup:
+            job = self._jobs.get(job_id)
+            if job is None or (job.status != 'paused' and job._resume.is_set()):
+                return False
+            job._resume.set()
+            if any(item[2] is job for item in self._queue):
+                job.status = 'queued'
+                self._wakeup.notify()
+
+        self._notify(job)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+            history = list(self._load_history())
+
+        finished = {status: sum(1 for entry in history if entry['status'] == status)
+                    for status in FINISHED_STATUSES}
+
+        return {
+            'max_workers': self.max_workers,
+            'running': sum(1 for job in jobs if job.status == 'running'),
+            'paused': sum(1 for job in jobs if job.status == 'paused'),
+            'queued': sum(1 for job in jobs if job.status == 'queued'),
+            'history_size': len(history),
+            'finished': finished
+        }
+
+    def shutdown(self):
+        """Cancel active jobs and stop workers (called on app shutdown)"""
+        with self._wakeup:
+            self._stopping = True
+            for job in self._jobs.values():
+                job._cancel.set()
+                job._resume.set()
+            self._wakeup.notify_all()
+
+
+# Global scheduler instance
+job_scheduler = JobScheduler()
@@ -0,0 +1,124 @@
+"""
+Incremental JSON Array Reader
+Yields the elements of a top-level JSON array one at a time from a binary
+file object, so memory is bounded by the largest element instead of the file
+"""
+
+import codecs
+import json
+from typing import Any, BinaryIO, Iterator
+
+
+# Bytes read per chunk (grows while a single element spans several chunks)
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = ' \t\n\r'
+DELIMITERS = WHITESPACE + ',]}'
+
+
+class JSONStreamError(json.JSONDecodeError):
+    """JSONDecodeError positioned in the whole stream (line/column of the window would mislead)"""
+
+    def __init__(self, message: str, text: str, pos: int, offset: int):
+        super().__init__(message, text, pos)
+        self.stream_pos = offset + pos
+
+    def __str__(self) -> str:
+        return f"{self.msg} (char {self.stream_pos})"
+
+
+class _Buffer:
+    """Decoded text window over the file; consumed text is dropped on refill"""
+
+    def __init__(self, fp: BinaryIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.text = ''
+        self.pos = 0
+        self.offset = 0  # characters dropped before text[0]
+        self.eof = False
+
+    def fill(self, min_size: int = 0) -> bool:
+        """Read more; False once the file is exhausted"""
+        if self.eof:
+            return False
+
+        chunk = self.fp.read(max(self.chunk_size, min_size))
+        self.offset += self.pos
+        self.text = self.text[self.pos:] + self.decoder.decode(chunk, final=not chunk)
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return True
+
+    def skip_whitespace(self) -> str:
+        """Next significant character ('' at end of file), without consuming it"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def error(self, message: str) -> JSONStreamError:
+        return JSONStreamError(message, self.text, self.pos, self.offset)
+
+
+def _decode_value(buffer: _Buffer, decoder: json.JSONDecoder) -> Any:
+    """Decode one value at the buffer position, reading more until it is complete"""
+    while True:
+        try:
+            value, end = decoder.raw_decode(buffer.text, buffer.pos)
+            # A number cut by the window end ("12" of "12.5") decodes fine; only
+            # accept it once the character after it is a delimiter
+            if buffer.eof or (end < len(buffer.text) and buffer.text[end] in DELIMITERS):
+                buffer.pos = end
+                return value
+        except json.JSONDecodeError:
+            if buffer.eof:
+                raise buffer.error("Invalid JSON value")
+
+        # Double the window so a large element is decoded O(log n) times, not once per chunk
+        buffer.fill(len(buffer.text) - buffer.pos)
+
+
+def iter_json_array(fp: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Iterate a JSON document element by element.
+
+    A top-level array yields its elements; any other top-level value is
+    yielded as the single element. Raises json.JSONDecodeError on malformed input.
+    """
+    buffer = _Buffer(fp, chunk_size)
+    decoder = json.JSONDecoder()
+
+    first = buffer.skip_whitespace()
+    if not first:
+        raise buffer.error("Expecting value")
+
+    if first != '[':
+        yield _decode_value(buffer, decoder)
+        if buffer.skip_whitespace():
+            raise buffer.error("Extra data")
+        return
+
+    buffer.pos += 1
+    if buffer.skip_whitespace() == ']':
+        buffer.pos += 1
+    else:
+        while True:
+            yield _decode_value(buffer, decoder)
+
+            separator = buffer.skip_whitespace()
+            buffer.pos += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                buffer.pos -= 1
+                raise buffer.error("Expecting ',' delimiter")
+            buffer.skip_whitespace()
+
+    if buffer.skip_whitespace():
+        raise buffer.error("Extra data")
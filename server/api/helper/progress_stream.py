@@ -0,0 +1,121 @@
+"""
+Server-Sent Events for Background Progress
+Fans job progress out to SSE subscribers, coalescing bursts to a maximum
+event rate per subscriber and sending keep-alive comments while idle
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional
+
+
+# Minimum seconds between two flushes to one subscriber (later updates replace pending ones)
+MIN_EVENT_INTERVAL = 0.5
+
+# Comment line sent when nothing happened, keeps proxies from closing the connection
+KEEPALIVE_SECONDS = 15.0
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """One SSE message"""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _Subscriber:
+    """Latest pending payload per key, woken from any thread via its event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.pending: Dict[Hashable, Dict[str, Any]] = {}
+        self.ready = asyncio.Event()
+
+    def push(self, key: Hashable, payload: Dict[str, Any]):
+        self.pending[key] = payload
+        self.ready.set()
+
+    def drain(self) -> List[Dict[str, Any]]:
+        payloads = list(self.pending.values())
+        self.pending.clear()
+        self.ready.clear()
+        return payloads
+
+
+class ProgressStream:
+    """
+    publish() is thread-safe (called from job worker threads);
+    subscribe() is an async generator of SSE messages for one client.
+    """
+
+    def __init__(self, min_interval: float = MIN_EVENT_INTERVAL, keepalive: float = KEEPALIVE_SECONDS):
+        self.min_interval = min_interval
+        self.keepalive = keepalive
+        self._subscribers: List[_Subscriber] = []
+        self.published = 0
+
+    def publish(self, key: Hashable, payload: Dict[str, Any]):
+        """Queue payload for every subscriber, replacing any undelivered payload with the same key"""
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, key, payload)
+            except RuntimeError:
+                # Event loop already closed
+                self._discard(subscriber)
+
+    def _discard(self, subscriber: _Subscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    async def subscribe(
+        self,
+        event: str,
+        initial: Optional[List[Dict[str, Any]]] = None,
+        is_disconnected: Optional[Callable] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yield SSE messages until the client disconnects.
+
+        Args:
+            event: SSE event name for payloads
+            initial: Payloads sent immediately (current state)
+            is_disconnected: Async callable, e.g. Request.is_disconnected
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        self._subscribers.append(subscriber)
+
+        try:
+            for payload in initial or []:
+                yield format_sse(payload, event)
+
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+
+                for payload in subscriber.drain():
+                    yield format_sse(payload, event)
+
+                # Coalesce: updates arriving during this pause collapse into one event per key
+                await asyncio.sleep(self.min_interval)
+        finally:
+            self._discard(subscriber)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'min_interval_seconds': self.min_interval,
+            'keepalive_seconds': self.keepalive
+        }
+
+
+# Global stream for master data reload progress
+reload_progress_stream = ProgressStream()
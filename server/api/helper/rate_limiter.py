@@ -0,0 +1,180 @@
+"""
+Adaptive Rate Limiter for Upstream Providers
+Process-wide token bucket whose rate follows AIMD:
+additive increase on success, multiplicative decrease on 429
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+
+# Requests per second (override with YF_RATE_* env vars)
+YF_INITIAL_RATE = float(os.getenv("YF_RATE_INITIAL", "2.0"))
+YF_MIN_RATE = float(os.getenv("YF_RATE_MIN", "0.2"))
+YF_MAX_RATE = float(os.getenv("YF_RATE_MAX", "20.0"))
+
+# Retries of a rate-limited call (each waits for a token at the reduced rate)
+MAX_THROTTLE_RETRIES = 3
+
+# 429s arriving within this window count as one congestion event
+DECREASE_COOLDOWN_SECONDS = 1.0
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """yfinance raises YFRateLimitError; older paths surface 'Too Many Requests'"""
+    message = str(error)
+    return (
+        type(error).__name__ == 'YFRateLimitError'
+        or 'Too Many Requests' in message
+        or 'Rate limited' in message
+    )
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every caller of one upstream.
+
+    - acquire(): blocks until a token is available at the current rate
+    - on_success(): rate += increase_step (up to max_rate)
+    - on_throttled(): rate *= decrease_factor (down to min_rate), bucket drained
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_rate: float = YF_INITIAL_RATE,
+        min_rate: float = YF_MIN_RATE,
+        max_rate: float = YF_MAX_RATE,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        burst: float = 5.0
+    ):
+        self.name = name
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.burst = burst
+
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+        self.acquired = 0
+        self.successes = 0
+        self.throttled = 0
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, cost: float = 1.0):
+        """Block until `cost` tokens are available"""
+        start = time.monotonic()
+        counted = False
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    self.acquired += 1
+                    self.total_wait_seconds += now - start
+                    if counted:
+                        self.waiting -= 1
+                    return
+
+                if not counted:
+                    self.waiting += 1
+                    counted = True
+                wait = (cost - self.tokens) / self.rate
+
+            time.sleep(min(wait, 1.0))
+
+    def on_success(self):
+        with self.lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttled(self):
+        with self.lock:
+            self.throttled += 1
+            self.tokens = 0.0
+
+            now = time.monotonic()
+            if now - self.last_decrease < DECREASE_COOLDOWN_SECONDS:
+                return
+            self.last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            print(f"{self.name} rate limited, slowing down to {self.rate:.2f} req/s")
+
+    def call(self, fn: Callable, *args, cost: float = 1.0, **kwargs) -> Any:
+        """
+        Run fn under the limiter, feeding the outcome back into the rate.
+        Rate-limited calls are retried (after the rate drop) up to MAX_THROTTLE_RETRIES.
+        """
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            self.acquire(cost)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self.on_throttled()
+                if attempt == MAX_THROTTLE_RETRIES:
+                    raise
+                continue
+
+            self.on_success()
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            self._refill(time.monotonic())
+            return {
+                'current_rate': round(self.rate, 3),
+                'min_rate': self.min_rate,
+                'max_rate': self.max_rate,
+                'available_tokens': round(self.tokens, 2),
+                'waiting': self.waiting,
+                'acquired': self.acquired,
+                'successes': self.successes,
+                'throttled_429': self.throttled,
+                'avg_wait_ms': round(self.total_wait_seconds / self.acquired * 1000, 2) if self.acquired else 0
+            }
+
+
+# Global limiter in front of every yfinance call
+yf_limiter = AdaptiveRateLimiter("yfinance")
+
+
+class _RateLimitLogHandler(logging.Handler):
+    """
+    yf.download() logs failed tickers instead of raising,
+    so 429s are picked up from the yfinance logger as well
+    """
+
+    def __init__(self, limiter: AdaptiveRateLimiter):
+        super().__init__(level=logging.WARNING)
+        self.limiter = limiter
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if 'Too Many Requests' in message or 'Rate limited' in message or 'YFRateLimitError' in message:
+            self.limiter.on_throttled()
+
+        # Keep yfinance warnings on stderr (adding a handler disables logging.lastResort)
+        if logging.lastResort is not None:
+            logging.lastResort.handle(record)
+
+
+logging.getLogger('yfinance').addHandler(_RateLimitLogHandler(yf_limiter))
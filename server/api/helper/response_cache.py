@@ -0,0 +1,127 @@
+"""
+Rendered Response Cache
+Conditional GET for read endpoints whose data only changes on upload or
+reload. A response body is rendered once per (request, data version) and
+served from memory; its ETag lets unchanged clients revalidate with a 304.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from api.helper import fast_json
+from api.helper.executor import execution
+
+
+# Rendered bodies kept in memory (least recently used evicted first)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Browser freshness in seconds; 0 = always revalidate (cheap 304s)
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" and "x" match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    wanted = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == wanted for tag in if_none_match.split(','))
+
+
+class ResponseCache:
+    """
+    - respond(): 304 if the client's ETag is current, else the cached body
+      for the current data version, rendering it only on a version change
+
+    The data version comes from a cheap callable (a store commit counter, a
+    file mtime, ...); bumping it invalidates every body rendered before.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_age: int = RESPONSE_CACHE_MAX_AGE):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (etag, body)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def _key(request: Request) -> str:
+        return f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+
+    @staticmethod
+    def _etag(key: str, version: Any) -> str:
+        return f'W/"{hashlib.sha1(repr((key, version)).encode()).hexdigest()[:20]}"'
+
+    def _headers(self, etag: str) -> Dict[str, str]:
+        return {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={self.max_age}, must-revalidate"
+        }
+
+    async def respond(
+        self,
+        request: Request,
+        version: Callable[[], Any],
+        build: Callable[[], Awaitable[Any]]
+    ) -> Response:
+        """
+        Args:
+            request: Incoming request (path + query string form the cache key)
+            version: Sync callable returning the current data version (run on the I/O pool)
+            build: Coroutine function returning the response content; exceptions
+                   (e.g. HTTPException 404) propagate and nothing is cached
+        """
+        key = self._key(request)
+        etag = self._etag(key, await execution.run_io(version))
+        headers = self._headers(etag)
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                body = entry[1]
+            else:
+                body = None
+
+        if body is None:
+            body = fast_json.dumps(await build())
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = (etag, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_bytes': sum(len(body) for _, body in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified
+            }
+
+
+# Global response cache
+response_cache = ResponseCache()
@@ -0,0 +1,128 @@
+"""
+Single-Flight Request Coalescing
+Concurrent calls for the same (provider, resource, params) share one upstream fetch
+"""
+
+import copy
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """One in-flight upstream fetch that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Thread-based single-flight group (callers run on the I/O thread pool).
+
+    The first caller for a key runs the fetch; callers arriving while it is
+    in flight block until it finishes and receive a copy of its result
+    (or the same exception). Nothing is cached after the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _provider_stats(self, provider: str) -> Dict[str, int]:
+        if provider not in self._stats:
+            self._stats[provider] = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+        return self._stats[provider]
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless a call with the same key is already in flight"""
+        provider = key[0] if isinstance(key, tuple) and key else str(key)
+
+        with self._lock:
+            stats = self._provider_stats(provider)
+            stats['calls'] += 1
+
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Followers get their own copy so callers can't mutate each other's result
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._provider_stats(provider)['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-provider call/execution/coalesced counts"""
+        with self._lock:
+            providers = {name: dict(stats) for name, stats in self._stats.items()}
+            in_flight = len(self._calls)
+
+        return {
+            'in_flight': in_flight,
+            'total_coalesced': sum(s['coalesced'] for s in providers.values()),
+            'providers': providers
+        }
+
+
+# Global single-flight group shared by all upstream providers
+single_flight = SingleFlight()
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turn call arguments into a hashable key"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def coalesce(provider: str, resource: str, method: bool = False):
+    """
+    Decorator: route calls through single_flight keyed by (provider, resource, params).
+
+    Args:
+        provider: Upstream name, e.g. "yfinance" or "tradingview"
+        resource: What is fetched, e.g. "price" or "news"
+        method: Decorated function is a method (self is left out of the key)
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            params = args[1:] if method else args
+            key = (provider, resource, _freeze(params), _freeze(kwargs))
+            return single_flight.do(key, fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,60 +1,73 @@
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Query
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from api.service_stock.analyzer import process_broker_data
-from api.service_stock.technical_analyze import calculate_advanced_technical
-from api.service_stock.quant_technical import calculate_quant_metrics
+from api.service_stock.technical_analyze import analyze_technical_history
+from api.service_stock.quant_technical import analyze_quant_history
+from api.service_stock.screener import screen, refresh_universe, is_refresh_running as is_screener_refreshing
 from api.service_stock.financial_health import analyze_financial_health
 from api.service_stock.news_narrative import analyze_news_narrative
 from api.service_stock.company_profile import get_company_profile
 from api.service_comm_forex.complete_news_analyzer import CompleteNewsAnalyzer
 from api.service_comm_forex.tradingview_news_fetcher import TradingViewNewsFetcher
 from api.service_comm_forex.news_cache import news_cache
-from api.service_stock.broker_summary.broker_summary import parse_xhr_response, validate_json_structure
+from api.service_stock.broker_summary.broker_summary import summarize_transaction_table, validate_json_structure
+from api.service_stock.broker_summary.transactions import TransactionTableBuilder
+from api.service_stock.broker_summary.warehouse import broker_flow_warehouse
 from api.service_stock.master_data import (
     get_technical_stats,
     get_fundamental_stats,
+    get_technical_stats_version,
+    get_fundamental_stats_version,
     update_technical_data_batch,
     update_fundamental_data_batch,
     get_all_stock_codes,
-    add_stocks_from_broker_data
+    add_stocks_from_broker_data,
+    get_price_history,
+    record_stock_requests,
+    get_reload_checkpoint,
+    delisted_registry
 )
+from api.service_stock.master_data.price_cache import refresh_cache as refresh_price_cache
+from api.service_stock.master_data.technical_loader import technical_repository
+from api.service_stock.master_data.fundamental_loader import fundamental_repository
 from api.service_stock.accumulation import (
-    detect_accumulation,
     get_all_accumulating_stocks,
     get_broker_accumulation,
-    save_accumulation_data,
-    load_accumulation_data
+    accumulation_state,
+    get_accumulation,
+    get_accumulation_version
 )
-from typing import Dict, List
+from api.helper.executor import execution
+from api.helper.fast_json import FastJSONResponse
+from api.helper.response_cache import response_cache
+from api.helper.json_stream import iter_json_array
+from api.helper.single_flight import single_flight
+from api.helper.rate_limiter import yf_limiter
+from api.helper.job_scheduler import job_scheduler, PRIORITY_NORMAL, PRIORITY_LOW
+from api.helper.progress_stream import reload_progress_stream
+from typing import Dict, List, Optional
 import json
-from datetime import datetime
-
-app = FastAPI()
-
-# In-memory progress tracker
-reload_progress = {
-    "technical": {
-        "is_running": False,
-        "current": 0,
-        "total": 0,
-        "status": "idle",
-        "successful": 0,
-        "failed": 0,
-        "started_at": None,
-        "completed_at": None
-    },
-    "fundamental": {
-        "is_running": False,
-        "current": 0,
-        "total": 0,
-        "status": "idle",
-        "successful": 0,
-        "failed": 0,
-        "started_at": None,
-        "completed_at": None
-    }
-}
+import os
+import traceback
+
+# Responses at least this large (bytes) are gzip-compressed for clients that accept it
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+
+# Largest broker summary upload accepted (MB); 0 = no limit (uploads are stream-parsed)
+BROKER_UPLOAD_MAX_MB = int(os.getenv("BROKER_UPLOAD_MAX_MB", "0"))
+
+# All JSON responses render with orjson; endpoints with large payloads return
+# FastJSONResponse directly so jsonable_encoder is skipped as well
+app = FastAPI(default_response_class=FastJSONResponse)
+
+
+@app.on_event("shutdown")
+def shutdown_execution_layer():
+    job_scheduler.shutdown()
+    execution.shutdown()
 
 origin = [
     "http://localhost:5173",
@@ -71,6 +84,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# SSE (text/event-stream) responses are never compressed
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=6)
+
 # Request model for stock analysis
 class StockAnalysisRequest(BaseModel):
     stocks: List[str]
@@ -78,26 +94,23 @@ class StockAnalysisRequest(BaseModel):
 # Endpoint untuk analisis data broker - menerima JSON langsung
 @app.post("/v1/stock/analyze")
 async def analyze_data(request: Request):
-    try:
-        body = await request.json()
-        
-        if not body:
-            raise HTTPException(status_code=400, detail="JSON tidak boleh kosong.")
-        
-        raw_json_str = json.dumps(body)
-        result = process_broker_data(raw_json_str)
-        
-        if isinstance(result, dict) and "error" in result:
-            raise HTTPException(status_code=result.get("status_code", 400), detail=result["error"])
+    # Raw body goes straight to the worker and is parsed once there
+    body = await request.body()
 
-        return {
-            "message": "Data berhasil di analisis", 
-            "data": result,
-            "status_code": 200
-        }
-    
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"JSON tidak valid: {str(e)}")
+    if not body.strip():
+        raise HTTPException(status_code=400, detail="JSON tidak boleh kosong.")
+
+    async with execution.limit("broker_analyze"):
+        result = await execution.run_io(process_broker_data, body)
+
+    if isinstance(result, dict) and "error" in result:
+        raise HTTPException(status_code=result.get("status_code", 400), detail=result["error"])
+
+    return {
+        "message": "Data berhasil di analisis",
+        "data": result,
+        "status_code": 200
+    }
 
 @app.post('/v1/stock/analyze/technical')
 async def analyze_technical(request: StockAnalysisRequest):
@@ -105,7 +118,10 @@ async def analyze_technical(request: StockAnalysisRequest):
         if not request.stocks:
             raise HTTPException(status_code=400, detail="List saham tidak boleh kosong")
         
-        data = calculate_advanced_technical(request.stocks)
+        record_stock_requests(request.stocks)
+        async with execution.limit("technical"):
+            history = await execution.run_io(get_price_history, request.stocks)
+            data = await execution.run_cpu(analyze_technical_history, history, request.stocks) if history is not None else []
 
         if not data:
             raise HTTPException(status_code=404, detail="Data teknikal tidak ditemukan untuk saham tersebut")
@@ -127,7 +143,10 @@ async def analyze_quant(request: StockAnalysisRequest):
         if not request.stocks:
             raise HTTPException(status_code=400, detail="List saham tidak boleh kosong")
         
-        data = calculate_quant_metrics(request.stocks)
+        record_stock_requests(request.stocks)
+        async with execution.limit("quant"):
+            history = await execution.run_io(get_price_history, request.stocks)
+            data = await execution.run_cpu(analyze_quant_history, history, request.stocks) if history is not None else []
 
         if not data:
             raise HTTPException(status_code=404, detail="Data kuantitatif tidak ditemukan untuk saham tersebut")
@@ -141,13 +160,75 @@ async def analyze_quant(request: StockAnalysisRequest):
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
+# Screener seluruh saham dari snapshot indikator (tanpa download yfinance)
+@app.get('/v1/stock/screener')
+async def stock_screener(
+    where: str = None,
+    sort_by: str = "z_score",
+    order: str = "asc",
+    limit: int = 20
+):
+    """
+    Screen all stocks with precomputed indicator snapshots
+
+    Args:
+        where: AND-joined predicate, e.g. "z_score < -2 AND squeeze AND ichimoku above cloud"
+        sort_by: Numeric metric to sort by (default: z_score)
+        order: asc or desc (default: asc)
+        limit: Top-N rows to return (default: 20)
+    """
+    try:
+        result = screen(where, sort_by=sort_by, order=order, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+    return {
+        "message": "Screener berhasil",
+        "data": result["rows"],
+        "total_matched": result["total_matched"],
+        "universe_size": result["universe_size"],
+        "snapshot_at": result["generated_at"],
+        "status_code": 200
+    }
+
+
+@app.post('/v1/stock/screener/refresh')
+async def refresh_stock_screener():
+    """
+    Update OHLCV bars and indicator states for all stocks in the background,
+    then rebuild the screener snapshot
+    """
+    if is_screener_refreshing() or job_scheduler.get_active("screener_refresh"):
+        return {
+            "message": "Screener refresh already in progress",
+            "status_code": 409  # Conflict
+        }
+
+    job = job_scheduler.submit(
+        "screener_refresh",
+        lambda job: refresh_universe(),
+        name="Screener universe refresh",
+        priority=PRIORITY_LOW
+    )
+
+    return {
+        "message": "Screener refresh started",
+        "job_id": job.id,
+        "status_code": 202  # Accepted
+    }
+
+
 @app.post('/v1/stock/analyze/fundamental')
 async def get_financial(request: StockAnalysisRequest):
     try:
         if not request.stocks:
             raise HTTPException(status_code=400, detail="List saham tidak boleh kosong")
         
-        data = analyze_financial_health(request.stocks)
+        record_stock_requests(request.stocks)
+        async with execution.limit("fundamental"):
+            data = await execution.run_io(analyze_financial_health, request.stocks)
 
         if not data:
             raise HTTPException(status_code=400, detail="Data kesehatan finansial tidak ditemukan untuk saham tersebut")
@@ -166,7 +247,9 @@ async def analyze_news(request: StockAnalysisRequest):
         if not request.stocks:
             raise HTTPException(status_code=400, detail="List saham tidak boleh kosong")
         
-        data = analyze_news_narrative(request.stocks)
+        record_stock_requests(request.stocks)
+        async with execution.limit("news"):
+            data = await execution.run_io(analyze_news_narrative, request.stocks)
 
         if not data:
             raise HTTPException(status_code=404, detail="Data narasi berita tidak ditemukan untuk saham tersebut")
@@ -185,6 +268,7 @@ def get_insight(stock_code: str):
         if not stock_code:
             raise HTTPException(status_code=400, detail="Kode saham tidak boleh kosong")
         
+        record_stock_requests([stock_code])
         data = get_company_profile(stock_code)
         if not data:
             raise HTTPException(status_code=404, detail="Data profil tidak ditemukan untuk saham tersebut")
@@ -204,6 +288,54 @@ async def import_recent_data(request: Request):
     return {"message": "Data berhasil di import"}
 
 
+def process_broker_upload(upload_file):
+    """
+    Blocking part of broker summary upload (runs on the I/O pool).
+    The uploaded array is parsed entry by entry into one transaction table
+    that both the broker summary and the accumulation state aggregate.
+    """
+    table_builder = TransactionTableBuilder()
+    
+    upload_file.seek(0)
+    entries = 0
+    for entry in iter_json_array(upload_file):
+        # The first entry identifies the file; later pages without a summary add no rows
+        if not entries and not validate_json_structure(entry):
+            raise HTTPException(
+                status_code=400,
+                detail="Struktur JSON tidak sesuai. Pastikan file berisi data XHR dari Stockbit broker summary."
+            )
+        if not isinstance(entry, dict):
+            continue
+        table_builder.add(entry)
+        entries += 1
+    
+    if not entries:
+        raise HTTPException(
+            status_code=400,
+            detail="Struktur JSON tidak sesuai. Pastikan file berisi data XHR dari Stockbit broker summary."
+        )
+    
+    table = table_builder.build()
+    result = summarize_transaction_table(table)
+    
+    # Keep the pages in the broker flow warehouse (history survives the response).
+    # A failure is reported in the response; ingest is idempotent, so re-uploading the file repairs it
+    try:
+        warehouse_stats = broker_flow_warehouse.ingest_table(table)
+    except Exception as e:
+        print(f"Error writing broker flow warehouse: {e}")
+        traceback.print_exc()
+        warehouse_stats = {'error': f"Gagal menyimpan ke broker flow warehouse: {e}. Upload ulang file ini."}
+    
+    # Merge into the persistent state (only this upload's broker periods are replaced)
+    merge_stats = accumulation_state.ingest_table(table)
+    accumulation_results = accumulation_state.evaluate(brokers=merge_stats['brokers'])
+    accumulation_results['merge'] = merge_stats
+    
+    return result, accumulation_results, warehouse_stats
+
+
 # Endpoint untuk upload broker summary file (XHR intercepted data)
 @app.post("/v1/stock/broker-summary/upload")
 async def upload_broker_summary(file: UploadFile = File(...)):
@@ -215,44 +347,45 @@ async def upload_broker_summary(file: UploadFile = File(...)):
                 detail="File harus berformat JSON (.json)"
             )
         
-        # Read file content
-        content = await file.read()
-        
-        # Validate file size (max 10MB)
-        if len(content) > 10 * 1024 * 1024:
+        # Validate file size if a limit is configured (already spooled by the form parser)
+        file.file.seek(0, os.SEEK_END)
+        if BROKER_UPLOAD_MAX_MB > 0 and file.file.tell() > BROKER_UPLOAD_MAX_MB * 1024 * 1024:
             raise HTTPException(
                 status_code=400,
-                detail="Ukuran file terlalu besar. Maksimal 10MB"
+                detail=f"Ukuran file terlalu besar. Maksimal {BROKER_UPLOAD_MAX_MB}MB"
             )
         
-        # Parse JSON
-        try:
-            json_data = json.loads(content)
-        except json.JSONDecodeError as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File JSON tidak valid: {str(e)}"
-            )
-        
-        # Validate structure
-        if not validate_json_structure(json_data):
-            raise HTTPException(
-                status_code=400,
-                detail="Struktur JSON tidak sesuai. Pastikan file berisi data XHR dari Stockbit broker summary."
-            )
-        
-        # Process data
-        result = parse_xhr_response(json_data)
+        async with execution.limit("broker_upload"):
+            # Stream-parse the spooled upload and process it off the event loop
+            try:
+                result, accumulation_results, warehouse_stats = await execution.run_io(process_broker_upload, file.file)
+            except json.JSONDecodeError as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"File JSON tidak valid: {str(e)}"
+                )
         
-        # NEW: Detect accumulation patterns
-        accumulation_results = detect_accumulation(json_data)
-        save_accumulation_data(accumulation_results)
+        # Post-processing: fetch master data for stocks not tracked yet
+        uploaded_codes = sorted({
+            stock['stock_code']
+            for summary in result['broker_summaries']
+            for stock in summary.get('stocks', [])
+        })
+        followup_job = job_scheduler.submit(
+            "upload_postprocess",
+            lambda job: add_stocks_from_broker_data(uploaded_codes, progress_callback=job.report_progress),
+            name=f"Broker upload post-processing ({file.filename})",
+            priority=PRIORITY_LOW,
+            resources=("technical", "fundamental")
+        )
         
-        return {
+        return FastJSONResponse({
             "message": "File broker summary berhasil diproses",
             "data": result,
             "accumulation": {
                 "total_brokers": accumulation_results['total_brokers'],
+                "periods_added": accumulation_results['merge']['periods_added'],
+                "periods_replaced": accumulation_results['merge']['periods_replaced'],
                 "brokers": {
                     broker_code: {
                         'total_transactions': broker_data['total_transactions'],
@@ -261,8 +394,10 @@ async def upload_broker_summary(file: UploadFile = File(...)):
                     for broker_code, broker_data in accumulation_results['brokers'].items()
                 }
             },
+            "warehouse": warehouse_stats,
+            "postprocess_job_id": followup_job.id,
             "status_code": 200
-        }
+        })
         
     except HTTPException:
         raise
@@ -276,21 +411,37 @@ async def upload_broker_summary(file: UploadFile = File(...)):
 # ==================== ACCUMULATION APIs ====================
 
 @app.get("/v1/accumulation/stocks")
-async def get_accumulating_stocks():
+async def get_accumulating_stocks(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_appearance_rate: Optional[float] = None
+):
     """
     Get all accumulating stocks across all brokers
+    
+    Args:
+        start_date: Window start (YYYY-MM-DD, inclusive), default all uploaded periods
+        end_date: Window end (YYYY-MM-DD, inclusive)
+        min_appearance_rate: % of the broker's periods a stock must appear in (default 100)
+    
+    Rendered once per data version; sends an ETag and answers If-None-Match with 304
     """
-    try:
-        data = load_accumulation_data()
+    async def build():
+        data = await execution.run_io(get_accumulation, start_date, end_date, min_appearance_rate)
         all_stocks = get_all_accumulating_stocks(data)
         
         return {
             "message": "Accumulating stocks retrieved successfully",
             "total_stocks": len(all_stocks),
             "last_updated": data.get('last_updated'),
+            "window": data.get('window'),
             "stocks": all_stocks,
             "status_code": 200
         }
+    
+    try:
+        return await response_cache.respond(request, get_accumulation_version, build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -299,12 +450,18 @@ async def get_accumulating_stocks():
 
 
 @app.get("/v1/accumulation/broker/{broker_code}")
-async def get_broker_accumulating_stocks(broker_code: str):
+async def get_broker_accumulating_stocks(
+    request: Request,
+    broker_code: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_appearance_rate: Optional[float] = None
+):
     """
-    Get accumulating stocks for specific broker
+    Get accumulating stocks for specific broker (same window args and caching as /v1/accumulation/stocks)
     """
-    try:
-        data = load_accumulation_data()
+    async def build():
+        data = await execution.run_io(get_accumulation, start_date, end_date, min_appearance_rate, [broker_code])
         broker_data = get_broker_accumulation(data, broker_code)
         
         if not broker_data:
@@ -319,6 +476,9 @@ async def get_broker_accumulating_stocks(broker_code: str):
             "data": broker_data,
             "status_code": 200
         }
+    
+    try:
+        return await response_cache.respond(request, get_accumulation_version, build)
     except HTTPException:
         raise
     except Exception as e:
@@ -329,15 +489,21 @@ async def get_broker_accumulating_stocks(broker_code: str):
 
 
 @app.get("/v1/accumulation/summary")
-async def get_accumulation_summary():
+async def get_accumulation_summary(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_appearance_rate: Optional[float] = None
+):
     """
-    Get summary of accumulation data
+    Get summary of accumulation data (same window args and caching as /v1/accumulation/stocks)
     """
-    try:
-        data = load_accumulation_data()
+    async def build():
+        data = await execution.run_io(get_accumulation, start_date, end_date, min_appearance_rate)
         
         summary = {
             "last_updated": data.get('last_updated'),
+            "window": data.get('window'),
             "total_brokers": data.get('total_brokers', 0),
             "brokers": []
         }
@@ -355,6 +521,9 @@ async def get_accumulation_summary():
             "data": summary,
             "status_code": 200
         }
+    
+    try:
+        return await response_cache.respond(request, get_accumulation_version, build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -362,22 +531,197 @@ async def get_accumulation_summary():
         )
 
 
+# ==================== BROKER FLOW WAREHOUSE ====================
+
+@app.get("/v1/broker-flows/partitions")
+async def get_broker_flow_partitions(
+    broker_code: Optional[str] = None,
+    stock_code: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+):
+    """
+    Stored broker summary partitions (one per broker and period)
+    
+    Args:
+        broker_code: Only this broker
+        stock_code: Only partitions containing this stock
+        start_date / end_date: Inclusive YYYY-MM-DD bounds on the period start
+    """
+    try:
+        partitions = await execution.run_io(
+            broker_flow_warehouse.list_partitions,
+            [broker_code.upper()] if broker_code else None,
+            start_date,
+            end_date,
+            stock_code.upper() if stock_code else None
+        )
+        stats = await execution.run_io(broker_flow_warehouse.get_stats)
+        
+        return FastJSONResponse({
+            "message": "Broker flow partitions retrieved successfully",
+            "total": len(partitions),
+            "partitions": partitions,
+            "stats": stats,
+            "status_code": 200
+        })
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving broker flow partitions: {str(e)}"
+        )
+
+
+@app.get("/v1/broker-flows/net")
+async def get_broker_net_flows(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    broker_code: Optional[str] = None,
+    stock_code: Optional[str] = None,
+    limit: Optional[int] = None
+):
+    """
+    Net buy/sell lots and value per broker and stock over a date window
+
+    Args:
+        start_date / end_date: Inclusive YYYY-MM-DD bounds (default all stored days)
+        broker_code: Only this broker
+        stock_code: Only this stock
+        limit: Max rows (largest absolute net value first)
+    """
+    try:
+        data = await execution.run_io(
+            broker_flow_warehouse.net_flows,
+            start_date,
+            end_date,
+            [broker_code.upper()] if broker_code else None,
+            [stock_code.upper()] if stock_code else None,
+            limit
+        )
+
+        return FastJSONResponse({
+            "message": "Broker net flows retrieved successfully",
+            "window": data['window'],
+            "total": len(data['flows']),
+            "flows": data['flows'],
+            "status_code": 200
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving broker net flows: {str(e)}"
+        )
+
+
+@app.get("/v1/broker-flows/series")
+async def get_broker_flow_series(
+    stock_code: Optional[str] = None,
+    broker_code: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    granularity: str = "daily"
+):
+    """
+    Net flow time series of a stock and/or broker
+
+    Args:
+        stock_code / broker_code: Filters (flows are summed over the rest)
+        start_date / end_date: Inclusive YYYY-MM-DD bounds (default all stored days)
+        granularity: daily, weekly or monthly
+    """
+    try:
+        data = await execution.run_io(
+            broker_flow_warehouse.flow_series,
+            stock_code.upper() if stock_code else None,
+            broker_code.upper() if broker_code else None,
+            start_date,
+            end_date,
+            granularity
+        )
+
+        return FastJSONResponse({
+            "message": "Broker flow series retrieved successfully",
+            **data,
+            "status_code": 200
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving broker flow series: {str(e)}"
+        )
+
+
+@app.get("/v1/broker-flows/top/{stock_code}")
+async def get_top_brokers(
+    stock_code: str,
+    days: int = 20,
+    limit: int = 10,
+    end_date: Optional[str] = None
+):
+    """
+    Top net buyers and sellers of a stock over its last N trading days
+
+    Args:
+        stock_code: Stock code
+        days: Number of trading days with data for the stock
+        limit: Brokers per side
+        end_date: Last day of the window (default latest stored day)
+    """
+    if days < 1 or limit < 1:
+        raise HTTPException(status_code=400, detail="days dan limit harus lebih dari 0")
+
+    try:
+        data = await execution.run_io(
+            broker_flow_warehouse.top_brokers,
+            stock_code.upper(),
+            days,
+            limit,
+            end_date
+        )
+
+        return FastJSONResponse({
+            "message": f"Top brokers for {stock_code.upper()} retrieved successfully",
+            **data,
+            "status_code": 200
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving top brokers: {str(e)}"
+        )
+
+
 # ==================== MASTER DATA ENDPOINTS ====================
 
+def master_data_stats_version() -> tuple:
+    return get_technical_stats_version(), get_fundamental_stats_version()
+
+
 @app.get("/v1/master-data/stats")
-async def get_master_data_stats():
+async def get_master_data_stats(request: Request):
     """
     Get statistics about master data (technical and fundamental)
+    
+    Rendered once per dataset version; sends an ETag and answers If-None-Match with 304
     """
-    try:
-        technical_stats = get_technical_stats()
-        fundamental_stats = get_fundamental_stats()
+    async def build():
+        technical_stats = await execution.run_io(get_technical_stats)
+        fundamental_stats = await execution.run_io(get_fundamental_stats)
         
         return {
             "technical": technical_stats,
             "fundamental": fundamental_stats,
             "status_code": 200
         }
+    
+    try:
+        return await response_cache.respond(request, master_data_stats_version, build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -385,84 +729,127 @@ async def get_master_data_stats():
         )
 
 
+def run_master_data_reload(job, dataset: str, stock_codes: List[str], **options):
+    """Reload job body: master data batch update reporting through the job"""
+    updater = update_technical_data_batch if dataset == "technical" else update_fundamental_data_batch
+    updater(stock_codes, progress_callback=job.report_progress, **options)
+
+
+def estimate_reload_minutes(dataset: str, total_stocks: int) -> float:
+    """From the throughput of previous reloads, else from the current yfinance rate"""
+    seconds = job_scheduler.estimate_seconds(f"reload_{dataset}", total_stocks)
+    if seconds is None:
+        seconds = total_stocks / yf_limiter.rate
+    return round(seconds / 60, 1)
+
+
+def reload_job_progress(job: Dict = None) -> Dict:
+    """Reload job snapshot in the progress shape the client expects"""
+    if job is None:
+        return {
+            "job_id": None,
+            "is_running": False,
+            "current": 0,
+            "total": 0,
+            "status": "idle",
+            "successful": 0,
+            "failed": 0,
+            "skipped": 0,
+            "started_at": None,
+            "completed_at": None
+        }
+    
+    if job["status"] == "running":
+        status = job["progress_status"]
+    elif job["status"] == "completed":
+        status = "complete"
+    elif job["status"] == "failed":
+        status = f"error: {job['error']}"
+    else:
+        status = job["status"]
+    
+    return {
+        "job_id": job["job_id"],
+        "is_running": job["status"] in ("queued", "running", "paused"),
+        "current": job["current"],
+        "total": job["total"],
+        "status": status,
+        "successful": job["successful"],
+        "failed": job["failed"],
+        "skipped": job["skipped"],
+        "throughput_per_sec": job["throughput_per_sec"],
+        "eta_seconds": job["eta_seconds"],
+        "rate_limited_429": job["rate_limited_429"],
+        "started_at": job["started_at"],
+        "completed_at": job["completed_at"]
+    }
+
+
+def get_reload_job_progress(dataset: str) -> Dict:
+    """Latest reload job of a dataset"""
+    return reload_job_progress(job_scheduler.latest(f"reload_{dataset}"))
+
+
+def publish_reload_progress(job: Dict):
+    """Job listener: forward reload progress to SSE subscribers"""
+    if job["kind"] not in ("reload_technical", "reload_fundamental"):
+        return
+    dataset = job["kind"].split("_", 1)[1]
+    reload_progress_stream.publish(dataset, {"dataset": dataset, **reload_job_progress(job)})
+
+
+job_scheduler.add_listener(publish_reload_progress)
+
+
 @app.post("/v1/master-data/reload/technical")
 async def reload_technical_data(
     batch_size: int = 300,
-    delay: int = 30,
-    max_workers: int = 5
+    delay: int = 0,
+    max_workers: int = 5,
+    fresh_minutes: Optional[int] = None
 ):
     """
     Manually reload technical data from yfinance
     
     Args:
         batch_size: Number of stocks per batch (default: 300)
-        delay: Seconds between batches (default: 30)
+        delay: Extra seconds between batches (default: 0, pacing is done by the yfinance rate limiter)
         max_workers: Concurrent requests per batch (default: 5)
+        fresh_minutes: Skip stocks updated within this window (default: dataset default, 0 = reload all)
     """
     try:
-        # Check if already running
-        if reload_progress["technical"]["is_running"]:
+        # Check if already queued or running
+        if job_scheduler.get_active("reload_technical"):
             return {
                 "message": "Technical data reload already in progress",
-                "progress": reload_progress["technical"],
+                "progress": get_reload_job_progress("technical"),
                 "status_code": 409  # Conflict
             }
         
         stock_codes = get_all_stock_codes()
         
-        # Initialize progress
-        reload_progress["technical"] = {
-            "is_running": True,
-            "current": 0,
-            "total": len(stock_codes),
-            "status": "starting",
-            "successful": 0,
-            "failed": 0,
-            "started_at": datetime.now().isoformat(),
-            "completed_at": None
-        }
-        
-        # Progress callback function
-        def progress_callback(current, total, status, successful, failed):
-            reload_progress["technical"].update({
-                "current": current,
-                "total": total,
-                "status": status,
-                "successful": successful,
-                "failed": failed
-            })
-            if status == "complete":
-                reload_progress["technical"]["is_running"] = False
-                reload_progress["technical"]["completed_at"] = datetime.now().isoformat()
-        
-        # Run update in background (non-blocking)
-        import threading
-        
-        def update_task():
-            try:
-                update_technical_data_batch(
-                    stock_codes,
-                    batch_size=batch_size,
-                    delay_between_batches=delay,
-                    max_workers=max_workers,
-                    progress_callback=progress_callback
-                )
-            except Exception as e:
-                print(f"Error in background task: {e}")
-                reload_progress["technical"]["is_running"] = False
-                reload_progress["technical"]["status"] = f"error: {str(e)}"
-        
-        thread = threading.Thread(target=update_task, daemon=True)
-        thread.start()
+        job = job_scheduler.submit(
+            "reload_technical",
+            run_master_data_reload,
+            "technical",
+            stock_codes,
+            name="Technical data reload",
+            priority=PRIORITY_NORMAL,
+            resources=("technical",),
+            batch_size=batch_size,
+            delay_between_batches=delay,
+            max_workers=max_workers,
+            fresh_minutes=fresh_minutes
+        )
         
         return {
             "message": "Technical data reload started",
+            "job_id": job.id,
             "total_stocks": len(stock_codes),
-            "estimated_time_minutes": (len(stock_codes) // batch_size) * (delay // 60),
+            "estimated_time_minutes": estimate_reload_minutes("technical", len(stock_codes)),
             "status_code": 202  # Accepted
         }
     except Exception as e:
-        reload_progress["technical"]["is_running"] = False
         raise HTTPException(
             status_code=500,
             detail=f"Error starting reload: {str(e)}"
@@ -475,96 +862,126 @@ async def get_reload_progress():
     Get current progress of reload operations
     """
     return {
-        "technical": reload_progress["technical"],
-        "fundamental": reload_progress["fundamental"],
+        "technical": get_reload_job_progress("technical"),
+        "fundamental": get_reload_job_progress("fundamental"),
+        "checkpoints": {
+            "technical": get_reload_checkpoint("technical"),
+            "fundamental": get_reload_checkpoint("fundamental")
+        },
         "status_code": 200
     }
 
 
+@app.get("/v1/master-data/reload/stream")
+async def stream_reload_progress(request: Request):
+    """
+    Server-Sent Events stream of reload progress.
+    Sends the current state of both datasets on connect, then one
+    coalesced 'progress' event per dataset change and keep-alive comments while idle.
+    """
+    initial = [
+        {"dataset": dataset, **get_reload_job_progress(dataset)}
+        for dataset in ("technical", "fundamental")
+    ]
+    
+    return StreamingResponse(
+        reload_progress_stream.subscribe("progress", initial, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @app.post("/v1/master-data/reload/fundamental")
 async def reload_fundamental_data(
     batch_size: int = 50,
-    delay: int = 60,
-    max_workers: int = 5
+    delay: int = 0,
+    max_workers: int = 5,
+    fresh_minutes: Optional[int] = None
 ):
     """
     Manually reload fundamental data from yfinance
     
     Args:
         batch_size: Number of stocks per batch (default: 50)
-        delay: Seconds between batches (default: 60)
+        delay: Extra seconds between batches (default: 0, pacing is done by the yfinance rate limiter)
         max_workers: Concurrent requests per batch (default: 5)
+        fresh_minutes: Skip stocks updated within this window (default: dataset default, 0 = reload all)
     """
     try:
-        # Check if already running
-        if reload_progress["fundamental"]["is_running"]:
+        # Check if already queued or running
+        if job_scheduler.get_active("reload_fundamental"):
             return {
                 "message": "Fundamental data reload already in progress",
-                "progress": reload_progress["fundamental"],
+                "progress": get_reload_job_progress("fundamental"),
                 "status_code": 409  # Conflict
             }
         
         stock_codes = get_all_stock_codes()
         
-        # Initialize progress
-        reload_progress["fundamental"] = {
-            "is_running": True,
-            "current": 0,
-            "total": len(stock_codes),
-            "status": "starting",
-            "successful": 0,
-            "failed": 0,
-            "started_at": datetime.now().isoformat(),
-            "completed_at": None
-        }
-        
-        # Progress callback function
-        def progress_callback(current, total, status, successful, failed):
-            reload_progress["fundamental"].update({
-                "current": current,
-                "total": total,
-                "status": status,
-                "successful": successful,
-                "failed": failed
-            })
-            if status == "complete":
-                reload_progress["fundamental"]["is_running"] = False
-                reload_progress["fundamental"]["completed_at"] = datetime.now().isoformat()
-        
-        # Run update in background (non-blocking)
-        import threading
-        
-        def update_task():
-            try:
-                update_fundamental_data_batch(
-                    stock_codes,
-                    batch_size=batch_size,
-                    delay_between_batches=delay,
-                    max_workers=max_workers,
-                    progress_callback=progress_callback
-                )
-            except Exception as e:
-                print(f"Error in background task: {e}")
-                reload_progress["fundamental"]["is_running"] = False
-                reload_progress["fundamental"]["status"] = f"error: {str(e)}"
-        
-        thread = threading.Thread(target=update_task, daemon=True)
-        thread.start()
+        job = job_scheduler.submit(
+            "reload_fundamental",
+            run_master_data_reload,
+            "fundamental",
+            stock_codes,
+            name="Fundamental data reload",
+            priority=PRIORITY_NORMAL,
+            resources=("fundamental",),
+            batch_size=batch_size,
+            delay_between_batches=delay,
+            max_workers=max_workers,
+            fresh_minutes=fresh_minutes
+        )
         
         return {
             "message": "Fundamental data reload started",
+            "job_id": job.id,
             "total_stocks": len(stock_codes),
-            "estimated_time_minutes": (len(stock_codes) // batch_size) * (delay // 60),
+            "estimated_time_minutes": estimate_reload_minutes("fundamental", len(stock_codes)),
             "status_code": 202  # Accepted
         }
     except Exception as e:
-        reload_progress["fundamental"]["is_running"] = False
         raise HTTPException(
             status_code=500,
             detail=f"Error starting reload: {str(e)}"
         )
 
 
+@app.get("/v1/master-data/delisted")
+async def get_delisted_stocks():
+    """
+    Tickers in the delisted/unfetchable registry.
+    Blocked entries are skipped by every yfinance fetch until retry_after.
+    """
+    return {
+        "message": "Delisted registry retrieved",
+        "stats": delisted_registry.get_stats(),
+        "data": delisted_registry.list_entries(),
+        "status_code": 200
+    }
+
+
+@app.delete("/v1/master-data/delisted")
+async def clear_delisted_stocks(stock_codes: List[str] = Query(None)):
+    """
+    Remove tickers from the registry so they are fetched again
+    
+    Args:
+        stock_codes: Codes to remove (?stock_codes=AAAA&stock_codes=BBBB), all entries if omitted
+    """
+    try:
+        removed = await execution.run_io(delisted_registry.clear, stock_codes)
+        return {
+            "message": "Delisted registry cleared",
+            "removed": removed,
+            "status_code": 200
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+
 @app.post("/v1/master-data/discover-stocks")
 async def discover_stocks_from_broker(stock_codes: List[str]):
     """
@@ -574,12 +991,19 @@ async def discover_stocks_from_broker(stock_codes: List[str]):
         stock_codes: List of stock codes from broker data
     """
     try:
-        add_stocks_from_broker_data(stock_codes)
+        job = job_scheduler.submit(
+            "stock_discovery",
+            lambda job: add_stocks_from_broker_data(stock_codes, progress_callback=job.report_progress),
+            name=f"Stock discovery ({len(stock_codes)} stocks)",
+            priority=PRIORITY_LOW,
+            resources=("technical", "fundamental")
+        )
         
         return {
-            "message": "Stock discovery completed",
+            "message": "Stock discovery started",
+            "job_id": job.id,
             "stocks_processed": len(stock_codes),
-            "status_code": 200
+            "status_code": 202  # Accepted
         }
     except Exception as e:
         raise HTTPException(
@@ -598,7 +1022,7 @@ async def get_all_news(symbol: str, limit: int = 20, type: str = "forex"):
         # Check cache first
         cached_news = news_cache.get(symbol, type, limit)
         if cached_news:
-            return {
+            return FastJSONResponse({
                 "message": "Daftar berita berhasil diambil (from cache)", 
                 "symbol": symbol,
                 "type": type,
@@ -606,7 +1030,7 @@ async def get_all_news(symbol: str, limit: int = 20, type: str = "forex"):
                 "data": cached_news,
                 "cached": True,
                 "status_code": 200
-            }
+            })
         
         # Cache miss - fetch from TradingView
         fetcher = TradingViewNewsFetcher()
@@ -623,7 +1047,7 @@ async def get_all_news(symbol: str, limit: int = 20, type: str = "forex"):
         # Store in cache
         news_cache.set(symbol, type, limit, news_data)
         
-        return {
+        return FastJSONResponse({
             "message": "Daftar berita berhasil diambil", 
             "symbol": symbol,
             "type": type,
@@ -631,7 +1055,7 @@ async def get_all_news(symbol: str, limit: int = 20, type: str = "forex"):
             "data": news_data,
             "cached": False,
             "status_code": 200
-        }
+        })
     except HTTPException:
         raise HTTPException(status_code=400, detail="Terjadi kesalahan pada server") 
     except Exception as e:
@@ -741,6 +1165,115 @@ async def get_news_sentiment(symbol: str, limit: int = 20, type: str = "forex"):
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
+# ==================== SYSTEM ENDPOINTS ====================
+
+@app.get("/v1/system/executor")
+async def get_executor_stats():
+    """
+    Get execution layer statistics (pool sizes, per-endpoint queue depth)
+    """
+    return {
+        "message": "Executor stats retrieved",
+        "stats": execution.get_stats(),
+        "status_code": 200
+    }
+
+
+@app.get("/v1/system/single-flight")
+async def get_single_flight_stats():
+    """
+    Get upstream request coalescing statistics (calls, executions, coalesced per provider)
+    """
+    return {
+        "message": "Single-flight stats retrieved",
+        "stats": single_flight.get_stats(),
+        "status_code": 200
+    }
+
+
+@app.get("/v1/system/rate-limiter")
+async def get_rate_limiter_stats():
+    """
+    Get shared yfinance rate limiter statistics (current rate, 429 count, waiting callers)
+    """
+    return {
+        "message": "Rate limiter stats retrieved",
+        "stats": yf_limiter.get_stats(),
+        "status_code": 200
+    }
+
+
+@app.get("/v1/system/response-cache")
+async def get_response_cache_stats():
+    """
+    Get rendered-response cache statistics (entries, hits, misses, 304s)
+    """
+    return {
+        "message": "Response cache stats retrieved",
+        "stats": response_cache.get_stats(),
+        "status_code": 200
+    }
+
+
+@app.get("/v1/system/master-data-cache")
+async def get_master_data_cache_stats():
+    """
+    Get in-memory master data repository statistics (loaded, reloads, hits)
+    """
+    return {
+        "message": "Master data cache stats retrieved",
+        "stats": {
+            "technical": technical_repository.get_stats(),
+            "fundamental": fundamental_repository.get_stats()
+        },
+        "status_code": 200
+    }
+
+
+@app.get("/v1/jobs")
+async def list_jobs(kind: str = None, limit: int = 50):
+    """Active background jobs and job history (newest first)"""
+    return {
+        "message": "Jobs retrieved",
+        "data": job_scheduler.list_jobs(kind, limit),
+        "stats": job_scheduler.get_stats(),
+        "status_code": 200
+    }
+
+
+@app.get("/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} tidak ditemukan")
+    return {
+        "message": "Job retrieved",
+        "data": job,
+        "status_code": 200
+    }
+
+
+@app.post("/v1/jobs/{job_id}/{action}")
+async def control_job(job_id: str, action: str):
+    """Cancel, pause or resume a job (running jobs react at their next progress report)"""
+    actions = {
+        "cancel": job_scheduler.cancel,
+        "pause": job_scheduler.pause,
+        "resume": job_scheduler.resume
+    }
+    if action not in actions:
+        raise HTTPException(status_code=400, detail="Aksi harus 'cancel', 'pause' atau 'resume'")
+    
+    if not actions[action](job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} tidak dapat di-{action}")
+    
+    return {
+        "message": f"Job {action} requested",
+        "data": job_scheduler.get(job_id),
+        "status_code": 200
+    }
+
+
 # Cache management endpoints
 @app.post("/v1/cache/invalidate")
 async def invalidate_cache(symbol: str = None, type: str = None):
@@ -766,4 +1299,26 @@ async def get_cache_stats():
             "stats": stats
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@app.post("/v1/cache/prices/warm")
+async def warm_price_cache():
+    """Refresh the price cache for all master data stocks in the background"""
+    if job_scheduler.get_active("price_cache_warm"):
+        return {
+            "message": "Price cache warm-up already in progress",
+            "status_code": 409  # Conflict
+        }
+    
+    job = job_scheduler.submit(
+        "price_cache_warm",
+        lambda job: {"prices": len(refresh_price_cache(get_all_stock_codes()))},
+        name="Price cache warm-up",
+        priority=PRIORITY_LOW
+    )
+    
+    return {
+        "message": "Price cache warm-up started",
+        "job_id": job.id,
+        "status_code": 202  # Accepted
+    }
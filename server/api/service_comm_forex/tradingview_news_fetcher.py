@@ -9,6 +9,8 @@ from typing import Optional, Dict, List
 from datetime import datetime
 import time
 
+from api.helper.single_flight import coalesce
+
 
 class TradingViewNewsFetcher:
     """
@@ -162,6 +164,7 @@ class TradingViewNewsFetcher:
         
         return content
     
+    @coalesce("tradingview", "news_with_content", method=True)
     def fetch_news_with_content(
         self, 
         symbol: str = "XAUUSD", 
@@ -12,6 +12,12 @@ from .storage import (
     load_accumulation_data,
     clear_accumulation_data
 )
+from .state import (
+    accumulation_state,
+    get_accumulation,
+    get_accumulation_version,
+    DEFAULT_MIN_APPEARANCE_RATE
+)
 
 __all__ = [
     'detect_accumulation',
@@ -19,5 +25,9 @@ __all__ = [
     'get_broker_accumulation',
     'save_accumulation_data',
     'load_accumulation_data',
-    'clear_accumulation_data'
+    'clear_accumulation_data',
+    'accumulation_state',
+    'get_accumulation',
+    'get_accumulation_version',
+    'DEFAULT_MIN_APPEARANCE_RATE'
 ]
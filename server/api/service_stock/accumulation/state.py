@@ -0,0 +1,320 @@
+"""
+Incremental Accumulation State
+Per-broker, per-period, per-stock buy/sell flows persisted in SQLite.
+Each upload only replaces the (broker, period) pairs it contains, and
+accumulation is evaluated over any date window with a configurable
+appearance threshold instead of the 100% rule of a single upload.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from api.service_stock.broker_summary.transactions import TransactionTable, build_transaction_table, period_page_counts, transaction_flows
+
+from .detector import summarize_stock
+from .storage import ACCUMULATION_FILE, load_accumulation_data
+
+try:
+    from api.service_stock.master_data.fundamental_loader import get_version as get_fundamental_version
+except ImportError:
+    def get_fundamental_version():
+        return 0
+
+
+STATE_FILE = Path(__file__).parent.parent.parent / "data" / "accumulation_state.sqlite3"
+
+# Minimum % of a broker's transactions in the window a stock must appear in
+DEFAULT_MIN_APPEARANCE_RATE = float(os.getenv("ACCUMULATION_MIN_APPEARANCE_RATE", "100"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS periods (
+    broker TEXT NOT NULL,
+    period_from TEXT NOT NULL,
+    period_to TEXT NOT NULL,
+    pages INTEGER NOT NULL,
+    stocks INTEGER NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    PRIMARY KEY (broker, period_from, period_to)
+);
+CREATE TABLE IF NOT EXISTS stock_flows (
+    broker TEXT NOT NULL,
+    period_from TEXT NOT NULL,
+    period_to TEXT NOT NULL,
+    stock TEXT NOT NULL,
+    buy_volume REAL NOT NULL,
+    buy_value REAL NOT NULL,
+    sell_volume REAL NOT NULL,
+    sell_value REAL NOT NULL,
+    PRIMARY KEY (broker, period_from, period_to, stock)
+);
+CREATE INDEX IF NOT EXISTS idx_stock_flows_date ON stock_flows (period_from);
+"""
+
+
+class AccumulationState:
+    """
+    SQLite (WAL) store of broker flows keyed by (broker, period).
+
+    - ingest(): group upload pages by (broker, period), replace those periods
+    - evaluate(): appearance counts and flow totals per broker/stock over a window
+    - version(): bumped on every write (SQLite user_version, shared across processes)
+    """
+
+    def __init__(self, db_path: Path = STATE_FILE):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def ingest(self, broker_data_list: Iterable[Dict]) -> Dict[str, Any]:
+        """
+        Merge an upload into the state.
+
+        Pages of the same (broker, period) in the upload are combined; a period
+        that was uploaded before is replaced, everything else is left untouched.
+        """
+        return self.ingest_table(build_transaction_table(broker_data_list))
+
+    def ingest_table(self, table: TransactionTable) -> Dict[str, Any]:
+        """ingest() for an upload already converted to a transaction table"""
+        period_keys = ['broker', 'period_from', 'period_to']
+        flow_columns = ['buy_volume', 'buy_value', 'sell_volume', 'sell_value']
+
+        # Periods without any stock rows are not transactions (they have no flows)
+        stock_totals = transaction_flows(table).groupby(
+            period_keys + ['stock'], sort=False, observed=True
+        )[flow_columns].sum().reset_index()
+        stock_counts = stock_totals.groupby(period_keys, sort=False, observed=True).size()
+
+        page_counts = period_page_counts(table)
+
+        periods = [
+            (*key, page_counts[key], int(stocks))
+            for key, stocks in zip(stock_counts.index, stock_counts.to_numpy())
+        ]
+        flows = list(zip(*(
+            stock_totals[column].astype(object).tolist() if column in period_keys + ['stock']
+            else stock_totals[column].tolist()
+            for column in period_keys + ['stock'] + flow_columns
+        )))
+
+        return self._replace_periods(periods, flows)
+
+    def _replace_periods(self, periods: List[tuple], flows: List[tuple]) -> Dict[str, Any]:
+        """
+        Write (broker, period_from, period_to, pages, stocks) rows and their
+        (broker, period_from, period_to, stock, ...flows) rows in one transaction
+        """
+        now = datetime.now().isoformat()
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                existing = [
+                    period[:3] for period in periods
+                    if conn.execute(
+                        "SELECT 1 FROM periods WHERE broker = ? AND period_from = ? AND period_to = ?", period[:3]
+                    ).fetchone()
+                ]
+                conn.executemany(
+                    "DELETE FROM stock_flows WHERE broker = ? AND period_from = ? AND period_to = ?",
+                    existing
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO periods VALUES (?, ?, ?, ?, ?, ?)",
+                    [(*period, now) for period in periods]
+                )
+                conn.executemany("INSERT INTO stock_flows VALUES (?, ?, ?, ?, ?, ?, ?, ?)", flows)
+                self._bump_version(conn)
+
+        brokers = sorted({period[0] for period in periods})
+        print(f"Accumulation state: {len(periods) - len(existing)} new periods, "
+              f"{len(existing)} replaced ({len(brokers)} brokers)")
+
+        return {
+            'brokers': brokers,
+            'periods_added': len(periods) - len(existing),
+            'periods_replaced': len(existing),
+            'stock_rows': len(flows)
+        }
+
+    def _window_clause(self, start_date: Optional[str], end_date: Optional[str],
+                       brokers: Optional[List[str]]) -> tuple:
+        clauses, params = [], []
+        if start_date:
+            clauses.append("period_from >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("period_from <= ?")
+            params.append(end_date)
+        if brokers is not None:
+            # An empty list matches nothing (SQLite accepts "IN ()")
+            clauses.append(f"broker IN ({', '.join('?' * len(brokers))})")
+            params.extend(brokers)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def evaluate(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        min_appearance_rate: float = DEFAULT_MIN_APPEARANCE_RATE,
+        brokers: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Accumulating stocks per broker over a date window, in the same
+        shape as detect_accumulation().
+
+        Args:
+            start_date / end_date: Inclusive YYYY-MM-DD bounds on the period start (None = open)
+            min_appearance_rate: % of the broker's periods in the window a stock must appear in
+            brokers: Limit to these broker codes (None = all, [] = none)
+        """
+        where, params = self._window_clause(start_date, end_date, brokers)
+        conn = self._connect()
+
+        # Single read transaction so periods and flows come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            period_counts = dict(conn.execute(
+                f"SELECT broker, COUNT(*) FROM periods{where} GROUP BY broker ORDER BY broker", params
+            ).fetchall())
+            last_upload = conn.execute(f"SELECT MAX(uploaded_at) FROM periods{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT broker, stock, COUNT(*), GROUP_CONCAT(period_from),
+                       SUM(buy_volume), SUM(buy_value), SUM(sell_volume), SUM(sell_value)
+                FROM stock_flows{where}
+                GROUP BY broker, stock
+                """,
+                params
+            ).fetchall()
+        finally:
+            conn.commit()
+
+        stocks_by_broker = defaultdict(list)
+        for broker, stock, count, dates, buy_volume, buy_value, sell_volume, sell_value in rows:
+            stocks_by_broker[broker].append((stock, {
+                'count': count,
+                'dates': dates.split(','),
+                'buy_volume': buy_volume,
+                'buy_value': buy_value,
+                'sell_volume': sell_volume,
+                'sell_value': sell_value
+            }))
+
+        results = {
+            'last_updated': last_upload,
+            'total_brokers': len(period_counts),
+            'window': {
+                'start_date': start_date,
+                'end_date': end_date,
+                'min_appearance_rate': min_appearance_rate
+            },
+            'brokers': {}
+        }
+
+        for broker_code, total_transactions in period_counts.items():
+            stock_appearances = stocks_by_broker.get(broker_code, [])
+
+            accumulating_stocks = [
+                summarize_stock(stock_code, data, total_transactions)
+                for stock_code, data in stock_appearances
+                if (data['count'] / total_transactions) * 100 >= min_appearance_rate
+            ]
+
+            # Sort by net volume (descending)
+            accumulating_stocks.sort(key=lambda x: (-abs(x['net_volume']), x['stock_code']))
+
+            results['brokers'][broker_code] = {
+                'broker_code': broker_code,
+                'total_transactions': total_transactions,
+                'total_stocks_analyzed': len(stock_appearances),
+                'accumulating_stocks_count': len(accumulating_stocks),
+                'accumulating_stocks': accumulating_stocks
+            }
+
+        return results
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection):
+        """Inside the write transaction, so readers never see new data with the old version"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.execute(f"PRAGMA user_version = {version + 1}")
+
+    def version(self) -> int:
+        return self._connect().execute("PRAGMA user_version").fetchone()[0]
+
+    def is_empty(self) -> bool:
+        return self._connect().execute("SELECT 1 FROM periods LIMIT 1").fetchone() is None
+
+    def get_periods(self, broker: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Uploaded (broker, period) pairs"""
+        where, params = self._window_clause(None, None, [broker] if broker else None)
+        rows = self._connect().execute(
+            f"SELECT broker, period_from, period_to, pages, stocks, uploaded_at FROM periods{where} "
+            "ORDER BY broker, period_from",
+            params
+        ).fetchall()
+        columns = ('broker', 'period_from', 'period_to', 'pages', 'stocks', 'uploaded_at')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def clear(self):
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM stock_flows")
+                conn.execute("DELETE FROM periods")
+                self._bump_version(conn)
+
+
+# Global state instance
+accumulation_state = AccumulationState()
+
+
+def get_accumulation(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_appearance_rate: Optional[float] = None,
+    brokers: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Accumulation view over a window; falls back to the last single-upload
+    result (stock_accumulation_data.json) until the first upload is merged
+    """
+    if accumulation_state.is_empty():
+        return load_accumulation_data()
+
+    return accumulation_state.evaluate(
+        start_date,
+        end_date,
+        DEFAULT_MIN_APPEARANCE_RATE if min_appearance_rate is None else min_appearance_rate,
+        brokers
+    )
+
+
+def get_accumulation_version() -> tuple:
+    """
+    Changes whenever get_accumulation() may return something different: a
+    state write (or the fallback JSON file changing) and a fundamental data
+    reload (stocks carry sector/industry)
+    """
+    if accumulation_state.is_empty():
+        source = ('file', ACCUMULATION_FILE.stat().st_mtime_ns if ACCUMULATION_FILE.exists() else 0)
+    else:
+        source = ('state', accumulation_state.version())
+    return (*source, get_fundamental_version(), DEFAULT_MIN_APPEARANCE_RATE)
@@ -1,15 +1,42 @@
 import json
+from typing import Any, Dict, Union
 import pandas as pd
-import yfinance as yf
-import math
 import numpy as np
-from ..helper.safe_float import safe_float
-from ..helper.safe_int import safe_int
+from api.helper import fast_json
+from api.service_stock.master_data.price_cache import get_multiple_prices
 
-def process_broker_data(raw_json_str: str):
+
+# Status by diff_pct, first matching rule wins; |diff| <= 0.5% is NEUTRAL (BEP)
+# Toleransi BEP di angka 0.5% (Karena fee beli+jual biasanya 0.4%-0.5%)
+STATUS_RULES = [
+    (lambda diff: diff >= 5.0, "BIG PROFIT", "green"),
+    (lambda diff: diff > 0.5, "PROFIT", "green"),
+    (lambda diff: diff <= -5.0, "DEEP LOSS", "red"),  # Nyangkut parah
+    (lambda diff: diff < -0.5, "LOSS", "red"),
+]
+
+
+def to_number(values: pd.Series) -> np.ndarray:
+    """Column as float64 (Stockbit sends numbers as strings); invalid/NaN/inf become 0 like safe_float"""
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isfinite(numbers), numbers, 0.0)
+
+
+def process_broker_data(payload: Union[Dict[str, Any], bytes, str]):
+    """
+    Analyze a Stockbit broker/summary response.
+
+    payload is the parsed JSON, or the raw request body (bytes/str) which is
+    parsed here once with fast_json; either way no re-serialization is needed.
+    """
     try:
-        # 1. Parse JSON
-        parsed_data = json.loads(raw_json_str)
+        # 1. Parse JSON (sekali saja, langsung dari body request)
+        parsed_data = payload if isinstance(payload, dict) else fast_json.loads(payload)
+        
+        if not parsed_data:
+            return {"error": "JSON tidak boleh kosong.", "status_code": 400}
+        if not isinstance(parsed_data, dict):
+            return {"error": "Struktur JSON salah. Pastikan copy JSON dari Network Tab 'broker/summary' di Stockbit.", "status_code": 400}
         
         # 2. Ekstrak Metadata
         broker_data = parsed_data.get("data", {})
@@ -29,14 +56,14 @@ def process_broker_data(raw_json_str: str):
         if not items:
             return {"error": "Tidak ada data pembelian (Net Buy) pada periode ini.", "status_code": 404}
 
-        # 4. Pandas Processing
-        df = pd.DataFrame(items)
-        
-        # Konversi Tipe Data
-        df["Stock"] = df["netbs_stock_code"]
-        df["AvgPrice"] = df["netbs_buy_avg_price"].apply(lambda x: safe_float(x))
-        df["TotalValue"] = df["bval"].apply(lambda x: safe_float(x))
-        df["TotalLot"] = df["blot"].apply(lambda x: safe_int(x)) # Stockbit kadang string
+        # 4. Pandas Processing (kolom di-convert sekaligus, tanpa loop per baris)
+        # Hanya 4 field yang dipakai yang diambil dari tiap item
+        df = pd.DataFrame({
+            "Stock": pd.Series([item.get("netbs_stock_code") for item in items], dtype=object),
+            "AvgPrice": to_number(pd.Series([item.get("netbs_buy_avg_price") for item in items], dtype=object)),
+            "TotalValue": to_number(pd.Series([item.get("bval") for item in items], dtype=object)),
+            "TotalLot": np.trunc(to_number(pd.Series([item.get("blot") for item in items], dtype=object))).astype(np.int64) # Stockbit kadang string
+        })
         
         # Bersihkan data: Hapus yang value 0 atau AvgPrice 0
         df = df[(df["TotalValue"] > 0) & (df["AvgPrice"] > 0)].copy()
@@ -53,108 +80,66 @@ def process_broker_data(raw_json_str: str):
         total_portfolio_value = df["TotalValue"].sum()
         df["Weight"] = (df["TotalValue"] / total_portfolio_value) * 100
 
-        # 6. Fetch Harga YFinance
+        # 6. Harga dari price cache bersama (hanya saham yang expired/belum ada yang di-fetch)
         stock_list = df["Stock"].unique().tolist()
-        tickers_jk = [f"{ticker}.JK" for ticker in stock_list]
-        
-        current_prices = {}
-        
-        if stock_list:
-            try:
-                # Download batch agar cepat
-                market_data = yf.download(tickers_jk, period="1d", progress=False)["Close"]
-                
-                # Handling jika data cuma 1 baris (Series) atau Tabel (DataFrame)
-                if not market_data.empty:
-                    last_prices = market_data.iloc[-1] # Ambil baris terakhir (Latest Close/Live)
-                    
-                    if len(stock_list) == 1:
-                        # Case cuma 1 saham
-                        code = stock_list[0]
-                        current_prices[code] = safe_float(last_prices.item())
-                    else:
-                        # Case banyak saham
-                        for ticker in tickers_jk:
-                            clean_code = ticker.replace(".JK", "")
-                            try:
-                                # Handle jika ticker tidak ada di YFinance (return NaN)
-                                price = last_prices[ticker]
-                                current_prices[clean_code] = safe_float(price)
-                            except:
-                                current_prices[clean_code] = 0
-            except Exception as e:
-                print(f"YFinance Error: {e}") 
-                # Lanjut saja, harga nanti jadi 0
-
-        # 7. Final Logic Loop (Classification)
-        result_list = []
-        
+        current_prices = get_multiple_prices(stock_list)
+        curr_price = to_number(df["Stock"].map(current_prices))
+        avg_price = df["AvgPrice"].to_numpy()
+        lots = df["TotalLot"].to_numpy()
+
+        # 7. Klasifikasi & PnL (vectorized)
+        has_price = curr_price > 0
+        diff_pct = np.where(has_price, (curr_price - avg_price) / avg_price * 100, 0.0)
+        # Estimasi Cuan/Rugi Rupiah (Lot * 100 lembar * Selisih Harga)
+        floating_pnl = np.where(has_price, (curr_price - avg_price) * lots * 100, 0.0)
+
+        conditions = [rule(diff_pct) for rule, _, _ in STATUS_RULES]
+        status = np.select(conditions, [label for _, label, _ in STATUS_RULES], default="NEUTRAL")
+        status_color = np.select(conditions, [color for _, _, color in STATUS_RULES], default="gray")
+
         # Statistik Ringkasan
-        stats_win = 0
-        stats_loss = 0
-        stats_potential_pnl = 0
-
-        for index, row in df.iterrows():
-            stock = row["Stock"]
-            avg_price = row["AvgPrice"]
-            curr_price = current_prices.get(stock, 0)
-            
-            # Hitung % Perubahan
-            diff_pct = 0
-            floating_pnl = 0 # Rupiah
-            
-            if curr_price > 0:
-                diff_pct = ((curr_price - avg_price) / avg_price) * 100
-                # Hitung Estimasi Cuan/Rugi Rupiah (Lot * 100 lembar * Selisih Harga)
-                floating_pnl = (curr_price - avg_price) * row["TotalLot"] * 100
-            
-            # Update Global Stats
-            stats_potential_pnl += floating_pnl
-            if diff_pct > 0.5: stats_win += 1
-            elif diff_pct < -0.5: stats_loss += 1
-
-            # Klasifikasi Status (Lebih Detail)
-            # Toleransi BEP di angka 0.5% (Karena fee beli+jual biasanya 0.4%-0.5%)
-            status = "NEUTRAL" # BEP
-            status_color = "gray" # Untuk frontend hint
-            
-            if diff_pct >= 5.0:
-                status = "BIG PROFIT"
-                status_color = "green"
-            elif diff_pct > 0.5:
-                status = "PROFIT"
-                status_color = "green"
-            elif diff_pct <= -5.0:
-                status = "DEEP LOSS" # Nyangkut parah
-                status_color = "red"
-            elif diff_pct < -0.5:
-                status = "LOSS"
-                status_color = "red"
-
-            result_list.append({
-                "stock": stock,
-                "broker_avg": round(avg_price, 0),
-                "current_price": round(curr_price, 0),
-                "value_bn": round(row["TotalValue"] / 1_000_000_000, 2), # Dalam Milyar (Billion)
-                "value_raw": row["TotalValue"],
-                "lot": int(row["TotalLot"]),
-                "weight_pct": round(row["Weight"], 1), # % Alokasi
-                "diff_pct": round(diff_pct, 2),
-                "floating_pnl": round(floating_pnl, 0), # Estimasi Rupiah
-                "status": status,
-                "status_color": status_color
-            })
+        stats_win = int(np.count_nonzero(diff_pct > 0.5))
+        stats_loss = int(np.count_nonzero(diff_pct < -0.5))
+        stats_potential_pnl = float(floating_pnl.sum())
 
         # 8. Sorting
         # Sort utama berdasarkan Value (Uang yang dipertaruhkan)
-        result_list = sorted(result_list, key=lambda x: x["value_raw"], reverse=True)
+        order = np.argsort(-df["TotalValue"].to_numpy(), kind="stable")
+        columns = (
+            df["Stock"].to_numpy()[order].tolist(),
+            avg_price[order].tolist(),
+            curr_price[order].tolist(),
+            df["TotalValue"].to_numpy()[order].tolist(),
+            lots[order].tolist(),
+            df["Weight"].to_numpy()[order].tolist(),
+            diff_pct[order].tolist(),
+            floating_pnl[order].tolist(),
+            status[order].tolist(),
+            status_color[order].tolist()
+        )
+        result_list = [
+            {
+                "stock": stock,
+                "broker_avg": round(avg, 0),
+                "current_price": round(curr, 0),
+                "value_bn": round(value / 1_000_000_000, 2), # Dalam Milyar (Billion)
+                "value_raw": value,
+                "lot": lot,
+                "weight_pct": round(weight, 1), # % Alokasi
+                "diff_pct": round(diff, 2),
+                "floating_pnl": round(pnl, 0), # Estimasi Rupiah
+                "status": label,
+                "status_color": color
+            }
+            for stock, avg, curr, value, lot, weight, diff, pnl, label, color in zip(*columns)
+        ]
 
         # 9. Return Final Structure
         return {
             "status": "success",
             "broker_info": broker_info,
             "summary": {
-                "total_value": total_portfolio_value,
+                "total_value": float(total_portfolio_value),
                 "total_stocks": len(result_list),
                 "win_vs_loss": f"{stats_win} - {stats_loss}",
                 "potential_pnl_total": stats_potential_pnl
@@ -1,7 +1,10 @@
 from typing import List, Dict, Any, Optional
-import json
-from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
 from api.service_stock.broker_summary.stock_price import enrich_stocks_with_prices
+from api.service_stock.broker_summary.transactions import TransactionTable, build_transaction_table
 
 
 def parse_xhr_response(json_data: Any) -> Dict[str, Any]:
@@ -28,29 +31,110 @@ def parse_xhr_response(json_data: Any) -> Dict[str, Any]:
     if not entries:
         raise ValueError("No data entries found.")
     
-    # Group entries by broker code and period
-    grouped_entries = {}
+    return summarize_transaction_table(build_transaction_table(entries))
+
+
+def summarize_transaction_table(table: TransactionTable) -> Dict[str, Any]:
+    """
+    parse_xhr_response() result from a transaction table: per-stock totals of
+    every broker+period come from one group-by over all buy/sell lines, and the
+    merged stock fields are computed column-wise.
+    """
+    group_keys = ['broker', 'period_from', 'period_to']
+    pages = table.pages.assign(broker=table.pages['broker'].replace('', 'Unknown'))
+    rows = table.rows
     
-    for entry in entries:
-        broker_code = entry.get('broker', 'Unknown')
-        periode = entry.get('periode', {})
-        date_from = periode.get('from', '')
-        date_to = periode.get('to', '')
-        
-        # Create unique key for grouping
-        group_key = f"{broker_code}_{date_from}_{date_to}"
-        
-        if group_key not in grouped_entries:
-            grouped_entries[group_key] = []
-        
-        grouped_entries[group_key].append(entry)
+    # Sell lines are negative; summaries use their magnitude
+    is_buy = (rows['side'] == 'BUY').to_numpy()
+    lot = rows['lot'].to_numpy()
+    value = rows['value'].to_numpy()
+    avg_price = rows['avg_price'].to_numpy()
+    broker = rows['broker']
+    if '' in broker.cat.categories:
+        broker = broker.astype(object).replace('', 'Unknown')
+    lines = pd.DataFrame({
+        'broker': broker,
+        'period_from': rows['period_from'],
+        'period_to': rows['period_to'],
+        'stock_code': rows['stock'],
+        'buy_lot': np.where(is_buy, lot, 0.0),
+        'sell_lot': np.where(is_buy, 0.0, np.abs(lot)),
+        'buy_value': np.where(is_buy, value, 0.0),
+        'sell_value': np.where(is_buy, 0.0, np.abs(value)),
+        'buy_avg_price': np.where(is_buy, avg_price, np.nan),
+        'sell_avg_price': np.where(is_buy, np.nan, avg_price),
+        'investor_type': rows['investor_type']
+    })
     
-    # Process each group (merge multiple pages)
+    # Last average price seen per side wins, as in merge_stock_data()
+    stocks = lines.groupby(group_keys + ['stock_code'], sort=False, observed=True).agg(
+        buy_lot=('buy_lot', 'sum'),
+        sell_lot=('sell_lot', 'sum'),
+        buy_value=('buy_value', 'sum'),
+        sell_value=('sell_value', 'sum'),
+        buy_avg_price=('buy_avg_price', 'last'),
+        sell_avg_price=('sell_avg_price', 'last'),
+        investor_type=('investor_type', 'first')
+    ).fillna({'buy_avg_price': 0.0, 'sell_avg_price': 0.0}).reset_index()
+    
+    net_value = (stocks['buy_value'] - stocks['sell_value']).to_numpy()
+    buy_avg = stocks['buy_avg_price'].to_numpy()
+    sell_avg = stocks['sell_avg_price'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_pct = np.where(
+            (buy_avg > 0) & (sell_avg > 0), (sell_avg - buy_avg) / buy_avg * 100, 0.0
+        )
+    
+    # Groups in order of first page; stocks by absolute net value (stable, like sorted())
+    group_index = stocks.groupby(group_keys, sort=False, observed=True).ngroup().to_numpy()
+    order = np.lexsort((-np.abs(net_value), group_index))
+    
+    columns = {
+        'stock_code': stocks['stock_code'].astype(object).to_numpy()[order].tolist(),
+        'buy_lot': stocks['buy_lot'].to_numpy()[order].astype(np.int64).tolist(),
+        'sell_lot': stocks['sell_lot'].to_numpy()[order].astype(np.int64).tolist(),
+        'net_lot': (stocks['buy_lot'] - stocks['sell_lot']).to_numpy()[order].astype(np.int64).tolist(),
+        'buy_value': stocks['buy_value'].to_numpy()[order].tolist(),
+        'sell_value': stocks['sell_value'].to_numpy()[order].tolist(),
+        'value_raw': net_value[order].tolist(),
+        'value': [format_currency(abs(v)) for v in net_value[order].tolist()],
+        'buy_avg_price': np.round(buy_avg[order], 2).tolist(),
+        'sell_avg_price': np.round(sell_avg[order], 2).tolist(),
+        'current_price': [None] * len(order),  # Will be populated by price API integration
+        'diff_pct': np.round(diff_pct[order], 2).tolist(),
+        'investor_type': stocks['investor_type'].astype(object).to_numpy()[order].tolist(),
+        'position': np.select(
+            [net_value[order] > 0, net_value[order] < 0], ['NET BUY', 'NET SELL'], 'NEUTRAL'
+        ).tolist()
+    }
+    merged_stocks = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    # Slice the sorted records back into their broker+period groups
+    group_bounds = np.searchsorted(group_index[order], np.arange(group_index.max() + 2 if len(order) else 1))
+    group_stocks = {
+        key: merged_stocks[group_bounds[i]:group_bounds[i + 1]]
+        for i, key in enumerate(stocks.drop_duplicates(group_keys)[group_keys].itertuples(index=False, name=None))
+    }
+    transactions = lines.groupby(group_keys, sort=False, observed=True).size().to_dict()
+    
+    # Broker info comes from the first page of each group
+    page_counts = pages.groupby(group_keys, sort=False).size().to_dict()
     broker_summaries = []
     
-    for group_key, group_entries in grouped_entries.items():
-        print(f"Processing group: {group_key} ({len(group_entries)} pages)")
-        broker_summary = process_grouped_entries(group_entries)
+    for page in pages.drop_duplicates(group_keys).to_dict('records'):
+        key = (page['broker'], page['period_from'], page['period_to'])
+        broker_info = {
+            'broker_code': page['broker'],
+            'broker_name': page['broker_name'] or get_broker_name(page['broker']),
+            'date_start': page['period_from'],
+            'date_end': page['period_to'],
+            'timestamp': page['timestamp'],
+            'source': page['source'],
+            'total_pages': page_counts[key]
+        }
+        
+        print(f"Processing group: {'_'.join(key)} ({broker_info['total_pages']} pages)")
+        broker_summary = build_broker_summary(broker_info, group_stocks.get(key, []), transactions.get(key, 0))
         if broker_summary:
             broker_summaries.append(broker_summary)
     
@@ -74,142 +158,19 @@ def process_grouped_entries(entries: List[Dict[str, Any]]) -> Optional[Dict[str,
     if not entries:
         return None
     
-    try:
-        # Use first entry for broker info (all should be same)
-        first_entry = entries[0]
-        broker_code = first_entry.get('broker', 'Unknown')
-        periode = first_entry.get('periode', {})
-        
-        # Extract response data from first entry
-        response_data = first_entry.get('response', {}).get('data', {})
-        broker_name = response_data.get('broker_name', get_broker_name(broker_code))
-        
-        broker_info = {
-            'broker_code': broker_code,
-            'broker_name': broker_name,
-            'date_start': periode.get('from', ''),
-            'date_end': periode.get('to', ''),
-            'timestamp': first_entry.get('timestamp', ''),
-            'source': first_entry.get('source', 'XHR'),
-            'total_pages': len(entries)
-        }
-        
-        # Collect all stocks from all pages
-        all_stocks = []
-        
-        for entry in entries:
-            response_data = entry.get('response', {}).get('data', {})
-            broker_summary = response_data.get('broker_summary', {})
-            
-            # Process buy transactions
-            brokers_buy = broker_summary.get('brokers_buy', [])
-            for buy_item in brokers_buy:
-                stock = process_buy_transaction(buy_item)
-                if stock:
-                    all_stocks.append(stock)
-            
-            # Process sell transactions
-            brokers_sell = broker_summary.get('brokers_sell', [])
-            for sell_item in brokers_sell:
-                stock = process_sell_transaction(sell_item)
-                if stock:
-                    all_stocks.append(stock)
-        
-        print(f"  Collected {len(all_stocks)} transactions from {len(entries)} pages")
-        
-        # Merge stocks with same code
-        merged_stocks = merge_stock_data(all_stocks)
-        
-        print(f"  Merged into {len(merged_stocks)} unique stocks")
-        
-        # Sort by absolute value (highest first)
-        sorted_stocks = sorted(
-            merged_stocks, 
-            key=lambda x: abs(x.get('value_raw', 0)), 
-            reverse=True
-        )
-        
-        # Enrich with current prices from Yahoo Finance
-        try:
-            sorted_stocks = enrich_stocks_with_prices(sorted_stocks)
-        except Exception as e:
-            print(f"Warning: Could not fetch stock prices: {e}")
-            # Continue without prices if fetch fails
-        
-        # Calculate summary statistics
-        total_buy_value = sum(s['buy_value'] for s in sorted_stocks)
-        total_sell_value = sum(s['sell_value'] for s in sorted_stocks)
-        net_value = total_buy_value - total_sell_value
-        
-        return {
-            'broker_info': broker_info,
-            'stocks': sorted_stocks,
-            'total_stocks': len(sorted_stocks),
-            'summary': {
-                'total_buy_value': total_buy_value,
-                'total_sell_value': total_sell_value,
-                'net_value': net_value,
-                'total_buy_value_formatted': format_currency(total_buy_value),
-                'total_sell_value_formatted': format_currency(total_sell_value),
-                'net_value_formatted': format_currency(abs(net_value)),
-                'position': 'NET BUY' if net_value > 0 else 'NET SELL' if net_value < 0 else 'NEUTRAL'
-            }
-        }
-    except Exception as e:
-        print(f"Error processing grouped entries: {e}")
-        return None
+    summaries = summarize_transaction_table(build_transaction_table(entries))['broker_summaries']
+    return summaries[0] if summaries else None
 
 
-def process_single_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Process a single XHR entry into a broker summary."""
+def build_broker_summary(
+    broker_info: Dict[str, Any],
+    sorted_stocks: List[Dict[str, Any]],
+    transactions: int
+) -> Optional[Dict[str, Any]]:
+    """Price-enriched summary of one broker+period group from its merged, sorted stocks"""
     try:
-        # Extract broker info
-        broker_code = entry.get('broker', 'Unknown')
-        periode = entry.get('periode', {})
-        
-        # Extract response data
-        response_data = entry.get('response', {}).get('data', {})
-        
-        # Get broker name from response data (more accurate)
-        broker_name = response_data.get('broker_name', get_broker_name(broker_code))
-        
-        broker_info = {
-            'broker_code': broker_code,
-            'broker_name': broker_name,
-            'date_start': periode.get('from', ''),
-            'date_end': periode.get('to', ''),
-            'timestamp': entry.get('timestamp', ''),
-            'source': entry.get('source', 'XHR')
-        }
-        
-        broker_summary = response_data.get('broker_summary', {})
-        
-        # Process buy and sell transactions
-        stocks = []
-        
-        # Process buy transactions
-        brokers_buy = broker_summary.get('brokers_buy', [])
-        for buy_item in brokers_buy:
-            stock = process_buy_transaction(buy_item)
-            if stock:
-                stocks.append(stock)
-        
-        # Process sell transactions
-        brokers_sell = broker_summary.get('brokers_sell', [])
-        for sell_item in brokers_sell:
-            stock = process_sell_transaction(sell_item)
-            if stock:
-                stocks.append(stock)
-        
-        # Merge stocks with same code
-        merged_stocks = merge_stock_data(stocks)
-        
-        # Sort by absolute value (highest first)
-        sorted_stocks = sorted(
-            merged_stocks, 
-            key=lambda x: abs(x.get('value_raw', 0)), 
-            reverse=True
-        )
+        print(f"  Collected {transactions} transactions from {broker_info['total_pages']} pages")
+        print(f"  Merged into {len(sorted_stocks)} unique stocks")
         
         # Enrich with current prices from Yahoo Finance
         try:
@@ -238,129 +199,10 @@ def process_single_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
             }
         }
     except Exception as e:
-        print(f"Error processing entry: {e}")
-        return None
-
-
-def process_buy_transaction(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Process a buy transaction item."""
-    try:
-        stock_code = item.get('netbs_stock_code', '')
-        lot = parse_number(item.get('blot', '0'))
-        value = parse_number(item.get('bval', '0'))
-        avg_price = parse_number(item.get('netbs_buy_avg_price', '0'))
-        
-        return {
-            'stock_code': stock_code,
-            'transaction_type': 'BUY',
-            'lot': lot,
-            'value_raw': value,
-            'avg_price': avg_price,
-            'investor_type': item.get('type', 'Unknown')
-        }
-    except Exception as e:
-        print(f"Error processing buy transaction: {e}")
-        return None
-
-
-def process_sell_transaction(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Process a sell transaction item."""
-    try:
-        stock_code = item.get('netbs_stock_code', '')
-        lot = parse_number(item.get('slot', '0'))
-        value = parse_number(item.get('sval', '0'))
-        avg_price = parse_number(item.get('netbs_sell_avg_price', '0'))
-        
-        return {
-            'stock_code': stock_code,
-            'transaction_type': 'SELL',
-            'lot': lot,
-            'value_raw': value,
-            'avg_price': avg_price,
-            'investor_type': item.get('type', 'Unknown')
-        }
-    except Exception as e:
-        print(f"Error processing sell transaction: {e}")
+        print(f"Error processing grouped entries: {e}")
         return None
 
 
-def merge_stock_data(stocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """
-    Merge buy and sell transactions for the same stock.
-    Calculate net position and percentage change.
-    """
-    stock_map = {}
-    
-    for stock in stocks:
-        code = stock['stock_code']
-        
-        if code not in stock_map:
-            stock_map[code] = {
-                'stock_code': code,
-                'buy_lot': 0,
-                'sell_lot': 0,
-                'buy_value': 0,
-                'sell_value': 0,
-                'buy_avg_price': 0,
-                'sell_avg_price': 0,
-                'investor_type': stock.get('investor_type', 'Unknown')
-            }
-        
-        if stock['transaction_type'] == 'BUY':
-            stock_map[code]['buy_lot'] += stock['lot']
-            stock_map[code]['buy_value'] += stock['value_raw']
-            stock_map[code]['buy_avg_price'] = stock['avg_price']
-        else:  # SELL
-            stock_map[code]['sell_lot'] += abs(stock['lot'])
-            stock_map[code]['sell_value'] += abs(stock['value_raw'])
-            stock_map[code]['sell_avg_price'] = stock['avg_price']
-    
-    # Calculate net positions
-    result = []
-    for code, data in stock_map.items():
-        net_lot = data['buy_lot'] - data['sell_lot']
-        net_value = data['buy_value'] - data['sell_value']
-        
-        # Calculate percentage change
-        diff_pct = 0
-        if data['buy_avg_price'] > 0 and data['sell_avg_price'] > 0:
-            diff_pct = ((data['sell_avg_price'] - data['buy_avg_price']) / data['buy_avg_price']) * 100
-        
-        result.append({
-            'stock_code': code,
-            'buy_lot': int(data['buy_lot']),
-            'sell_lot': int(data['sell_lot']),
-            'net_lot': int(net_lot),
-            'buy_value': data['buy_value'],
-            'sell_value': data['sell_value'],
-            'value_raw': net_value,
-            'value': format_currency(abs(net_value)),
-            'buy_avg_price': round(data['buy_avg_price'], 2),
-            'sell_avg_price': round(data['sell_avg_price'], 2),
-            'current_price': None,  # Will be populated by price API integration
-            'diff_pct': round(diff_pct, 2),
-            'investor_type': data['investor_type'],
-            'position': 'NET BUY' if net_value > 0 else 'NET SELL' if net_value < 0 else 'NEUTRAL'
-        })
-    
-    return result
-
-
-def parse_number(value: Any) -> float:
-    """Parse number from string or scientific notation."""
-    if isinstance(value, (int, float)):
-        return float(value)
-    
-    if isinstance(value, str):
-        try:
-            # Handle scientific notation
-            return float(value)
-        except ValueError:
-            return 0.0
-    
-    return 0.0
-
-
 def format_currency(amount: float) -> str:
     """Format currency in Indonesian Rupiah."""
     if amount >= 1_000_000_000_000:  # Trillion
@@ -1,7 +1,9 @@
 import yfinance as yf
+from api.helper.rate_limiter import yf_limiter
 from typing import Dict, List, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from api.service_stock.master_data import get_multiple_prices
+from api.service_stock.master_data.delisted_registry import delisted_registry, is_delisted_error
 import time
 
 
@@ -16,6 +18,9 @@ def get_stock_price(stock_code: str) -> Optional[float]:
     Returns:
         Current stock price or None if not found
     """
+    if delisted_registry.is_blocked(stock_code):
+        return None
+    
     try:
         # Add .JK suffix for Indonesian stocks
         ticker_symbol = f"{stock_code}.JK"
@@ -24,20 +29,25 @@ def get_stock_price(stock_code: str) -> Optional[float]:
         stock = yf.Ticker(ticker_symbol)
         
         # Get current price from info
-        info = stock.info
+        info = yf_limiter.call(lambda: stock.info)
         current_price = info.get('currentPrice') or info.get('regularMarketPrice')
         
         if current_price:
+            delisted_registry.mark_success(stock_code)
             return float(current_price)
         
         # Fallback: try to get from history
-        hist = stock.history(period='1d')
+        hist = yf_limiter.call(stock.history, period='1d')
         if not hist.empty:
+            delisted_registry.mark_success(stock_code)
             return float(hist['Close'].iloc[-1])
         
+        delisted_registry.mark_failed(stock_code, 'no_price_data')
         return None
         
     except Exception as e:
+        if is_delisted_error(e):
+            delisted_registry.mark_failed(stock_code, 'delisted')
         print(f"Error fetching price for {stock_code}: {e}")
         return None
 
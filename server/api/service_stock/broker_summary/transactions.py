@@ -0,0 +1,195 @@
+"""
+Broker Summary Transaction Table
+Converts XHR broker summary pages once into a typed columnar table
+(one row per buy/sell line) that the summary builder and the accumulation
+detector aggregate with group-bys instead of walking the JSON themselves
+"""
+
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+
+# Raw column lists are converted to typed chunks every CHUNK_ROWS rows
+CHUNK_ROWS = 50_000
+
+PAGE_COLUMNS = ['page', 'broker', 'period_from', 'period_to', 'broker_name', 'timestamp', 'source', 'has_summary']
+ROW_COLUMNS = ['page', 'broker', 'period_from', 'period_to', 'stock', 'side', 'lot', 'value', 'avg_price', 'investor_type']
+
+CATEGORY_COLUMNS = ['broker', 'period_from', 'period_to', 'stock', 'side', 'investor_type']
+
+# side -> (rows key, lot field, value field, avg price field)
+SIDES = (
+    ('BUY', 'brokers_buy', 'blot', 'bval', 'netbs_buy_avg_price'),
+    ('SELL', 'brokers_sell', 'slot', 'sval', 'netbs_sell_avg_price'),
+)
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else ''
+
+
+def _to_float(values: List[Any]) -> np.ndarray:
+    """Numeric strings as float64; anything unparseable becomes 0"""
+    try:
+        # Fast path: numpy parses numeric strings in C
+        array = np.asarray(values, dtype=np.float64)
+        array[~np.isfinite(array)] = 0.0
+        return array
+    except (ValueError, TypeError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(0.0).to_numpy(np.float64)
+
+
+class TransactionTable:
+    """
+    pages: one row per XHR entry (broker, period, broker name, ...)
+    rows: one row per buy/sell line; text columns are categorical, lot/value/avg_price
+          are float64 as sent (sell lines are negative), unparseable numbers are 0
+    Missing broker/period/stock fields are ''.
+    """
+
+    def __init__(self, pages: pd.DataFrame, rows: pd.DataFrame):
+        self.pages = pages
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class TransactionTableBuilder:
+    """Folds XHR entries in one at a time (e.g. from a streamed upload)"""
+
+    def __init__(self):
+        self._pages: Dict[str, List[Any]] = {name: [] for name in PAGE_COLUMNS}
+        self._rows: Dict[str, List[Any]] = {name: [] for name in ROW_COLUMNS}
+        self._chunks: List[pd.DataFrame] = []
+
+    def add(self, entry: Dict[str, Any]):
+        page = len(self._pages['page'])
+        broker = _text(entry.get('broker'))
+        periode = entry.get('periode') or {}
+        period_from = _text(periode.get('from'))
+        period_to = _text(periode.get('to'))
+        response_data = (entry.get('response') or {}).get('data') or {}
+        broker_summary = response_data.get('broker_summary') or {}
+
+        pages = self._pages
+        pages['page'].append(page)
+        pages['broker'].append(broker)
+        pages['period_from'].append(period_from)
+        pages['period_to'].append(period_to)
+        pages['broker_name'].append(response_data.get('broker_name') or '')  # str column, never NaN
+        pages['timestamp'].append(entry.get('timestamp', ''))
+        pages['source'].append(entry.get('source', 'XHR'))
+        pages['has_summary'].append(bool(broker_summary))
+
+        rows = self._rows
+        for side, rows_key, lot_key, value_key, price_key in SIDES:
+            items = broker_summary.get(rows_key) or []
+            if not items:
+                continue
+
+            count = len(items)
+            rows['page'].extend([page] * count)
+            rows['broker'].extend([broker] * count)
+            rows['period_from'].extend([period_from] * count)
+            rows['period_to'].extend([period_to] * count)
+            rows['side'].extend([side] * count)
+            rows['stock'].extend([item.get('netbs_stock_code') or '' for item in items])
+            rows['lot'].extend([item.get(lot_key) for item in items])
+            rows['value'].extend([item.get(value_key) for item in items])
+            rows['avg_price'].extend([item.get(price_key) for item in items])
+            rows['investor_type'].extend([item.get('type', 'Unknown') for item in items])
+
+        if len(rows['page']) >= CHUNK_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows['page']:
+            return
+
+        chunk = pd.DataFrame({
+            **{column: pd.Series(self._rows[column], dtype=object) for column in CATEGORY_COLUMNS},
+            'page': np.asarray(self._rows['page'], dtype=np.int64),
+            'lot': _to_float(self._rows['lot']),
+            'value': _to_float(self._rows['value']),
+            'avg_price': _to_float(self._rows['avg_price'])
+        })
+
+        self._chunks.append(chunk)
+        self._rows = {name: [] for name in ROW_COLUMNS}
+
+    def build(self) -> TransactionTable:
+        self._flush()
+
+        pages = pd.DataFrame(self._pages, columns=PAGE_COLUMNS)
+        if self._chunks:
+            rows = pd.concat(self._chunks, ignore_index=True)
+        else:
+            rows = pd.DataFrame({name: pd.Series(dtype=object) for name in ROW_COLUMNS})
+            rows = rows.astype({'page': np.int64, 'lot': np.float64, 'value': np.float64, 'avg_price': np.float64})
+
+        # Dictionary-encode repeating text once; group-bys then run on integer codes
+        for column in CATEGORY_COLUMNS:
+            rows[column] = rows[column].astype('category')
+
+        return TransactionTable(pages, rows)
+
+
+def _fill_blank(values: pd.Series, default) -> pd.Series:
+    """Categorical column with '' replaced by default (a scalar or a same-length series)"""
+    if '' not in values.cat.categories:
+        return values
+    if isinstance(default, str) and default not in values.cat.categories:
+        return values.cat.rename_categories({'': default})
+    return values.astype(object).where(values != '', default).astype('category')
+
+
+def transaction_flows(table: TransactionTable) -> pd.DataFrame:
+    """
+    Stock lines of a transaction table with signed buy/sell volume and value
+    columns (sell lines are negative as sent); lines without a stock code are dropped.
+
+    period_from/period_to fall back to 'unknown'/period_from, broker to 'UNKNOWN'.
+    """
+    rows = table.rows[(table.rows['stock'] != '').to_numpy()]
+    is_buy = (rows['side'] == 'BUY').to_numpy()
+    lot = rows['lot'].to_numpy()
+    value = rows['value'].to_numpy()
+    avg_price = rows['avg_price'].to_numpy()
+    period_from = _fill_blank(rows['period_from'], 'unknown')
+
+    return pd.DataFrame({
+        'page': rows['page'],
+        'broker': _fill_blank(rows['broker'], 'UNKNOWN'),
+        'period_from': period_from,
+        'period_to': _fill_blank(rows['period_to'], period_from.astype(object)),
+        'stock': rows['stock'],
+        'buy_volume': np.where(is_buy, lot, 0.0),
+        'buy_value': np.where(is_buy, value, 0.0),
+        'sell_volume': np.where(is_buy, 0.0, lot),
+        'sell_value': np.where(is_buy, 0.0, value),
+        'buy_avg_price': np.where(is_buy, avg_price, np.nan),
+        'sell_avg_price': np.where(is_buy, np.nan, avg_price),
+        'investor_type': rows['investor_type']
+    }).reset_index(drop=True)
+
+
+def period_page_counts(table: TransactionTable) -> Dict[tuple, int]:
+    """Pages with a broker_summary per (broker, period_from, period_to), same fallbacks as transaction_flows()"""
+    pages = table.pages[table.pages['has_summary']]
+    period_from = pages['period_from'].replace('', 'unknown')
+    return pd.DataFrame({
+        'broker': pages['broker'].replace('', 'UNKNOWN'),
+        'period_from': period_from,
+        'period_to': pages['period_to'].where(pages['period_to'] != '', period_from)
+    }).groupby(['broker', 'period_from', 'period_to'], sort=False).size().to_dict()
+
+
+def build_transaction_table(entries: Iterable[Dict[str, Any]]) -> TransactionTable:
+    """Transaction table of a list (or stream) of XHR entries"""
+    builder = TransactionTableBuilder()
+    for entry in entries:
+        builder.add(entry)
+    return builder.build()
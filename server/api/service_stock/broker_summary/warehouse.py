@@ -0,0 +1,769 @@
+"""
+Broker Flow Warehouse
+Every ingested broker summary page kept on disk, partitioned by broker and
+period (the trading date for daily captures). Each partition is one .npy
+structured array of per-stock flows; a SQLite manifest holds the stock
+dictionary, the partition list (indexed by date) and a stock -> partition index.
+
+Daily partitions also feed daily/weekly/monthly rollups (net flow per broker,
+stock and bucket) that are updated incrementally at ingest, so a date-range
+query sums whole months and weeks plus the ragged days at either end.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from api.service_stock.broker_summary.transactions import (
+    TransactionTable,
+    period_page_counts,
+    transaction_flows
+)
+
+
+WAREHOUSE_DIR = Path(__file__).parent.parent.parent / "data" / "broker_flows"
+
+# Per-stock flows of one broker and period; stock/investor_type are dictionary ids
+FLOW_DTYPE = np.dtype([
+    ('stock', 'u4'),
+    ('buy_lot', 'i8'),
+    ('sell_lot', 'i8'),
+    ('buy_value', 'i8'),
+    ('sell_value', 'i8'),
+    ('buy_avg_price', 'f8'),
+    ('sell_avg_price', 'f8'),
+    ('investor_type', 'u1'),
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dictionary (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (kind, value)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_dictionary_id ON dictionary (kind, id);
+CREATE TABLE IF NOT EXISTS partitions (
+    id INTEGER PRIMARY KEY,
+    broker TEXT NOT NULL,
+    period_from TEXT NOT NULL,
+    period_to TEXT NOT NULL,
+    path TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    ingested_at TEXT NOT NULL,
+    UNIQUE (broker, period_from, period_to)
+);
+CREATE INDEX IF NOT EXISTS idx_partitions_date ON partitions (period_from, period_to);
+CREATE TABLE IF NOT EXISTS partition_stocks (
+    stock INTEGER NOT NULL,
+    partition INTEGER NOT NULL,
+    PRIMARY KEY (stock, partition)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_partition_stocks_partition ON partition_stocks (partition);
+CREATE TABLE IF NOT EXISTS rollups (
+    grain TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    stock INTEGER NOT NULL,
+    broker TEXT NOT NULL,
+    buy_lot INTEGER NOT NULL,
+    sell_lot INTEGER NOT NULL,
+    buy_value INTEGER NOT NULL,
+    sell_value INTEGER NOT NULL,
+    days INTEGER NOT NULL,
+    PRIMARY KEY (grain, stock, bucket, broker)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollups_bucket ON rollups (grain, bucket, broker);
+"""
+
+PARTITION_KEYS = ['broker', 'period_from', 'period_to']
+
+# Rollup grains; a bucket is named by its first day (week starts Monday)
+GRAINS = ('daily', 'weekly', 'monthly')
+ROLLUP_COLUMNS = ['buy_lot', 'sell_lot', 'buy_value', 'sell_value', 'days']
+
+UPSERT_ROLLUP = (
+    "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (grain, stock, bucket, broker) DO UPDATE SET "
+    + ", ".join(f"{c} = {c} + excluded.{c}" for c in ROLLUP_COLUMNS)
+)
+
+
+def _path_part(value: str) -> str:
+    """Broker code / date usable as a file name"""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', value) or '_'
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD, got {value!r}")
+
+
+def _month_end(day: date) -> date:
+    next_month = day.replace(day=28) + timedelta(days=4)
+    return next_month - timedelta(days=next_month.day)
+
+
+def _extend_segment(segments: List[list], grain: str, bucket: date):
+    """Append a bucket; buckets are added in date order, so a same-grain tail is contiguous"""
+    if segments and segments[-1][0] == grain:
+        segments[-1][2] = bucket
+    else:
+        segments.append([grain, bucket, bucket])
+
+
+def _cover_days(start: date, end: date, segments: List[list]):
+    """Whole Monday-Sunday weeks inside [start, end] as weekly buckets, the rest as days"""
+    cursor = start
+    while cursor <= end:
+        if cursor.weekday() == 0 and cursor + timedelta(days=6) <= end:
+            _extend_segment(segments, 'weekly', cursor)
+            cursor += timedelta(days=7)
+        else:
+            _extend_segment(segments, 'daily', cursor)
+            cursor += timedelta(days=1)
+
+
+def cover_range(start: date, end: date) -> List[tuple]:
+    """
+    Fewest rollup buckets that exactly tile [start, end]: whole months, then
+    whole weeks, then single days. Returns (grain, first_bucket, last_bucket)
+    runs of consecutive buckets as YYYY-MM-DD strings.
+    """
+    first_month = start if start.day == 1 else _month_end(start) + timedelta(days=1)
+    last_month = end.replace(day=1) if _month_end(end) == end else (end.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+    segments: List[list] = []
+    if first_month > last_month:
+        _cover_days(start, end, segments)
+    else:
+        _cover_days(start, first_month - timedelta(days=1), segments)
+        month = first_month
+        while month <= last_month:
+            _extend_segment(segments, 'monthly', month)
+            month = _month_end(month) + timedelta(days=1)
+        _cover_days(_month_end(last_month) + timedelta(days=1), end, segments)
+
+    return [(grain, first.isoformat(), last.isoformat()) for grain, first, last in segments]
+
+
+def _bucket_starts(days: pd.Series) -> Dict[str, pd.Series]:
+    """YYYY-MM-DD bucket name of each date per grain (computed once per distinct date)"""
+    unique = pd.Series(days.unique())
+    parsed = pd.to_datetime(unique, format='%Y-%m-%d')
+    names = {
+        'weekly': (parsed - pd.to_timedelta(parsed.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d'),
+        'monthly': parsed.dt.strftime('%Y-%m-01')
+    }
+    return {
+        'daily': days,
+        **{grain: days.map(dict(zip(unique, values))) for grain, values in names.items()}
+    }
+
+
+def _is_trading_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+class BrokerFlowWarehouse:
+    """
+    - ingest_table(): write one partition per (broker, period) of an upload;
+      identical content is skipped, changed content replaces the partition
+    - load_flows(): decoded flows over brokers / stocks / a date window
+    - net_flows() / flow_series() / top_brokers(): net buy/sell queries on the rollups
+    """
+
+    def __init__(self, root: Path = WAREHOUSE_DIR):
+        self.root = root
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._rollups_checked = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.root / "manifest.sqlite3", timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _partition_path(self, broker: str, period_from: str, period_to: str) -> str:
+        name = period_from if period_from == period_to else f"{period_from}_{period_to}"
+        return f"{_path_part(broker)}/{_path_part(name)}.npy"
+
+    # ---------- Dictionary encoding ----------
+
+    def _encode(self, conn: sqlite3.Connection, kind: str, values: Iterable[str]) -> Dict[str, int]:
+        """Ids for values, adding new ones (called inside the write transaction)"""
+        ids = dict(conn.execute("SELECT value, id FROM dictionary WHERE kind = ?", (kind,)).fetchall())
+        next_id = max(ids.values(), default=-1) + 1
+
+        new_rows = []
+        for value in values:
+            if value not in ids:
+                ids[value] = next_id
+                new_rows.append((kind, next_id, value))
+                next_id += 1
+        conn.executemany("INSERT INTO dictionary VALUES (?, ?, ?)", new_rows)
+        return ids
+
+    def _decode(self, kind: str) -> Dict[int, str]:
+        return dict(self._connect().execute("SELECT id, value FROM dictionary WHERE kind = ?", (kind,)).fetchall())
+
+    # ---------- Writes ----------
+
+    def ingest_table(self, table: TransactionTable) -> Dict[str, int]:
+        """Store every (broker, period) of an upload; returns partitions written/unchanged"""
+        per_stock = transaction_flows(table).groupby(PARTITION_KEYS + ['stock'], sort=False, observed=True).agg(
+            buy_volume=('buy_volume', 'sum'),
+            buy_value=('buy_value', 'sum'),
+            sell_volume=('sell_volume', 'sum'),
+            sell_value=('sell_value', 'sum'),
+            buy_avg_price=('buy_avg_price', 'last'),
+            sell_avg_price=('sell_avg_price', 'last'),
+            investor_type=('investor_type', 'first')
+        ).reset_index()
+
+        stats = {'partitions_written': 0, 'partitions_unchanged': 0, 'rows': len(per_stock)}
+        if per_stock.empty:
+            return stats
+
+        page_counts = period_page_counts(table)
+        now = datetime.now().isoformat()
+        self._ensure_rollups()
+
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                stock_ids = self._encode(conn, 'stock', per_stock['stock'].astype(object).unique())
+                type_ids = self._encode(conn, 'investor_type', per_stock['investor_type'].astype(object).unique())
+                if len(type_ids) > np.iinfo(FLOW_DTYPE['investor_type']).max + 1:
+                    raise ValueError("Too many investor types for the partition format")
+
+                per_stock['stock_id'] = per_stock['stock'].astype(object).map(stock_ids).to_numpy(np.uint32)
+                per_stock['type_id'] = per_stock['investor_type'].astype(object).map(type_ids).to_numpy(np.uint8)
+
+                index_rows = []
+                rollup_deltas = []
+                for key, group in per_stock.groupby(PARTITION_KEYS, sort=False, observed=True):
+                    flows = self._to_partition(group)
+                    checksum = hashlib.sha1(flows.tobytes()).hexdigest()
+                    path = self._partition_path(*key)
+
+                    existing = conn.execute(
+                        "SELECT id, checksum FROM partitions WHERE broker = ? AND period_from = ? AND period_to = ?", key
+                    ).fetchone()
+                    if existing and existing[1] == checksum and (self.root / path).exists():
+                        stats['partitions_unchanged'] += 1
+                        continue
+
+                    self._save(path, flows)
+                    values = (path, len(flows), page_counts.get(key, 0), checksum, now)
+                    if key[1] == key[2] and _is_trading_date(key[1]):
+                        rollup_deltas.append(self._daily_delta(conn, key[0], key[1], flows, bool(existing)))
+
+                    if existing:
+                        partition_id = existing[0]
+                        conn.execute(
+                            "UPDATE partitions SET path = ?, rows = ?, pages = ?, checksum = ?, ingested_at = ? WHERE id = ?",
+                            (*values, partition_id)
+                        )
+                        conn.execute("DELETE FROM partition_stocks WHERE partition = ?", (partition_id,))
+                    else:
+                        partition_id = conn.execute(
+                            "INSERT INTO partitions (broker, period_from, period_to, path, rows, pages, checksum, ingested_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (*key, *values)
+                        ).lastrowid
+                    index_rows.extend((stock, partition_id) for stock in flows['stock'].tolist())
+                    stats['partitions_written'] += 1
+
+                conn.executemany("INSERT INTO partition_stocks VALUES (?, ?)", index_rows)
+                self._apply_rollup_deltas(conn, rollup_deltas)
+
+        print(f"Broker flow warehouse: {stats['partitions_written']} partitions written, "
+              f"{stats['partitions_unchanged']} unchanged")
+        return stats
+
+    # ---------- Rollups ----------
+
+    @staticmethod
+    def _flow_frame(broker: str, day: str, flows: np.ndarray, sign: int) -> pd.DataFrame:
+        return pd.DataFrame({
+            'day': day,
+            'broker': broker,
+            'stock': flows['stock'].astype(np.int64),
+            **{column: sign * flows[column] for column in ('buy_lot', 'sell_lot', 'buy_value', 'sell_value')},
+            'days': np.full(len(flows), sign, dtype=np.int64)
+        })
+
+    def _daily_delta(self, conn: sqlite3.Connection, broker: str, day: str,
+                     flows: np.ndarray, replacing: bool) -> pd.DataFrame:
+        """
+        Rollup change of writing one daily partition. A replaced partition is
+        taken back out using its daily rollup rows, which hold exactly its content.
+        """
+        delta = self._flow_frame(broker, day, flows, 1)
+        if not replacing:
+            return delta
+
+        old = conn.execute(
+            "SELECT stock, buy_lot, sell_lot, buy_value, sell_value FROM rollups "
+            "WHERE grain = 'daily' AND bucket = ? AND broker = ?",
+            (day, broker)
+        ).fetchall()
+        if not old:
+            return delta
+
+        old_flows = np.array(old, dtype=np.int64)
+        old_delta = pd.DataFrame({
+            'day': day,
+            'broker': broker,
+            'stock': old_flows[:, 0],
+            **{column: -old_flows[:, i + 1] for i, column in enumerate(('buy_lot', 'sell_lot', 'buy_value', 'sell_value'))},
+            'days': np.full(len(old_flows), -1, dtype=np.int64)
+        })
+        return pd.concat([delta, old_delta], ignore_index=True)
+
+    def _apply_rollup_deltas(self, conn: sqlite3.Connection, deltas: List[pd.DataFrame]):
+        """Add daily deltas to every grain (inside the write transaction)"""
+        if not deltas:
+            return
+
+        delta = pd.concat(deltas, ignore_index=True)
+        buckets = _bucket_starts(delta['day'])
+        for grain in GRAINS:
+            # Sorted in primary key order so the upserts walk the B-tree sequentially
+            changes = delta.assign(bucket=buckets[grain]).groupby(
+                ['stock', 'bucket', 'broker']
+            )[ROLLUP_COLUMNS].sum().reset_index()
+            changes = changes[(changes[ROLLUP_COLUMNS] != 0).any(axis=1)]
+
+            conn.executemany(UPSERT_ROLLUP, zip(
+                [grain] * len(changes),
+                changes['bucket'].tolist(),
+                changes['stock'].tolist(),
+                changes['broker'].tolist(),
+                *(changes[column].tolist() for column in ROLLUP_COLUMNS)
+            ))
+
+            # A stock that left a bucket (a replaced day no longer lists it) leaves no row behind
+            removed = changes[changes['days'] < 0]
+            conn.executemany(
+                "DELETE FROM rollups WHERE grain = ? AND stock = ? AND bucket = ? AND broker = ? AND days = 0",
+                zip([grain] * len(removed), removed['stock'].tolist(), removed['bucket'].tolist(), removed['broker'].tolist())
+            )
+
+    def _ensure_rollups(self):
+        """Build the rollups once for a warehouse that has daily partitions but no rollups yet"""
+        if self._rollups_checked:
+            return
+
+        with self._write_lock:
+            if self._rollups_checked:
+                return
+            conn = self._connect()
+            has_rollups = conn.execute("SELECT EXISTS (SELECT 1 FROM rollups)").fetchone()[0]
+            has_daily = conn.execute("SELECT EXISTS (SELECT 1 FROM partitions WHERE period_from = period_to)").fetchone()[0]
+            if has_daily and not has_rollups:
+                self._rebuild_rollups(conn)
+            self._rollups_checked = True
+
+    def _rebuild_rollups(self, conn: sqlite3.Connection):
+        """Recompute every rollup from the daily partitions (write lock held)"""
+        partitions = conn.execute(
+            "SELECT broker, period_from, path FROM partitions WHERE period_from = period_to"
+        ).fetchall()
+
+        deltas = []
+        for broker, day, path in partitions:
+            if not _is_trading_date(day):
+                continue
+            try:
+                flows = np.load(self.root / path, allow_pickle=False)
+            except Exception as e:
+                print(f"Error loading broker flow partition {path}: {e}")
+                continue
+            deltas.append(self._flow_frame(broker, day, flows, 1))
+
+        with conn:
+            conn.execute("DELETE FROM rollups")
+            self._apply_rollup_deltas(conn, deltas)
+        print(f"Broker flow rollups rebuilt from {len(deltas)} daily partitions")
+
+    @staticmethod
+    def _to_partition(group: pd.DataFrame) -> np.ndarray:
+        """Structured array sorted by stock id; lots and values as integer magnitudes"""
+        flows = np.empty(len(group), dtype=FLOW_DTYPE)
+        flows['stock'] = group['stock_id'].to_numpy()
+        flows['buy_lot'] = np.rint(np.abs(group['buy_volume'].to_numpy()))
+        flows['sell_lot'] = np.rint(np.abs(group['sell_volume'].to_numpy()))
+        flows['buy_value'] = np.rint(np.abs(group['buy_value'].to_numpy()))
+        flows['sell_value'] = np.rint(np.abs(group['sell_value'].to_numpy()))
+        flows['buy_avg_price'] = group['buy_avg_price'].fillna(0.0).to_numpy()
+        flows['sell_avg_price'] = group['sell_avg_price'].fillna(0.0).to_numpy()
+        flows['investor_type'] = group['type_id'].to_numpy()
+        return flows[np.argsort(flows['stock'], kind='stable')]
+
+    def _save(self, path: str, flows: np.ndarray):
+        """Atomically write a partition (readers never see a half-written file)"""
+        full_path = self.root / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = full_path.with_suffix('.tmp.npy')
+        np.save(tmp_path, flows, allow_pickle=False)
+        os.replace(tmp_path, full_path)
+
+    # ---------- Reads ----------
+
+    def read_partition(self, broker: str, period_from: str, period_to: Optional[str] = None) -> Optional[np.ndarray]:
+        """Raw partition array (stock ids not decoded) or None"""
+        row = self._connect().execute(
+            "SELECT path FROM partitions WHERE broker = ? AND period_from = ? AND period_to = ?",
+            (broker, period_from, period_to or period_from)
+        ).fetchone()
+        if not row:
+            return None
+
+        try:
+            return np.load(self.root / row[0], allow_pickle=False)
+        except Exception as e:
+            print(f"Error loading broker flow partition {row[0]}: {e}")
+            return None
+
+    def list_partitions(
+        self,
+        brokers: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        stock_code: Optional[str] = None,
+        daily_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Partitions in a window (by period start), optionally only those containing a stock"""
+        clauses, params = [], []
+        if brokers:
+            clauses.append(f"p.broker IN ({', '.join('?' * len(brokers))})")
+            params.extend(brokers)
+        if start_date:
+            clauses.append("p.period_from >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("p.period_from <= ?")
+            params.append(end_date)
+        if daily_only:
+            clauses.append("p.period_from = p.period_to")
+
+        source = "partitions p"
+        if stock_code:
+            # Stock index: only partitions that contain the stock
+            source = (
+                "partition_stocks s JOIN dictionary d ON d.kind = 'stock' AND d.id = s.stock "
+                "JOIN partitions p ON p.id = s.partition"
+            )
+            clauses.append("d.value = ?")
+            params.append(stock_code)
+
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        columns = ('broker', 'period_from', 'period_to', 'path', 'rows', 'pages', 'ingested_at')
+        rows = self._connect().execute(
+            f"SELECT {', '.join('p.' + c for c in columns)} FROM {source}{where} ORDER BY p.period_from, p.broker",
+            params
+        ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def load_flows(
+        self,
+        brokers: Optional[List[str]] = None,
+        stock_codes: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        daily_only: bool = True
+    ) -> pd.DataFrame:
+        """
+        Decoded per-stock flows of every matching partition: one row per
+        broker, period and stock (lots/values are magnitudes)
+        """
+        stock_names = self._decode('stock')
+        type_names = self._decode('investor_type')
+
+        stock_ids = None
+        if stock_codes:
+            wanted = set(stock_codes)
+            stock_ids = np.array([sid for sid, code in stock_names.items() if code in wanted], dtype=np.uint32)
+
+        partitions = self.list_partitions(
+            brokers, start_date, end_date,
+            stock_code=stock_codes[0] if stock_codes and len(stock_codes) == 1 else None,
+            daily_only=daily_only
+        )
+
+        frames = []
+        for partition in partitions:
+            try:
+                flows = np.load(self.root / partition['path'], allow_pickle=False)
+            except Exception as e:
+                print(f"Error loading broker flow partition {partition['path']}: {e}")
+                continue
+
+            if stock_ids is not None:
+                flows = flows[np.isin(flows['stock'], stock_ids)]
+            if len(flows) == 0:
+                continue
+
+            frame = pd.DataFrame(flows)
+            frame.insert(0, 'broker', partition['broker'])
+            frame.insert(1, 'period_from', partition['period_from'])
+            frame.insert(2, 'period_to', partition['period_to'])
+            frames.append(frame)
+
+        columns = PARTITION_KEYS + list(FLOW_DTYPE.names)
+        if not frames:
+            return pd.DataFrame(columns=columns)
+
+        result = pd.concat(frames, ignore_index=True)
+        result['stock'] = result['stock'].map(stock_names)
+        result['investor_type'] = result['investor_type'].map(type_names)
+        return result[columns]
+
+    # ---------- Net flow queries (rollups) ----------
+
+    def _stock_ids(self, stock_codes: List[str]) -> List[int]:
+        conn = self._connect()
+        return [
+            row[0] for row in conn.execute(
+                f"SELECT id FROM dictionary WHERE kind = 'stock' AND value IN ({', '.join('?' * len(stock_codes))})",
+                stock_codes
+            ).fetchall()
+        ]
+
+    def _resolve_window(self, start_date: Optional[str], end_date: Optional[str]) -> Optional[tuple]:
+        """(start, end) dates of a query; open bounds default to the first/last daily rollup"""
+        start = _parse_date(start_date, 'start_date')
+        end = _parse_date(end_date, 'end_date')
+        if start is None or end is None:
+            first, last = self._connect().execute(
+                "SELECT MIN(bucket), MAX(bucket) FROM rollups WHERE grain = 'daily'"
+            ).fetchone()
+            if first is None:
+                return None
+            start = start or date.fromisoformat(first)
+            end = end or date.fromisoformat(last)
+        if start > end:
+            raise ValueError("start_date must not be after end_date")
+        return start, end
+
+    @staticmethod
+    def _filter_clauses(brokers: Optional[List[str]], stock_ids: Optional[List[int]]) -> tuple:
+        clauses, params = [], []
+        if brokers:
+            clauses.append(f"broker IN ({', '.join('?' * len(brokers))})")
+            params.extend(brokers)
+        if stock_ids is not None:
+            clauses.append(f"stock IN ({', '.join('?' * len(stock_ids))})")
+            params.extend(stock_ids)
+        return clauses, params
+
+    @staticmethod
+    def _flow_row(buy_lot: int, sell_lot: int, buy_value: int, sell_value: int) -> Dict[str, int]:
+        return {
+            'buy_lot': buy_lot,
+            'sell_lot': sell_lot,
+            'net_lot': buy_lot - sell_lot,
+            'buy_value': buy_value,
+            'sell_value': sell_value,
+            'net_value': buy_value - sell_value
+        }
+
+    def net_flows(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        brokers: Optional[List[str]] = None,
+        stock_codes: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Net buy/sell lots and value per broker and stock over a date window
+        (daily partitions only), largest absolute net value first.
+
+        The window is tiled with whole monthly and weekly rollups plus the
+        remaining days, so the rows read grow with months, not trading days.
+        """
+        self._ensure_rollups()
+        window = self._resolve_window(start_date, end_date)
+        result = {
+            'window': {
+                'start_date': window[0].isoformat() if window else start_date,
+                'end_date': window[1].isoformat() if window else end_date
+            },
+            'flows': []
+        }
+        if window is None:
+            return result
+
+        stock_ids = self._stock_ids(stock_codes) if stock_codes else None
+        if stock_ids == []:
+            return result
+
+        segments = cover_range(*window)
+        clauses, params = self._filter_clauses(brokers, stock_ids)
+        clauses.append("(" + " OR ".join("(grain = ? AND bucket BETWEEN ? AND ?)" for _ in segments) + ")")
+        params.extend(value for segment in segments for value in segment)
+
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT broker, stock, SUM(buy_lot), SUM(sell_lot), SUM(buy_value), SUM(sell_value), SUM(days) "
+            f"FROM rollups WHERE {' AND '.join(clauses)} GROUP BY broker, stock",
+            params
+        ).fetchall()
+
+        stock_names = self._decode('stock')
+        flows = [
+            {
+                'broker_code': broker,
+                'stock_code': stock_names.get(stock),
+                **self._flow_row(buy_lot, sell_lot, buy_value, sell_value),
+                'active_days': days
+            }
+            for broker, stock, buy_lot, sell_lot, buy_value, sell_value, days in rows
+        ]
+        flows.sort(key=lambda x: abs(x['net_value']), reverse=True)
+
+        result['flows'] = flows[:limit] if limit else flows
+        return result
+
+    def flow_series(
+        self,
+        stock_code: Optional[str] = None,
+        broker: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        granularity: str = 'daily'
+    ) -> Dict[str, Any]:
+        """
+        Net flow per daily/weekly/monthly bucket of a stock and/or broker
+        (summed over the other). Buckets are whole, so the first one may start
+        before start_date.
+        """
+        if granularity not in GRAINS:
+            raise ValueError(f"granularity must be one of {', '.join(GRAINS)}")
+
+        self._ensure_rollups()
+        window = self._resolve_window(start_date, end_date)
+        result = {'granularity': granularity, 'window': None, 'series': []}
+        if window is None:
+            return result
+
+        stock_ids = self._stock_ids([stock_code]) if stock_code else None
+        if stock_ids == []:
+            return result
+
+        first_bucket = _bucket_starts(pd.Series([window[0].isoformat()]))[granularity].iloc[0]
+        clauses, params = self._filter_clauses([broker] if broker else None, stock_ids)
+        clauses.append("grain = ? AND bucket BETWEEN ? AND ?")
+        params.extend([granularity, first_bucket, window[1].isoformat()])
+
+        rows = self._connect().execute(
+            "SELECT bucket, SUM(buy_lot), SUM(sell_lot), SUM(buy_value), SUM(sell_value), COUNT(DISTINCT broker) "
+            f"FROM rollups WHERE {' AND '.join(clauses)} GROUP BY bucket ORDER BY bucket",
+            params
+        ).fetchall()
+
+        result['window'] = {'start_date': first_bucket, 'end_date': window[1].isoformat()}
+        result['series'] = [
+            {'bucket': bucket, **self._flow_row(buy_lot, sell_lot, buy_value, sell_value), 'brokers': brokers}
+            for bucket, buy_lot, sell_lot, buy_value, sell_value, brokers in rows
+        ]
+        return result
+
+    def top_brokers(
+        self,
+        stock_code: str,
+        days: int = 20,
+        limit: int = 10,
+        end_date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Top net buyers and sellers (by net value) of a stock over its last
+        `days` trading days with data, ending at end_date (default the latest)
+        """
+        self._ensure_rollups()
+        result = {'stock_code': stock_code, 'window': None, 'top_buyers': [], 'top_sellers': []}
+
+        stock_ids = self._stock_ids([stock_code])
+        if not stock_ids:
+            return result
+
+        params: List[Any] = [stock_ids[0]]
+        bound = ""
+        if end_date:
+            bound = " AND bucket <= ?"
+            params.append(_parse_date(end_date, 'end_date').isoformat())
+
+        trading_days = [
+            row[0] for row in self._connect().execute(
+                "SELECT DISTINCT bucket FROM rollups WHERE grain = 'daily' AND stock = ?"
+                f"{bound} ORDER BY bucket DESC LIMIT ?",
+                (*params, days)
+            ).fetchall()
+        ]
+        if not trading_days:
+            return result
+
+        flows = self.net_flows(trading_days[-1], trading_days[0], stock_codes=[stock_code])['flows']
+        result['window'] = {'start_date': trading_days[-1], 'end_date': trading_days[0], 'trading_days': len(trading_days)}
+        result['top_buyers'] = sorted(
+            (flow for flow in flows if flow['net_value'] > 0), key=lambda x: x['net_value'], reverse=True
+        )[:limit]
+        result['top_sellers'] = sorted(
+            (flow for flow in flows if flow['net_value'] < 0), key=lambda x: x['net_value']
+        )[:limit]
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        partitions, daily, rows, first_date, last_date = conn.execute(
+            "SELECT COUNT(*), SUM(period_from = period_to), COALESCE(SUM(rows), 0), "
+            "MIN(period_from), MAX(period_from) FROM partitions"
+        ).fetchone()
+        brokers = conn.execute("SELECT COUNT(DISTINCT broker) FROM partitions").fetchone()[0]
+        stocks = conn.execute("SELECT COUNT(*) FROM dictionary WHERE kind = 'stock'").fetchone()[0]
+        rollups = dict(conn.execute("SELECT grain, COUNT(*) FROM rollups GROUP BY grain").fetchall())
+
+        size_bytes = sum(path.stat().st_size for path in self.root.glob("*/*.npy"))
+
+        return {
+            'partitions': partitions,
+            'daily_partitions': daily or 0,
+            'rows': rows,
+            'brokers': brokers,
+            'stocks': stocks,
+            'first_date': first_date,
+            'last_date': last_date,
+            'size_bytes': size_bytes,
+            'rollup_rows': {grain: rollups.get(grain, 0) for grain in GRAINS}
+        }
+
+
+# Global warehouse instance
+broker_flow_warehouse = BrokerFlowWarehouse()
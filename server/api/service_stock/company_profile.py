@@ -1,7 +1,10 @@
 import yfinance as yf
 from api.helper.idx_data import get_competitors
+from api.helper.single_flight import coalesce
+from api.helper.rate_limiter import yf_limiter
 from api.service_stock.master_data import get_company_profile as get_cached_profile, get_stock_fundamental_data
 
+@coalesce("yfinance", "company_profile")
 def get_company_profile(stock_code: str):
     """
     Get company profile with master data integration.
@@ -24,7 +27,7 @@ def get_company_profile(stock_code: str):
         ticker = yf.Ticker(ticker_code)
         
         try:
-            info = ticker.info
+            info = yf_limiter.call(lambda: ticker.info)
         except Exception as e:
             # If yfinance fails, use cached data only
             info = {}
@@ -34,7 +37,7 @@ def get_company_profile(stock_code: str):
         ticker = yf.Ticker(ticker_code)
         
         try:
-            info = ticker.info
+            info = yf_limiter.call(lambda: ticker.info)
         except Exception as e:
             return {"error": f"Gagal mengambil data profil: {str(e)}"}
         
@@ -100,7 +103,7 @@ def get_company_profile(stock_code: str):
     dividends_data = []
     try:
         if ticker:
-            divs = ticker.dividends
+            divs = yf_limiter.call(lambda: ticker.dividends)
             if not divs.empty:
                 recent_divs = divs.sort_index(ascending=False).head(5)
                 for date, value in recent_divs.items():
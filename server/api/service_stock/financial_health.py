@@ -1,4 +1,5 @@
 import yfinance as yf
+from api.helper.rate_limiter import yf_limiter
 import pandas as pd
 from datetime import datetime
 from ..helper.get_safe_info import get_safe_info
@@ -32,7 +33,7 @@ def analyze_financial_health(stock_list: list):
                 # Growth data might not be in cache, try yfinance
                 try:
                     ticker_obj = yf.Ticker(f"{stock}.JK")
-                    info = ticker_obj.info
+                    info = yf_limiter.call(lambda: ticker_obj.info)
                     rev_growth = get_safe_info(info, 'revenueGrowth', 0) * 100
                     earnings_growth = get_safe_info(info, 'earningsGrowth', 0) * 100
                 except:
@@ -41,7 +42,7 @@ def analyze_financial_health(stock_list: list):
             else:
                 # Fallback to yfinance entirely
                 ticker_obj = yf.Ticker(f"{stock}.JK")
-                info = ticker_obj.info
+                info = yf_limiter.call(lambda: ticker_obj.info)
                 
                 pe_ratio = get_safe_info(info, 'trailingPE', 0)
                 pb_ratio = get_safe_info(info, 'priceToBook', 0)
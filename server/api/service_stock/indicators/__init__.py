@@ -0,0 +1,25 @@
+"""
+Technical Indicator Engines
+"""
+
+from .panel import (
+    build_panel,
+    compute_technical_panel
+)
+from .state import (
+    IndicatorState,
+    indicator_states,
+    refresh_indicator_states,
+    get_technical_snapshots,
+    get_quant_snapshots
+)
+
+__all__ = [
+    'build_panel',
+    'compute_technical_panel',
+    'IndicatorState',
+    'indicator_states',
+    'refresh_indicator_states',
+    'get_technical_snapshots',
+    'get_quant_snapshots'
+]
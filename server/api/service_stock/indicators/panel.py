@@ -0,0 +1,349 @@
+"""
+Vectorized Multi-Ticker Indicator Engine
+Aligns N tickers into 2-D (bars x tickers) NumPy panels and computes every
+technical indicator for the whole universe in one pass
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+# ==================== PANEL CONSTRUCTION ====================
+
+def build_panel(data: pd.DataFrame, stock_list: List[str]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    Build right-aligned OHLCV panels from a (ticker, field) MultiIndex frame.
+
+    Each ticker's rows are dropna'd independently (same as the per-stock code)
+    and packed against the last row, so row -1 is every ticker's latest bar and
+    shorter histories are padded with NaN at the top.
+
+    Returns:
+        (stocks, panels) where panels maps 'open'/'high'/'low'/'close'/'volume'
+        to float arrays of shape (bars, len(stocks))
+    """
+    if not isinstance(data.columns, pd.MultiIndex):
+        return [], {}
+
+    available = set(data.columns.get_level_values(0))
+    stocks = []
+    tickers = []
+    for stock in dict.fromkeys(stock_list):
+        ticker = f"{stock}.JK"
+        if ticker in available:
+            stocks.append(stock)
+            tickers.append(ticker)
+
+    if not stocks:
+        return [], {}
+
+    columns = pd.MultiIndex.from_product([tickers, PRICE_FIELDS])
+    raw = data.reindex(columns=columns).to_numpy(dtype=float)
+    raw = raw.reshape(len(data), len(tickers), len(PRICE_FIELDS))
+
+    # Row is usable for a ticker only if all fields are present (df.dropna())
+    valid = ~np.isnan(raw).any(axis=2)
+    counts = valid.sum(axis=0)
+
+    # Destination row of each valid bar after packing to the bottom
+    n_rows = raw.shape[0]
+    dest = (n_rows - counts)[np.newaxis, :] + np.cumsum(valid, axis=0) - 1
+    rows, cols = np.nonzero(valid)
+
+    packed = np.full(raw.shape, np.nan)
+    packed[dest[rows, cols], cols] = raw[rows, cols]
+
+    panels = {name.lower(): packed[:, :, i] for i, name in enumerate(PRICE_FIELDS)}
+    return stocks, panels
+
+
+# ==================== ROLLING PRIMITIVES (time axis = 0) ====================
+
+def _pad_top(values: np.ndarray, window: int) -> np.ndarray:
+    pad = np.full((window - 1,) + values.shape[1:], np.nan)
+    return np.concatenate([pad, values], axis=0)
+
+
+def rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sum via cumulative sums; NaN if any value in the window is NaN"""
+    if x.shape[0] < window:
+        return np.full(x.shape, np.nan)
+
+    nan_mask = np.isnan(x)
+    zero = np.zeros((1,) + x.shape[1:])
+    csum = np.concatenate([zero, np.cumsum(np.where(nan_mask, 0.0, x), axis=0)])
+    cnan = np.concatenate([zero, np.cumsum(nan_mask, axis=0)])
+
+    sums = csum[window:] - csum[:-window]
+    has_nan = (cnan[window:] - cnan[:-window]) > 0
+    return _pad_top(np.where(has_nan, np.nan, sums), window)
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    return rolling_sum(x, window) / window
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    if x.shape[0] < window:
+        return np.full(x.shape, np.nan)
+    return _pad_top(sliding_window_view(x, window, axis=0).max(axis=-1), window)
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    if x.shape[0] < window:
+        return np.full(x.shape, np.nan)
+    return _pad_top(sliding_window_view(x, window, axis=0).min(axis=-1), window)
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    EMA recurrence along the time axis (pandas ewm(span, adjust=False)).
+    Each column starts at its first non-NaN value.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[1:], np.nan)
+
+    for t in range(x.shape[0]):
+        row = x[t]
+        prev = np.where(np.isnan(prev), row, (1.0 - alpha) * prev + alpha * row)
+        out[t] = prev
+
+    return out
+
+
+def shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if periods < x.shape[0]:
+        out[periods:] = x[:-periods]
+    return out
+
+
+def _last(x: np.ndarray, offset: int = 1) -> np.ndarray:
+    """Row -offset of a panel, NaN when the panel is too short"""
+    if x.shape[0] < offset:
+        return np.full(x.shape[1:], np.nan)
+    return x[-offset]
+
+
+# ==================== TECHNICAL INDICATORS ====================
+
+def compute_technical_panel(data: pd.DataFrame, stock_list: List[str]) -> List[Dict]:
+    """
+    Compute Ichimoku, StochRSI, OBV divergence, rolling VWAP, candlestick
+    patterns and MACD for every stock at once.
+    Returns the same per-stock dicts as the per-stock implementation.
+    """
+    stocks, panels = build_panel(data, stock_list)
+    if not stocks:
+        return []
+
+    open_price = panels['open']
+    high = panels['high']
+    low = panels['low']
+    close = panels['close']
+    volume = panels['volume']
+    has_bar = ~np.isnan(close)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # --- 1. ICHIMOKU KINKO HYO ---
+        tenkan_sen = (rolling_max(high, 9) + rolling_min(low, 9)) / 2
+        kijun_sen = (rolling_max(high, 26) + rolling_min(low, 26)) / 2
+        senkou_span_a = shift((tenkan_sen + kijun_sen) / 2, 26)
+        senkou_span_b = shift((rolling_max(high, 52) + rolling_min(low, 52)) / 2, 26)
+
+        last_close = close[-1]
+        last_span_a = senkou_span_a[-1]
+        last_span_b = senkou_span_b[-1]
+
+        # --- 2. STOCHASTIC RSI ---
+        delta = close - shift(close, 1)
+        gain = np.where(has_bar, np.where(delta > 0, delta, 0.0), np.nan)
+        loss = np.where(has_bar, np.where(delta < 0, -delta, 0.0), np.nan)
+        avg_gain = rolling_mean(gain, 14)
+        avg_loss = rolling_mean(loss, 14)
+
+        rs = avg_gain / np.where(avg_loss == 0, 1e-10, avg_loss)
+        rsi = 100 - (100 / (1 + rs))
+
+        min_rsi = rolling_min(rsi, 14)
+        max_rsi = rolling_max(rsi, 14)
+        rsi_range = max_rsi - min_rsi
+        stoch_rsi = (rsi - min_rsi) / np.where(rsi_range == 0, 1e-10, rsi_range)
+        current_stoch = stoch_rsi[-1]
+
+        # --- 3. OBV TREND ---
+        prev_close = shift(close, 1)
+        obv_change = np.where(close > prev_close, volume, np.where(close < prev_close, -volume, 0.0))
+        obv = np.cumsum(obv_change, axis=0)
+        obv_slope = _last(obv, 1) - _last(obv, 5)
+        price_slope = _last(close, 1) - _last(close, 5)
+
+        # --- 4. ROLLING VWAP (20 Days) ---
+        typical_price = (high + low + close) / 3
+        vwap = rolling_sum(typical_price * volume, 20) / rolling_sum(volume, 20)
+        curr_vwap = vwap[-1]
+
+        # --- 6. MACD ---
+        macd_line = ema(close, 12) - ema(close, 26)
+        signal_line = ema(macd_line, 9)
+        macd_hist = macd_line - signal_line
+        last_macd = macd_line[-1]
+        last_signal = signal_line[-1]
+        last_hist = _last(macd_hist, 1)
+        prev_hist = _last(macd_hist, 2)
+
+    # --- 5. CANDLESTICK PATTERNS (last two bars) ---
+    patterns = candlestick_patterns(open_price, high, low, close)
+
+    results = []
+    for i, stock in enumerate(stocks):
+        result = build_technical_result(
+            stock,
+            last_close=last_close[i],
+            span_a=last_span_a[i],
+            span_b=last_span_b[i],
+            stoch=current_stoch[i],
+            price_slope=price_slope[i],
+            obv_slope=obv_slope[i],
+            vwap=curr_vwap[i],
+            macd=last_macd[i],
+            signal=last_signal[i],
+            last_hist=last_hist[i],
+            prev_hist=prev_hist[i],
+            patterns=[name for name, mask in patterns['flags'] if mask[i]],
+            bull0=bool(patterns['bull0'][i])
+        )
+        if result:
+            results.append(result)
+
+    return results
+
+
+def build_technical_result(
+    stock: str,
+    last_close: float,
+    span_a: float,
+    span_b: float,
+    stoch: float,
+    price_slope: float,
+    obv_slope: float,
+    vwap: float,
+    macd: float,
+    signal: float,
+    last_hist: float,
+    prev_hist: float,
+    patterns: List[str],
+    bull0: bool
+) -> Optional[Dict]:
+    """
+    Turn latest indicator values into the technical analysis dict.
+    Returns None when VWAP is undefined (the per-stock code skips those stocks).
+    """
+    if not np.isfinite(vwap):
+        return None
+
+    if last_close > span_a and last_close > span_b:
+        ichimoku_status = "STRONG BULLISH (Above Cloud)"
+    elif last_close < span_a and last_close < span_b:
+        ichimoku_status = "STRONG BEARISH (Below Cloud)"
+    else:
+        ichimoku_status = "Consolidation (Inside Cloud)"
+
+    if np.isnan(stoch) or np.isinf(stoch):
+        stoch = 0.5
+    else:
+        stoch = round(max(0.0, min(1.0, float(stoch))), 2)
+
+    momentum_signal = "Hold"
+    if stoch < 0.2: momentum_signal = "Oversold (Golden Cross Potential)"
+    elif stoch > 0.8: momentum_signal = "Overbought (Death Cross Potential)"
+
+    divergence_status = "Sync"
+    if price_slope > 0 and obv_slope < 0:
+        divergence_status = "BEARISH DIVERGENCE (Price Up, Vol Down)"
+    elif price_slope < 0 and obv_slope > 0:
+        divergence_status = "BULLISH DIVERGENCE (Price Down, Vol Up)"
+
+    vwap_status = "Bullish Control" if last_close > vwap else "Bearish Control"
+
+    macd_status = "Neutral"
+    if last_hist > 0 and prev_hist < 0:
+        macd_status = "GOLDEN CROSS (Buy Signal)"
+    elif last_hist < 0 and prev_hist > 0:
+        macd_status = "DEAD CROSS (Sell Signal)"
+    elif macd > signal:
+        macd_status = "Bullish Trend"
+    elif macd < signal:
+        macd_status = "Bearish Trend"
+
+    return {
+        "stock": stock,
+        "price": int(last_close),
+        "ichimoku_status": ichimoku_status,
+        "stoch_rsi": stoch,
+        "momentum_signal": momentum_signal,
+        "obv_divergence": divergence_status,
+        "vwap_price": int(vwap),
+        "vwap_status": vwap_status,
+        "candlestick_pattern": ", ".join(patterns) if patterns else "No Major Pattern",
+        "candle_shape": "Bullish" if bull0 else "Bearish",
+        "macd_status": macd_status,
+    }
+
+
+def candlestick_patterns(open_price, high, low, close) -> Dict:
+    """
+    Single/dual candle pattern masks for the last bar of every ticker.
+    Needs the last 2 bars of open/high/low and the last 10 closes.
+    """
+    c0_O, c0_H, c0_L, c0_C = _last(open_price), _last(high), _last(low), _last(close)
+    c1_O, c1_H, c1_L, c1_C = _last(open_price, 2), _last(high, 2), _last(low, 2), _last(close, 2)
+    close_10 = _last(close, 10)
+
+    body0 = np.abs(c0_C - c0_O)
+    u_wick0 = c0_H - np.maximum(c0_C, c0_O)
+    l_wick0 = np.minimum(c0_C, c0_O) - c0_L
+    range0 = c0_H - c0_L
+    bull0 = c0_C > c0_O
+
+    body1 = np.abs(c1_C - c1_O)
+    bull1 = c1_C > c1_O
+
+    with np.errstate(invalid='ignore'):
+        doji = body0 <= (range0 * 0.1)
+        marubozu = ~doji & (body0 >= (range0 * 0.9))
+
+        hammer_shape = (l_wick0 >= 2 * body0) & (u_wick0 <= body0 * 0.5)
+        inverted_shape = (u_wick0 >= 2 * body0) & (l_wick0 <= body0 * 0.5)
+        downtrend = c0_C < close_10
+
+        spinning_top = (body0 < range0 * 0.3) & (np.abs(u_wick0 - l_wick0) < range0 * 0.1)
+
+        engulfing = (body0 > body1) & (bull0 != bull1)
+        bullish_engulfing = engulfing & bull0 & (c0_C > c1_O) & (c0_O < c1_C)
+        bearish_engulfing = engulfing & ~bull0 & (c0_C < c1_O) & (c0_O > c1_C)
+
+        harami = (body0 < body1) & (c0_H < c1_H) & (c0_L > c1_L)
+
+    flags = [
+        ("Doji (Indecision)", doji),
+        ("Marubozu (Strong Momentum)", marubozu),
+        ("Hammer (Bullish Reversal)", hammer_shape & downtrend),
+        ("Hanging Man (Bearish Warning)", hammer_shape & ~downtrend),
+        ("Inverted Hammer (Potential Reversal)", inverted_shape & downtrend),
+        ("Shooting Star (Bearish Reversal)", inverted_shape & ~downtrend),
+        ("Spinning Top (Neutral)", spinning_top),
+        ("Bullish Engulfing (Strong Buy)", bullish_engulfing),
+        ("Bearish Engulfing (Strong Sell)", bearish_engulfing),
+        ("Bullish Harami", harami & bull0),
+        ("Bearish Harami", harami & ~bull0),
+    ]
+
+    return {'flags': flags, 'bull0': bull0}
@@ -0,0 +1,436 @@
+"""
+Incremental Indicator State
+Per-ticker running state (EMAs, RSI windows, OBV, VWAP sums, Ichimoku ring
+buffers) that advances in O(1) per new bar instead of recomputing a year
+"""
+
+import json
+import math
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from api.service_stock.indicators.panel import build_technical_result, candlestick_patterns
+from api.service_stock.master_data import update_price_history, load_price_bars
+from api.service_stock.quant_technical import build_quant_result
+
+
+# Persisted states for all tickers
+STATE_FILE = Path(__file__).parent.parent.parent / "data" / "indicator_state.json"
+
+# Bars replayed when a ticker is seen for the first time (same window as analysis)
+SEED_LOOKBACK_DAYS = 365
+
+NAN = float('nan')
+
+# Ring buffer sizes
+WINDOWS = {
+    'opens': 2,
+    'highs': 52,
+    'lows': 52,
+    'closes': 20,
+    'volumes': 20,
+    'pv': 20,
+    'gains': 14,
+    'losses': 14,
+    'rsis': 14,
+    'obv_hist': 5,
+    'trs': 20,
+    'span_a_raw': 27,
+    'span_b_raw': 27,
+    'macd_hist': 2,
+}
+
+SCALARS = ['last_date', 'bars', 'ema12', 'ema26', 'signal', 'obv']
+
+
+def _ema_step(prev: Optional[float], value: float, span: int) -> float:
+    alpha = 2.0 / (span + 1.0)
+    if prev is None or math.isnan(prev):
+        return value
+    return (1.0 - alpha) * prev + alpha * value
+
+
+def _window_mid(highs: deque, lows: deque, window: int) -> float:
+    """(highest high + lowest low) / 2 over the last `window` bars"""
+    if len(highs) < window:
+        return NAN
+    recent_highs = list(highs)[-window:]
+    recent_lows = list(lows)[-window:]
+    return (max(recent_highs) + min(recent_lows)) / 2
+
+
+def _mean(values) -> float:
+    return sum(values) / len(values)
+
+
+def _complete_bars(bars: np.ndarray) -> np.ndarray:
+    """Bars with every price and volume present (analysis drops incomplete rows with dropna())"""
+    prices = [bars[field] for field in ('open', 'high', 'low', 'close', 'volume')]
+    return bars[~np.isnan(prices).any(axis=0)]
+
+
+def _std(values) -> float:
+    """Sample standard deviation (pandas rolling().std(), ddof=1)"""
+    mean = _mean(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+
+
+class IndicatorState:
+    """
+    Running indicator state for one ticker.
+    update() advances every indicator by one bar in constant time;
+    revise() replaces the latest bar (intraday refresh of today's candle).
+    """
+
+    def __init__(self):
+        self.last_date: Optional[str] = None
+        self.bars = 0
+        self.ema12: Optional[float] = None
+        self.ema26: Optional[float] = None
+        self.signal: Optional[float] = None
+        self.obv = 0.0
+        for name, size in WINDOWS.items():
+            setattr(self, name, deque(maxlen=size))
+
+        # State before the latest bar, so the latest bar can be revised
+        self.previous: Optional[Dict[str, Any]] = None
+
+    # ---------- Advancing ----------
+
+    def update(self, date: str, open_: float, high: float, low: float, close: float, volume: float):
+        """Advance state by one new bar"""
+        self.previous = self.to_dict(include_previous=False)
+
+        prev_close = self.closes[-1] if self.closes else NAN
+
+        # RSI inputs (first bar has no delta -> 0, same as delta.where(delta > 0, 0))
+        delta = close - prev_close
+        self.gains.append(delta if delta > 0 else 0.0)
+        self.losses.append(-delta if delta < 0 else 0.0)
+
+        # True range (first bar falls back to high - low)
+        tr_candidates = [high - low]
+        if not math.isnan(prev_close):
+            tr_candidates += [abs(high - prev_close), abs(low - prev_close)]
+        self.trs.append(max(tr_candidates))
+
+        # OBV
+        if close > prev_close:
+            self.obv += volume
+        elif close < prev_close:
+            self.obv -= volume
+        self.obv_hist.append(self.obv)
+
+        # MACD
+        self.ema12 = _ema_step(self.ema12, close, 12)
+        self.ema26 = _ema_step(self.ema26, close, 26)
+        macd = self.ema12 - self.ema26
+        self.signal = _ema_step(self.signal, macd, 9)
+        self.macd_hist.append(macd - self.signal)
+
+        # Price windows
+        self.opens.append(open_)
+        self.highs.append(high)
+        self.lows.append(low)
+        self.closes.append(close)
+        self.volumes.append(volume)
+        self.pv.append(((high + low + close) / 3) * volume)
+
+        # Ichimoku spans (plotted 26 bars ahead, so keep the last 27 raw values)
+        tenkan = _window_mid(self.highs, self.lows, 9)
+        kijun = _window_mid(self.highs, self.lows, 26)
+        self.span_a_raw.append((tenkan + kijun) / 2)
+        self.span_b_raw.append(_window_mid(self.highs, self.lows, 52))
+
+        # RSI over simple 14-bar averages
+        rsi = NAN
+        if len(self.gains) == WINDOWS['gains']:
+            avg_gain = _mean(self.gains)
+            avg_loss = _mean(self.losses)
+            rs = avg_gain / (avg_loss if avg_loss != 0 else 1e-10)
+            rsi = 100 - (100 / (1 + rs))
+        self.rsis.append(rsi)
+
+        self.bars += 1
+        self.last_date = date
+
+    def revise(self, date: str, open_: float, high: float, low: float, close: float, volume: float):
+        """Replace the latest bar (e.g. today's candle changed intraday)"""
+        if self.previous is not None:
+            self._restore(self.previous)
+        self.update(date, open_, high, low, close, volume)
+
+    # ---------- Reading ----------
+
+    def technical_values(self) -> Dict[str, float]:
+        """Latest raw technical indicator values (inputs of build_technical_result)"""
+        closes = list(self.closes)
+        span_a = self.span_a_raw[0] if len(self.span_a_raw) == WINDOWS['span_a_raw'] else NAN
+        span_b = self.span_b_raw[0] if len(self.span_b_raw) == WINDOWS['span_b_raw'] else NAN
+
+        vwap = NAN
+        if len(self.pv) == WINDOWS['pv']:
+            total_volume = sum(self.volumes)
+            vwap = sum(self.pv) / total_volume if total_volume else NAN
+
+        stoch = NAN
+        rsis = list(self.rsis)
+        if len(rsis) == WINDOWS['rsis'] and not any(math.isnan(r) for r in rsis):
+            rsi_range = max(rsis) - min(rsis)
+            stoch = (rsis[-1] - min(rsis)) / (rsi_range if rsi_range != 0 else 1e-10)
+
+        return {
+            'last_close': closes[-1],
+            'span_a': span_a,
+            'span_b': span_b,
+            'stoch': stoch,
+            'price_slope': closes[-1] - closes[-5] if len(closes) >= 5 else NAN,
+            'obv_slope': self.obv_hist[-1] - self.obv_hist[0] if len(self.obv_hist) == 5 else NAN,
+            'vwap': vwap,
+            'macd': self.ema12 - self.ema26,
+            'signal': self.signal,
+            'last_hist': self.macd_hist[-1],
+            'prev_hist': self.macd_hist[0]
+        }
+
+    def technical(self, stock: str) -> Optional[Dict[str, Any]]:
+        """Same dict as analyze_technical_history for this ticker"""
+        if self.bars < 2:
+            return None
+
+        column = lambda values: np.array(values, dtype=float)[:, np.newaxis]
+        patterns = candlestick_patterns(
+            column(self.opens), column(list(self.highs)[-2:]),
+            column(list(self.lows)[-2:]), column(list(self.closes)[-10:])
+        )
+
+        return build_technical_result(
+            stock,
+            **self.technical_values(),
+            patterns=[name for name, mask in patterns['flags'] if mask[0]],
+            bull0=bool(patterns['bull0'][0])
+        )
+
+    def quant_values(self) -> Dict[str, float]:
+        """Latest Z-Score, ATR and squeeze inputs"""
+        closes = list(self.closes)
+        trs = list(self.trs)
+
+        z_score = NAN
+        bb_upper = bb_lower = kc_upper = kc_lower = NAN
+        if len(closes) == 20:
+            sma20 = _mean(closes)
+            std20 = _std(closes)
+            z_score = 0.0 if std20 == 0 else (closes[-1] - sma20) / std20
+            bb_upper = sma20 + 2.0 * std20
+            bb_lower = sma20 - 2.0 * std20
+            atr20 = _mean(trs)
+            kc_upper = sma20 + 1.5 * atr20
+            kc_lower = sma20 - 1.5 * atr20
+
+        atr14 = _mean(trs[-14:]) if len(trs) >= 14 else NAN
+
+        return {
+            'z_score': z_score,
+            'atr': atr14,
+            'is_squeeze': bool(bb_upper < kc_upper and bb_lower > kc_lower)
+        }
+
+    def quant(self, stock: str) -> Optional[Dict[str, Any]]:
+        """Same dict as analyze_quant_history for this ticker"""
+        if self.bars == 0:
+            return None
+
+        values = self.quant_values()
+        if math.isnan(values['atr']):
+            # Fewer than 14 bars reads as 0 like the batch path; a NaN from the
+            # bars themselves has no batch equivalent, so the stock is left out
+            if len(self.trs) >= 14:
+                return None
+            current_atr = 0
+        else:
+            current_atr = round(values['atr'], 0)
+
+        return build_quant_result(
+            stock,
+            self.highs[-1], self.lows[-1], self.closes[-1],
+            round(values['z_score'], 2), current_atr, values['is_squeeze']
+        )
+
+    # ---------- Persistence ----------
+
+    def to_dict(self, include_previous: bool = True) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in SCALARS}
+        for name in WINDOWS:
+            data[name] = list(getattr(self, name))
+        if include_previous:
+            data['previous'] = self.previous
+        return data
+
+    def _restore(self, data: Dict[str, Any]):
+        for name in SCALARS:
+            setattr(self, name, data.get(name))
+        for name, size in WINDOWS.items():
+            setattr(self, name, deque(data.get(name, []), maxlen=size))
+        self.bars = self.bars or 0
+        self.obv = self.obv or 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IndicatorState':
+        state = cls()
+        state._restore(data)
+        state.previous = data.get('previous')
+        return state
+
+    @classmethod
+    def from_bars(cls, bars: np.ndarray) -> 'IndicatorState':
+        """Seed state by replaying bars (one-time cost per ticker)"""
+        state = cls()
+        for bar in _complete_bars(bars):
+            state.update(str(bar['date']), float(bar['open']), float(bar['high']),
+                         float(bar['low']), float(bar['close']), float(bar['volume']))
+        return state
+
+
+class IndicatorStateStore:
+    """
+    Process-wide store of IndicatorState per ticker, persisted as JSON
+    """
+
+    def __init__(self, state_file: Path = STATE_FILE):
+        self.state_file = state_file
+        self.states: Optional[Dict[str, IndicatorState]] = None
+        self.lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        if self.states is not None:
+            return
+
+        self.states = {}
+        if not self.state_file.exists():
+            return
+
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            self.states = {code: IndicatorState.from_dict(data) for code, data in raw.items()}
+            print(f"Indicator state loaded: {len(self.states)} stocks")
+        except Exception as e:
+            print(f"Error loading indicator state: {e}")
+
+    def save(self):
+        """Atomically persist all states"""
+        with self.lock:
+            self._ensure_loaded()
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({code: state.to_dict() for code, state in self.states.items()}, f)
+            os.replace(tmp_file, self.state_file)
+
+    def get(self, stock_code: str) -> Optional[IndicatorState]:
+        with self.lock:
+            self._ensure_loaded()
+            return self.states.get(stock_code)
+
+    def codes(self) -> List[str]:
+        with self.lock:
+            self._ensure_loaded()
+            return list(self.states.keys())
+
+    def advance(self, stock_code: str, bars: np.ndarray) -> Dict[str, int]:
+        """
+        Apply bars newer than the stored state.
+        Unknown tickers (or a gap larger than the stored bars) are seeded by replay.
+
+        Returns:
+            {'applied': new bars applied, 'seeded': 1 if the state was rebuilt}
+        """
+        with self.lock:
+            self._ensure_loaded()
+            state = self.states.get(stock_code)
+            bars = _complete_bars(bars)
+
+            if len(bars) == 0:
+                return {'applied': 0, 'seeded': 0}
+
+            if state is None or state.last_date is None or np.datetime64(state.last_date) < bars['date'][0]:
+                cutoff = np.datetime64(datetime.now().date() - timedelta(days=SEED_LOOKBACK_DAYS), 'D')
+                self.states[stock_code] = IndicatorState.from_bars(bars[bars['date'] >= cutoff])
+                return {'applied': 0, 'seeded': 1}
+
+            last_date = np.datetime64(state.last_date)
+            applied = 0
+            for bar in bars[bars['date'] >= last_date]:
+                values = (str(bar['date']), float(bar['open']), float(bar['high']),
+                          float(bar['low']), float(bar['close']), float(bar['volume']))
+                if bar['date'] == last_date:
+                    state.revise(*values)
+                else:
+                    state.update(*values)
+                applied += 1
+
+            return {'applied': applied, 'seeded': 0}
+
+
+# Global state store instance
+indicator_states = IndicatorStateStore()
+
+
+def refresh_indicator_states(stock_codes: List[str], fetch: bool = True) -> Dict[str, int]:
+    """
+    Bring indicator states up to date with the OHLCV store.
+    Only bars since each ticker's last state date are applied.
+
+    Args:
+        stock_codes: Stock codes to refresh
+        fetch: Pull missing bars from yfinance first (False = use stored bars only)
+
+    Returns:
+        Counts of refreshed stocks, applied bars and seeded states
+    """
+    if fetch:
+        bars_by_code = update_price_history(stock_codes)
+    else:
+        bars_by_code = {code: load_price_bars(code) for code in stock_codes}
+
+    summary = {'stocks': 0, 'applied_bars': 0, 'seeded': 0}
+    for code, bars in bars_by_code.items():
+        if bars is None:
+            continue
+        result = indicator_states.advance(code, bars)
+        summary['stocks'] += 1
+        summary['applied_bars'] += result['applied']
+        summary['seeded'] += result['seeded']
+
+    indicator_states.save()
+    print(f"Indicator states refreshed: {summary}")
+    return summary
+
+
+def get_technical_snapshots(stock_list: List[str]) -> List[Dict[str, Any]]:
+    """Technical analysis dicts from stored state (no recomputation)"""
+    results = []
+    for stock in stock_list:
+        state = indicator_states.get(stock)
+        result = state.technical(stock) if state else None
+        if result:
+            results.append(result)
+    return results
+
+
+def get_quant_snapshots(stock_list: List[str]) -> List[Dict[str, Any]]:
+    """Quant analysis dicts from stored state (no recomputation)"""
+    results = []
+    for stock in stock_list:
+        state = indicator_states.get(stock)
+        result = state.quant(stock) if state else None
+        if result:
+            results.append(result)
+    return results
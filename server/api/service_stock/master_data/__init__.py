@@ -1,22 +1,26 @@
 """
 Master Data Module
 Provides access to technical and fundamental stock data
+and the local OHLCV history store
 """
 
 from .technical_loader import (
     load_technical_data,
     save_technical_data,
+    upsert_technical_data,
     get_stock_technical_data,
     get_current_price,
     get_multiple_prices,
     is_data_stale as is_technical_stale,
     get_data_age as get_technical_age,
-    get_stats as get_technical_stats
+    get_stats as get_technical_stats,
+    get_stats_version as get_technical_stats_version
 )
 
 from .fundamental_loader import (
     load_fundamental_data,
     save_fundamental_data,
+    upsert_fundamental_data,
     get_stock_fundamental_data,
     get_sector,
     get_financial_ratios,
@@ -24,9 +28,16 @@ from .fundamental_loader import (
     is_data_stale as is_fundamental_stale,
     get_data_age as get_fundamental_age,
     get_stats as get_fundamental_stats,
+    get_stats_version as get_fundamental_stats_version,
     get_all_sectors
 )
 
+from .ohlcv_store import (
+    get_price_history,
+    update_history as update_price_history,
+    load_bars as load_price_bars
+)
+
 from .data_updater import (
     get_all_stock_codes,
     update_technical_data_batch,
@@ -34,20 +45,32 @@ from .data_updater import (
     add_stocks_from_broker_data
 )
 
+from .reload_planner import (
+    plan_reload,
+    record_stock_requests,
+    get_request_counts,
+    get_checkpoint as get_reload_checkpoint
+)
+
+from .delisted_registry import delisted_registry
+
 __all__ = [
     # Technical data
     'load_technical_data',
     'save_technical_data',
+    'upsert_technical_data',
     'get_stock_technical_data',
     'get_current_price',
     'get_multiple_prices',
     'is_technical_stale',
     'get_technical_age',
     'get_technical_stats',
+    'get_technical_stats_version',
     
     # Fundamental data
     'load_fundamental_data',
     'save_fundamental_data',
+    'upsert_fundamental_data',
     'get_stock_fundamental_data',
     'get_sector',
     'get_financial_ratios',
@@ -55,11 +78,26 @@ __all__ = [
     'is_fundamental_stale',
     'get_fundamental_age',
     'get_fundamental_stats',
+    'get_fundamental_stats_version',
     'get_all_sectors',
     
     # Data updater
     'get_all_stock_codes',
     'update_technical_data_batch',
     'update_fundamental_data_batch',
-    'add_stocks_from_broker_data'
+    'add_stocks_from_broker_data',
+    
+    # Reload planning
+    'plan_reload',
+    'record_stock_requests',
+    'get_request_counts',
+    'get_reload_checkpoint',
+    
+    # Delisted ticker registry
+    'delisted_registry',
+    
+    # OHLCV history store
+    'get_price_history',
+    'update_price_history',
+    'load_price_bars'
 ]
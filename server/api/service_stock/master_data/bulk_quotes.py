@@ -0,0 +1,97 @@
+"""
+Bulk Quote Fetching
+Last price, previous close, day range and volume for hundreds of tickers
+per request, derived from batched yf.download bars (OHLCV store)
+instead of one Ticker.info + history() call per stock
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+from api.service_stock.master_data.ohlcv_store import BULK_CHUNK_SIZE, update_history
+
+
+# Bars used for average volume (~3 months, same window as info['averageVolume'])
+AVG_VOLUME_BARS = 63
+
+
+def _bars_to_quote(bars: np.ndarray) -> Dict[str, Any]:
+    """Quote fields from a ticker's daily bars (last bar = current session)"""
+    last = bars[-1]
+    closes = bars['close']
+
+    one_year_ago = last['date'] - np.timedelta64(365, 'D')
+    last_year = bars[bars['date'] > one_year_ago]
+
+    quote = {
+        'current_price': float(last['close']),
+        'previous_close': float(closes[-2]) if len(bars) >= 2 else None,
+        'open': float(last['open']),
+        'day_high': float(last['high']),
+        'day_low': float(last['low']),
+        'volume': int(last['volume']),
+        'avg_volume': int(bars['volume'][-AVG_VOLUME_BARS:].mean()),
+        '52w_high': float(last_year['high'].max()),
+        '52w_low': float(last_year['low'].min()),
+        'quote_date': str(last['date'])
+    }
+
+    if len(bars) >= 50:
+        quote['moving_avg_50'] = float(closes[-50:].mean())
+        if len(bars) >= 200:
+            quote['moving_avg_200'] = float(closes[-200:].mean())
+
+    return quote
+
+
+def fetch_bulk_quotes(stock_codes: List[str], chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch quotes for many tickers with batched downloads.
+
+    Args:
+        stock_codes: Normalized stock codes (without .JK suffix)
+        chunk_size: Tickers per yf.download request
+
+    Returns:
+        Dictionary mapping stock codes to quote dicts.
+        Codes without bars are missing (callers fall back to per-ticker info).
+    """
+    quotes = {}
+    codes = list(dict.fromkeys(stock_codes))
+
+    for i in range(0, len(codes), chunk_size):
+        chunk = codes[i:i + chunk_size]
+        try:
+            history = update_history(chunk)
+        except Exception as e:
+            print(f"Error fetching bulk quotes: {e}")
+            continue
+
+        for code, bars in history.items():
+            if bars is None or len(bars) == 0:
+                continue
+            try:
+                quotes[code] = _bars_to_quote(bars)
+            except Exception as e:
+                print(f"Error building quote for {code}: {e}")
+
+    print(f"Bulk quotes: {len(quotes)}/{len(codes)} tickers")
+    return quotes
+
+
+def build_technical_entry(stock_code: str, normalized_code: str, quote: Dict[str, Any],
+                          existing: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Technical master data entry from a bulk quote.
+    Fields only available from Ticker.info (beta) are carried over from the existing entry.
+    """
+    data = {
+        'stock_code': stock_code,
+        'normalized_code': normalized_code,
+        **{key: value for key, value in quote.items() if key != 'quote_date'},
+        'beta': (existing or {}).get('beta'),
+        'last_updated': datetime.now().isoformat()
+    }
+    return data
@@ -10,19 +10,13 @@ import time
 from datetime import datetime
 
 from api.helper.idx_data import load_idx_sectors_from_wiki
-from api.service_stock.master_data.technical_loader import load_technical_data, save_technical_data
-from api.service_stock.master_data.fundamental_loader import load_fundamental_data, save_fundamental_data
-
-
-# Known delisted/suspended stocks to skip
-DELISTED_STOCKS = {
-    'SQMI', 'TRAM', 'WOMF', 'CPGT', 'MITI', 'MFIN', 'APOL', 'ATPK', 
-    'BAEK', 'BBNP', 'BRAU', 'CKRA', 'DAJK', 'DAVO', 'GMCW', 'GREN', 
-    'INVS', 'ITTG', 'LAMI', 'MASA', 'NAGA', 'SAIP', 'SCBD', 'SIAP', 
-    'SOBI', 'SQBB', 'SQBI', 'STUP', 'TKGA', 'TMPI', 'TRUB', 'UMKM', 
-    'UNTX', 'FORZ', 'FREN', 'HDTX', 'JKSW', 'KPAL', 'KPAS', 'KRAH', 
-    'MAMI', 'MYRX', 'NIPS', 'PRAS', 
-}
+from api.helper.single_flight import coalesce
+from api.helper.rate_limiter import yf_limiter
+from api.service_stock.master_data.technical_loader import load_technical_data, upsert_technical_data
+from api.service_stock.master_data.fundamental_loader import load_fundamental_data, upsert_fundamental_data
+from api.service_stock.master_data.bulk_quotes import fetch_bulk_quotes, build_technical_entry
+from api.service_stock.master_data.reload_planner import plan_reload, save_checkpoint, clear_checkpoint
+from api.service_stock.master_data.delisted_registry import delisted_registry, is_delisted_error
 
 
 def normalize_stock_code(stock_code: str) -> str:
@@ -102,28 +96,32 @@ def get_all_stock_codes() -> List[str]:
         print(f"Error loading from cache: {e}")
     
     # Filter out delisted stocks and empty strings
-    active_stocks = [s for s in all_stocks if s and s not in DELISTED_STOCKS]
+    active_stocks = [s for s in all_stocks if s and not delisted_registry.is_blocked(normalize_stock_code(s))]
     
     print(f"Total active stocks: {len(active_stocks)}")
     return sorted(list(active_stocks))
 
 
+@coalesce("yfinance", "technical")
 def fetch_technical_data_single(stock_code: str) -> Optional[Dict[str, Any]]:
     """Fetch technical data for a single stock"""
     normalized_code = normalize_stock_code(stock_code)
     
-    if normalized_code in DELISTED_STOCKS:
+    if delisted_registry.is_blocked(normalized_code):
         return None
     
     try:
         ticker = yf.Ticker(f"{normalized_code}.JK")
-        info = ticker.info
-        hist = ticker.history(period='1mo')
+        info = yf_limiter.call(lambda: ticker.info)
+        hist = yf_limiter.call(ticker.history, period='1mo')
         
         # Check if stock has data
         if not info or info.get('regularMarketPrice') is None:
+            delisted_registry.mark_failed(normalized_code, 'no_price_data')
             return None
         
+        delisted_registry.mark_success(normalized_code)
+        
         # Calculate technical indicators
         current_price = info.get('currentPrice') or info.get('regularMarketPrice')
         
@@ -152,9 +150,8 @@ def fetch_technical_data_single(stock_code: str) -> Optional[Dict[str, Any]]:
         return data
     
     except Exception as e:
-        error_msg = str(e)
-        if 'delisted' in error_msg.lower() or 'not found' in error_msg.lower():
-            DELISTED_STOCKS.add(normalized_code)
+        if is_delisted_error(e):
+            delisted_registry.mark_failed(normalized_code, 'delisted')
         return None
 
 
@@ -162,17 +159,20 @@ def fetch_fundamental_data_single(stock_code: str) -> Optional[Dict[str, Any]]:
     """Fetch fundamental data for a single stock"""
     normalized_code = normalize_stock_code(stock_code)
     
-    if normalized_code in DELISTED_STOCKS:
+    if delisted_registry.is_blocked(normalized_code):
         return None
     
     try:
         ticker = yf.Ticker(f"{normalized_code}.JK")
-        info = ticker.info
+        info = yf_limiter.call(lambda: ticker.info)
         
         # Check if stock has data
         if not info or info.get('regularMarketPrice') is None:
+            delisted_registry.mark_failed(normalized_code, 'no_price_data')
             return None
         
+        delisted_registry.mark_success(normalized_code)
+        
         data = {
             'stock_code': stock_code,  # Original code
             'normalized_code': normalized_code,
@@ -205,18 +205,20 @@ def fetch_fundamental_data_single(stock_code: str) -> Optional[Dict[str, Any]]:
         return data
     
     except Exception as e:
-        error_msg = str(e)
-        if 'delisted' in error_msg.lower() or 'not found' in error_msg.lower():
-            DELISTED_STOCKS.add(normalized_code)
+        if is_delisted_error(e):
+            delisted_registry.mark_failed(normalized_code, 'delisted')
         return None
 
 
 def update_technical_data_batch(
     stock_codes: List[str],
     batch_size: int = 300,
-    delay_between_batches: int = 30,
+    delay_between_batches: int = 0,
     max_workers: int = 5,
-    progress_callback=None
+    progress_callback=None,
+    bulk: bool = True,
+    fresh_minutes: Optional[int] = None,
+    resume: bool = True
 ) -> Dict[str, Any]:
     """
     Update technical data with anti-rate-limiting strategy
@@ -224,9 +226,16 @@ def update_technical_data_batch(
     Args:
         stock_codes: List of stock codes to update
         batch_size: Number of stocks per batch
-        delay_between_batches: Seconds to wait between batches
+        delay_between_batches: Extra seconds to wait between batches (default 0:
+            requests are paced by the shared yfinance rate limiter; bulk mode only
+            waits after batches that needed per-ticker fallbacks)
         max_workers: Max concurrent requests per batch
-        progress_callback: Optional callback function(current, total, status)
+        progress_callback: Optional callback function(current, total, status, successful, failed, skipped)
+        bulk: Fetch quotes with batched yf.download; Ticker.info only for tickers
+            missing from the bulk result
+        fresh_minutes: Skip stocks updated within this window
+            (None = dataset default, 0 = refetch everything)
+        resume: Continue an interrupted reload of the same code set from its checkpoint
         
     Returns:
         Updated technical data dictionary
@@ -236,20 +245,26 @@ def update_technical_data_batch(
     if 'stocks' not in data:
         data['stocks'] = {}
     
+    # Skip fresh stocks, stalest/most-requested first, resume from checkpoint
+    plan = plan_reload("technical", stock_codes, data['stocks'], fresh_minutes, resume)
+    stock_codes = plan['codes']
+    skipped = len(plan['skipped'])
+    
     total_stocks = len(stock_codes)
     processed = 0
     successful = 0
     failed = 0
+    uncommitted: List[str] = []
     
     print(f"\n=== Starting Technical Data Update ===", flush=True)
-    print(f"Total stocks: {total_stocks}", flush=True)
+    print(f"Total stocks: {total_stocks} ({skipped} skipped as fresh{', resumed from checkpoint' if plan['resumed'] else ''})", flush=True)
     print(f"Batch size: {batch_size}", flush=True)
     print(f"Delay between batches: {delay_between_batches}s", flush=True)
     print(f"Max workers per batch: {max_workers}\n", flush=True)
     
     # Report initial progress
     if progress_callback:
-        progress_callback(0, total_stocks, "starting", successful, failed)
+        progress_callback(0, total_stocks, "starting", successful, failed, skipped)
     
     # Process in batches
     for i in range(0, total_stocks, batch_size):
@@ -261,18 +276,42 @@ def update_technical_data_batch(
         
         # Report batch start
         if progress_callback:
-            progress_callback(processed, total_stocks, f"processing_batch_{batch_num}", successful, failed)
+            progress_callback(processed, total_stocks, f"processing_batch_{batch_num}", successful, failed, skipped)
         
-        # Fetch batch concurrently
+        batch_results = {}
+        fallback_codes = batch
+        
+        # Bulk quotes: one batched download for the whole batch
+        if bulk:
+            normalized = {code: normalize_stock_code(code) for code in batch}
+            active = set(delisted_registry.filter_active(set(normalized.values())))
+            quotes = fetch_bulk_quotes(sorted(active))
+            fallback_codes = []
+            for code in batch:
+                quote = quotes.get(normalized[code])
+                if normalized[code] not in active:
+                    failed += 1
+                    processed += 1
+                elif quote:
+                    batch_results[code] = build_technical_entry(code, normalized[code], quote, data['stocks'].get(code))
+                    successful += 1
+                    processed += 1
+                else:
+                    fallback_codes.append(code)
+            
+            if fallback_codes:
+                print(f"  {len(fallback_codes)} stocks missing from bulk quotes, falling back to Ticker.info", flush=True)
+        
+        # Fetch remaining stocks concurrently (per-ticker info)
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(fetch_technical_data_single, code): code for code in batch}
+            futures = {executor.submit(fetch_technical_data_single, code): code for code in fallback_codes}
             
             for future in as_completed(futures):
                 stock_code = futures[future]
                 try:
                     result = future.result()
                     if result:
-                        data['stocks'][stock_code] = result
+                        batch_results[stock_code] = result
                         successful += 1
                     else:
                         failed += 1
@@ -284,29 +323,44 @@ def update_technical_data_batch(
         
         print(f"  Progress: {processed}/{total_stocks} ({successful} successful, {failed} failed)", flush=True)
         
-        # Save intermediate results
-        save_technical_data(data)
+        # Commit this batch only (atomic per-stock upserts); a batch that failed
+        # to commit stays pending in the checkpoint so a resumed run retries it
+        if upsert_technical_data(batch_results):
+            data['stocks'].update(batch_results)
+        else:
+            uncommitted.extend(batch)
+            successful -= len(batch_results)
+            failed += len(batch_results)
+        save_checkpoint(plan['checkpoint'], uncommitted + stock_codes[i + batch_size:], {
+            'processed': processed, 'successful': successful, 'failed': failed, 'skipped': skipped
+        })
         
         # Report progress after batch
         if progress_callback:
-            progress_callback(processed, total_stocks, "batch_complete", successful, failed)
+            progress_callback(processed, total_stocks, "batch_complete", successful, failed, skipped)
         
         # Delay before next batch (except for last batch)
-        if i + batch_size < total_stocks:
+        if delay_between_batches and i + batch_size < total_stocks and (not bulk or fallback_codes):
             print(f"  Waiting {delay_between_batches}s before next batch...\n", flush=True)
             if progress_callback:
-                progress_callback(processed, total_stocks, "waiting", successful, failed)
+                progress_callback(processed, total_stocks, "waiting", successful, failed, skipped)
             time.sleep(delay_between_batches)
     
     print(f"\n=== Technical Data Update Complete ===", flush=True)
     print(f"Total: {processed} stocks", flush=True)
     print(f"Successful: {successful}", flush=True)
     print(f"Failed: {failed}", flush=True)
-    print(f"Success rate: {(successful/processed*100):.1f}%\n", flush=True)
+    print(f"Skipped (fresh): {skipped}", flush=True)
+    print(f"Success rate: {(successful/processed*100 if processed else 0):.1f}%\n", flush=True)
+    
+    if uncommitted:
+        print(f"Not saved: {len(uncommitted)} stocks kept in the checkpoint for the next run", flush=True)
+    else:
+        clear_checkpoint(plan['checkpoint'])
     
     # Report completion
     if progress_callback:
-        progress_callback(processed, total_stocks, "complete", successful, failed)
+        progress_callback(processed, total_stocks, "complete", successful, failed, skipped)
     
     return data
 
@@ -314,33 +368,42 @@ def update_technical_data_batch(
 def update_fundamental_data_batch(
     stock_codes: List[str],
     batch_size: int = 50,
-    delay_between_batches: int = 60,
+    delay_between_batches: int = 0,
     max_workers: int = 5,
-    progress_callback=None
+    progress_callback=None,
+    fresh_minutes: Optional[int] = None,
+    resume: bool = True
 ) -> Dict[str, Any]:
     """
     Update fundamental data with anti-rate-limiting strategy
     Similar to technical update but for fundamental data
+    (same freshness skipping, priority order and checkpoints)
     """
     # Load existing data
     data = load_fundamental_data()
     if 'stocks' not in data:
         data['stocks'] = {}
     
+    # Skip fresh stocks, stalest/most-requested first, resume from checkpoint
+    plan = plan_reload("fundamental", stock_codes, data['stocks'], fresh_minutes, resume)
+    stock_codes = plan['codes']
+    skipped = len(plan['skipped'])
+    
     total_stocks = len(stock_codes)
     processed = 0
     successful = 0
     failed = 0
+    uncommitted: List[str] = []
     
     print(f"\n=== Starting Fundamental Data Update ===", flush=True)
-    print(f"Total stocks: {total_stocks}", flush=True)
+    print(f"Total stocks: {total_stocks} ({skipped} skipped as fresh{', resumed from checkpoint' if plan['resumed'] else ''})", flush=True)
     print(f"Batch size: {batch_size}", flush=True)
     print(f"Delay between batches: {delay_between_batches}s", flush=True)
     print(f"Max workers per batch: {max_workers}\n", flush=True)
     
     # Report initial progress
     if progress_callback:
-        progress_callback(0, total_stocks, "starting", successful, failed)
+        progress_callback(0, total_stocks, "starting", successful, failed, skipped)
     
     # Process in batches
     for i in range(0, total_stocks, batch_size):
@@ -351,9 +414,10 @@ def update_fundamental_data_batch(
         print(f"Batch {batch_num}/{total_batches}: Processing {len(batch)} stocks...", flush=True)
         
         if progress_callback:
-            progress_callback(processed, total_stocks, f"processing_batch_{batch_num}", successful, failed)
+            progress_callback(processed, total_stocks, f"processing_batch_{batch_num}", successful, failed, skipped)
         
         # Fetch batch concurrently
+        batch_results = {}
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {executor.submit(fetch_fundamental_data_single, code): code for code in batch}
             
@@ -362,7 +426,7 @@ def update_fundamental_data_batch(
                 try:
                     result = future.result()
                     if result:
-                        data['stocks'][stock_code] = result
+                        batch_results[stock_code] = result
                         successful += 1
                     else:
                         failed += 1
@@ -374,32 +438,47 @@ def update_fundamental_data_batch(
         
         print(f"  Progress: {processed}/{total_stocks} ({successful} successful, {failed} failed)", flush=True)
         
-        # Save intermediate results
-        save_fundamental_data(data)
+        # Commit this batch only (atomic per-stock upserts); a batch that failed
+        # to commit stays pending in the checkpoint so a resumed run retries it
+        if upsert_fundamental_data(batch_results):
+            data['stocks'].update(batch_results)
+        else:
+            uncommitted.extend(batch)
+            successful -= len(batch_results)
+            failed += len(batch_results)
+        save_checkpoint(plan['checkpoint'], uncommitted + stock_codes[i + batch_size:], {
+            'processed': processed, 'successful': successful, 'failed': failed, 'skipped': skipped
+        })
         
         if progress_callback:
-            progress_callback(processed, total_stocks, "batch_complete", successful, failed)
+            progress_callback(processed, total_stocks, "batch_complete", successful, failed, skipped)
         
         # Delay before next batch (except for last batch)
-        if i + batch_size < total_stocks:
+        if delay_between_batches and i + batch_size < total_stocks:
             print(f"  Waiting {delay_between_batches}s before next batch...\n", flush=True)
             if progress_callback:
-                progress_callback(processed, total_stocks, "waiting", successful, failed)
+                progress_callback(processed, total_stocks, "waiting", successful, failed, skipped)
             time.sleep(delay_between_batches)
     
     print(f"\n=== Fundamental Data Update Complete ===", flush=True)
     print(f"Total: {processed} stocks", flush=True)
     print(f"Successful: {successful}", flush=True)
     print(f"Failed: {failed}", flush=True)
-    print(f"Success rate: {(successful/processed*100):.1f}%\n", flush=True)
+    print(f"Skipped (fresh): {skipped}", flush=True)
+    print(f"Success rate: {(successful/processed*100 if processed else 0):.1f}%\n", flush=True)
+    
+    if uncommitted:
+        print(f"Not saved: {len(uncommitted)} stocks kept in the checkpoint for the next run", flush=True)
+    else:
+        clear_checkpoint(plan['checkpoint'])
     
     if progress_callback:
-        progress_callback(processed, total_stocks, "complete", successful, failed)
+        progress_callback(processed, total_stocks, "complete", successful, failed, skipped)
     
     return data
 
 
-def add_stocks_from_broker_data(stock_codes: List[str]):
+def add_stocks_from_broker_data(stock_codes: List[str], progress_callback=None):
     """
     Add new stocks discovered from broker data to master data
     This ensures stocks not in Wikipedia are still tracked
@@ -415,5 +494,5 @@ def add_stocks_from_broker_data(stock_codes: List[str]):
     if new_stocks:
         print(f"Found {len(new_stocks)} new stocks from broker data")
         # Update both technical and fundamental for new stocks
-        update_technical_data_batch(new_stocks, batch_size=10, delay_between_batches=30)
-        update_fundamental_data_batch(new_stocks, batch_size=10, delay_between_batches=30)
+        update_technical_data_batch(new_stocks, batch_size=10, progress_callback=progress_callback, resume=False)
+        update_fundamental_data_batch(new_stocks, batch_size=10, progress_callback=progress_callback, resume=False)
@@ -0,0 +1,178 @@
+"""
+Delisted Ticker Registry
+Persisted negative cache for tickers yfinance reports as delisted or that
+return no data. Every fetch path consults it; entries expire after a
+retry-after TTL (doubling per repeated failure) and a successful fetch removes them.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from api.service_stock.master_data.store import master_data_store
+
+
+# Retry-after per reason (days), doubled for every repeated failure up to MAX_RETRY_DAYS
+RETRY_AFTER_DAYS = {
+    'known_delisted': 30,
+    'delisted': 7,
+    'no_price_data': 1,
+}
+DEFAULT_RETRY_DAYS = 1
+MAX_RETRY_DAYS = 90
+
+# Known delisted/suspended stocks, seeded once into a new database
+KNOWN_DELISTED = {
+    'NCKL', 'MTMH', 'ZONE', 'MAIN', 'CRAB', 'BIMA', 'KBLM', 'SQMI',
+    'PNSE', 'TRAM', 'WOMF', 'KARW', 'SRTG', 'CPGT', 'KOBX', 'MITI',
+    'MFIN', 'APOL', 'ATPK', 'BAEK', 'BBNP', 'BRAU', 'CKRA', 'DAJK',
+    'DAVO', 'GMCW', 'GREN', 'INVS', 'ITTG', 'LAMI', 'MASA', 'NAGA',
+    'SAIP', 'SCBD', 'SIAP', 'SOBI', 'SQBB', 'SQBI', 'STUP', 'TKGA',
+    'TMPI', 'TRUB', 'UMKM', 'UNTX', 'FORZ', 'FREN', 'HDTX', 'JKSW',
+    'KPAL', 'KPAS', 'KRAH', 'MAMI', 'MYRX', 'NIPS', 'PRAS',
+}
+
+
+def is_delisted_error(error: BaseException) -> bool:
+    """yfinance errors that mean the ticker itself is gone"""
+    message = str(error).lower()
+    return 'delisted' in message or 'not found' in message
+
+
+class DelistedRegistry:
+    """
+    In-memory view of the negative_cache table (loaded once per process,
+    written through on every change).
+
+    - is_blocked(): entry exists and its retry_after has not passed
+    - mark_failed(): add entry or bump failures and push retry_after out
+    - mark_success(): drop entry (no-op for codes not in the registry)
+    """
+
+    def __init__(self):
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is not None:
+            return self._entries
+
+        with self._lock:
+            if self._entries is None:
+                now = datetime.now()
+                seed = {code: self._new_entry(code, 'known_delisted', now) for code in KNOWN_DELISTED}
+                try:
+                    master_data_store.seed_negative(seed)
+                    self._entries = master_data_store.load_negative()
+                except Exception as e:
+                    print(f"Error loading delisted registry: {e}")
+                    self._entries = seed
+        return self._entries
+
+    @staticmethod
+    def _retry_after(reason: str, failures: int, now: datetime) -> str:
+        days = RETRY_AFTER_DAYS.get(reason, DEFAULT_RETRY_DAYS) * 2 ** (failures - 1)
+        return (now + timedelta(days=min(days, MAX_RETRY_DAYS))).isoformat()
+
+    def _new_entry(self, code: str, reason: str, now: datetime) -> Dict[str, Any]:
+        return {
+            'code': code,
+            'reason': reason,
+            'first_seen': now.isoformat(),
+            'last_seen': now.isoformat(),
+            'retry_after': self._retry_after(reason, 1, now),
+            'failures': 1
+        }
+
+    def is_blocked(self, code: str) -> bool:
+        entry = self._ensure_loaded().get(code)
+        return entry is not None and entry['retry_after'] > datetime.now().isoformat()
+
+    def filter_active(self, codes: Iterable[str]) -> List[str]:
+        """Codes that may be fetched (not blocked)"""
+        entries = self._ensure_loaded()
+        now = datetime.now().isoformat()
+        return [
+            code for code in codes
+            if code not in entries or entries[code]['retry_after'] <= now
+        ]
+
+    def mark_failed(self, code: str, reason: str = 'delisted'):
+        """Record a ticker that yfinance reported as delisted or returned no data for"""
+        entries = self._ensure_loaded()
+        now = datetime.now()
+
+        with self._lock:
+            entry = entries.get(code)
+            if entry is None:
+                entry = self._new_entry(code, reason, now)
+                print(f"Delisted registry: {code} added ({reason})")
+            else:
+                entry = dict(entry)
+                entry['failures'] += 1
+                entry['reason'] = reason
+                entry['last_seen'] = now.isoformat()
+                entry['retry_after'] = self._retry_after(reason, entry['failures'], now)
+            entries[code] = entry
+
+        try:
+            master_data_store.upsert_negative(entry)
+        except Exception as e:
+            print(f"Error saving delisted registry entry {code}: {e}")
+
+    def mark_success(self, code: str):
+        self.mark_success_many([code])
+
+    def mark_success_many(self, codes: Iterable[str]):
+        """Remove codes that were fetched successfully"""
+        entries = self._ensure_loaded()
+        found = [code for code in codes if code in entries]
+        if not found:
+            return
+
+        with self._lock:
+            for code in found:
+                entries.pop(code, None)
+
+        print(f"Delisted registry: {', '.join(found)} fetched again, removed")
+        try:
+            master_data_store.delete_negative(found)
+        except Exception as e:
+            print(f"Error updating delisted registry: {e}")
+
+    def clear(self, codes: Optional[List[str]] = None) -> int:
+        """Remove the given codes (or every entry); returns number removed"""
+        entries = self._ensure_loaded()
+
+        with self._lock:
+            if codes is None:
+                removed = len(entries)
+                entries.clear()
+            else:
+                removed = sum(1 for code in codes if entries.pop(code, None) is not None)
+
+        master_data_store.delete_negative(codes)
+        return removed
+
+    def list_entries(self) -> List[Dict[str, Any]]:
+        now = datetime.now().isoformat()
+        return [
+            {**entry, 'blocked': entry['retry_after'] > now}
+            for entry in sorted(self._ensure_loaded().values(), key=lambda e: e['code'])
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        entries = self.list_entries()
+        reasons: Dict[str, int] = {}
+        for entry in entries:
+            reasons[entry['reason']] = reasons.get(entry['reason'], 0) + 1
+
+        return {
+            'total': len(entries),
+            'blocked': sum(1 for entry in entries if entry['blocked']),
+            'by_reason': reasons
+        }
+
+
+# Global registry shared by every yfinance fetch path
+delisted_registry = DelistedRegistry()
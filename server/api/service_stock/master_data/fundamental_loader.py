@@ -1,52 +1,59 @@
 """
 Master Data Loader for Fundamental Stock Data
-Loads from JSON cache with fallback to yfinance
+Backed by the SQLite master data store (migrated from the JSON cache).
+Parsed data is kept in memory and reloaded only when the store changes.
 """
 
-import json
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Any
 
-# Path to fundamental data JSON
+from api.service_stock.master_data.repository import MasterDataRepository
+from api.service_stock.master_data.store import master_data_store
+
+# Legacy fundamental data JSON (imported into the store on first use)
 FUNDAMENTAL_DATA_FILE = Path(__file__).parent.parent.parent / "data" / "stock_fundamental_data.json"
 
 # Cache TTL: 7 days for fundamental data
 CACHE_TTL_DAYS = 7
 
+DATASET = "fundamental"
+master_data_store.register_json_source(DATASET, FUNDAMENTAL_DATA_FILE)
+
+# Process-wide repository (reloads only when the store version changes)
+fundamental_repository = MasterDataRepository(
+    "Fundamental", lambda: master_data_store.load(DATASET), lambda: master_data_store.version(DATASET)
+)
+
 
 def load_fundamental_data() -> Dict[str, Any]:
-    """Load fundamental data from JSON file"""
-    if not FUNDAMENTAL_DATA_FILE.exists():
-        return {
-            'last_updated': None,
-            'stocks': {}
-        }
-    
-    try:
-        with open(FUNDAMENTAL_DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading fundamental data: {e}")
-        return {
-            'last_updated': None,
-            'stocks': {}
-        }
+    """
+    Load fundamental data (served from memory unless the store changed).
+    Returns a copy whose 'stocks' dict can be modified and passed to save_fundamental_data.
+    """
+    data = dict(fundamental_repository.get())
+    data['stocks'] = dict(data.get('stocks', {}))
+    return data
 
 
 def save_fundamental_data(data: Dict[str, Any]):
-    """Save fundamental data to JSON file"""
+    """Upsert every stock in a fundamental data document"""
+    data['last_updated'] = datetime.now().isoformat()
+    upsert_fundamental_data(data.get('stocks', {}), data['last_updated'])
+
+
+def upsert_fundamental_data(entries: Dict[str, Dict[str, Any]], last_updated: Optional[str] = None) -> bool:
+    """Insert or replace fundamental data for the given stocks in one atomic commit; False if the commit failed"""
+    if not entries:
+        return True
+
     try:
-        FUNDAMENTAL_DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-        
-        data['last_updated'] = datetime.now().isoformat()
-        
-        with open(FUNDAMENTAL_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        print(f"Fundamental data saved: {len(data.get('stocks', {}))} stocks")
+        master_data_store.upsert(DATASET, entries, last_updated)
+        print(f"Fundamental data saved: {len(entries)} stocks upserted")
+        return True
     except Exception as e:
         print(f"Error saving fundamental data: {e}")
+        return False
 
 
 def get_stock_fundamental_data(stock_code: str) -> Optional[Dict[str, Any]]:
@@ -54,8 +61,7 @@ def get_stock_fundamental_data(stock_code: str) -> Optional[Dict[str, Any]]:
     Get fundamental data for a single stock
     Returns None if not found
     """
-    data = load_fundamental_data()
-    return data.get('stocks', {}).get(stock_code)
+    return fundamental_repository.get_stock(stock_code)
 
 
 def get_sector(stock_code: str) -> str:
@@ -105,7 +111,7 @@ def get_company_profile(stock_code: str) -> Dict[str, Any]:
 
 def is_data_stale(days: int = CACHE_TTL_DAYS) -> bool:
     """Check if fundamental data is stale"""
-    data = load_fundamental_data()
+    data = fundamental_repository.get()
     
     if not data.get('last_updated'):
         return True
@@ -120,7 +126,7 @@ def is_data_stale(days: int = CACHE_TTL_DAYS) -> bool:
 
 def get_data_age() -> Optional[str]:
     """Get human-readable age of fundamental data"""
-    data = load_fundamental_data()
+    data = fundamental_repository.get()
     
     if not data.get('last_updated'):
         return None
@@ -138,9 +144,19 @@ def get_data_age() -> Optional[str]:
         return None
 
 
+def get_version() -> int:
+    """Store commit counter of the fundamental dataset (changes on every write)"""
+    return master_data_store.version(DATASET)
+
+
+def get_stats_version() -> tuple:
+    """Changes whenever get_stats() would: a write, or the age label / staleness rolling over"""
+    return (get_version(), get_data_age(), is_data_stale())
+
+
 def get_stats() -> Dict[str, Any]:
     """Get statistics about fundamental data"""
-    data = load_fundamental_data()
+    data = fundamental_repository.get()
     
     return {
         'total_stocks': len(data.get('stocks', {})),
@@ -152,7 +168,7 @@ def get_stats() -> Dict[str, Any]:
 
 def get_all_sectors() -> List[str]:
     """Get list of all unique sectors"""
-    data = load_fundamental_data()
+    data = fundamental_repository.get()
     sectors = set()
     
     for stock_data in data.get('stocks', {}).values():
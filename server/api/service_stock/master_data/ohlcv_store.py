@@ -0,0 +1,294 @@
+"""
+Local OHLCV History Store
+Per-ticker daily bars persisted as .npy files, updated incrementally from yfinance
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from api.helper.rate_limiter import yf_limiter
+from api.service_stock.master_data.delisted_registry import delisted_registry
+
+
+# Directory holding one <CODE>.npy file per ticker
+OHLCV_DIR = Path(__file__).parent.parent.parent / "data" / "ohlcv"
+
+# A ticker fetched within this window is served from disk without network
+REFRESH_TTL_MINUTES = 15
+
+# Bars kept per ticker (calendar days); older bars are trimmed on write
+RETENTION_DAYS = 2 * 365
+
+# Default lookback for analysis (same as yfinance period="1y")
+DEFAULT_LOOKBACK_DAYS = 365
+
+# Tickers per yf.download request (and per set of ticker locks held at once)
+BULK_CHUNK_SIZE = 200
+
+# Tickers missing from a batch download are re-checked one by one before they
+# are marked as having no data; more missing than this looks like a partial
+# upstream failure, so none are marked
+NO_DATA_CONFIRM_MAX = 10
+
+BAR_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8'),
+])
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Per-ticker locks so concurrent requests for the same stock fetch it only once
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _get_lock(stock_code: str) -> threading.Lock:
+    with _locks_guard:
+        if stock_code not in _locks:
+            _locks[stock_code] = threading.Lock()
+        return _locks[stock_code]
+
+
+def _bars_path(stock_code: str) -> Path:
+    return OHLCV_DIR / f"{stock_code}.npy"
+
+
+def load_bars(stock_code: str) -> Optional[np.ndarray]:
+    """Load stored bars for a ticker (structured array sorted by date) or None"""
+    path = _bars_path(stock_code)
+    if not path.exists():
+        return None
+
+    try:
+        return np.load(path, allow_pickle=False)
+    except Exception as e:
+        print(f"Error loading OHLCV for {stock_code}: {e}")
+        return None
+
+
+def save_bars(stock_code: str, bars: np.ndarray):
+    """Atomically write bars for a ticker (readers never see a half-written file)"""
+    OHLCV_DIR.mkdir(parents=True, exist_ok=True)
+
+    cutoff = np.datetime64(datetime.now().date() - timedelta(days=RETENTION_DAYS), 'D')
+    bars = bars[bars['date'] >= cutoff]
+
+    path = _bars_path(stock_code)
+    tmp_path = path.with_suffix('.tmp.npy')
+    np.save(tmp_path, bars, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def _is_fresh(stock_code: str) -> bool:
+    """Stored bars were fetched within REFRESH_TTL_MINUTES"""
+    path = _bars_path(stock_code)
+    if not path.exists():
+        return False
+
+    fetched_at = datetime.fromtimestamp(path.stat().st_mtime)
+    return datetime.now() - fetched_at < timedelta(minutes=REFRESH_TTL_MINUTES)
+
+
+def _frame_to_bars(df: pd.DataFrame) -> np.ndarray:
+    """Convert a single-ticker yfinance frame to a structured bar array"""
+    df = df.dropna(subset=['Close'])
+
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars['date'] = index.values.astype('datetime64[D]')
+    bars['open'] = df['Open'].astype(float).values
+    bars['high'] = df['High'].astype(float).values
+    bars['low'] = df['Low'].astype(float).values
+    bars['close'] = df['Close'].astype(float).values
+    bars['volume'] = df['Volume'].astype(float).values
+    return bars
+
+
+def _download(stock_codes: List[str], **kwargs) -> Dict[str, np.ndarray]:
+    """Batched yfinance download, split into per-ticker bar arrays"""
+    tickers = [f"{code}.JK" for code in stock_codes]
+
+    try:
+        data = yf_limiter.call(yf.download, tickers, group_by='ticker', progress=False, **kwargs)
+    except Exception as e:
+        print(f"Error fetching yfinance: {e}")
+        return {}
+
+    if data is None or data.empty:
+        return {}
+
+    results = {}
+    for code, ticker in zip(stock_codes, tickers):
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                df = data[ticker]
+            else:
+                df = data
+
+            bars = _frame_to_bars(df)
+            if len(bars) > 0:
+                results[code] = bars
+        except Exception as e:
+            print(f"Error parsing OHLCV for {code}: {e}")
+
+    return results
+
+
+def _merge_bars(existing: Optional[np.ndarray], new_bars: np.ndarray) -> np.ndarray:
+    """Replace stored bars from the first new date onwards and append the rest"""
+    if existing is None or len(existing) == 0:
+        return new_bars
+    if len(new_bars) == 0:
+        return existing
+
+    kept = existing[existing['date'] < new_bars['date'][0]]
+    return np.concatenate([kept, new_bars])
+
+
+def _confirm_no_data(absent: List[str], fetched: Dict[str, np.ndarray], throttled_before: int):
+    """
+    Retry tickers a batch download returned nothing for, one at a time, and
+    mark those still empty in the delisted registry. Nothing is marked if no
+    ticker returned bars, too many are absent, or yfinance throttled meanwhile.
+    """
+    if not fetched or not absent or len(absent) > NO_DATA_CONFIRM_MAX:
+        return
+
+    for code in absent:
+        if yf_limiter.throttled != throttled_before:
+            return
+        retried = _download([code], period="1y")
+        if code in retried:
+            fetched[code] = retried[code]
+        elif yf_limiter.throttled == throttled_before:
+            delisted_registry.mark_failed(code, 'no_price_data')
+
+
+def update_history(stock_codes: List[str], force: bool = False,
+                   chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, np.ndarray]:
+    """
+    Bring stored bars up to date, fetching only missing ranges:
+    - Unknown ticker: one year of bars
+    - Stale ticker: bars since its last stored date (last bar is refreshed)
+    - Fresh ticker: no network
+
+    Tickers are processed in chunks; a chunk's locks are released before the
+    next chunk downloads, so a universe refresh does not block single-stock requests.
+
+    Args:
+        stock_codes: Stock codes (without .JK suffix)
+        force: Ignore REFRESH_TTL_MINUTES and refetch since last stored date
+        chunk_size: Tickers per yf.download request
+
+    Returns:
+        Dictionary mapping stock codes to their stored bars
+    """
+    codes = sorted(set(stock_codes))
+    history: Dict[str, np.ndarray] = {}
+    for i in range(0, len(codes), chunk_size):
+        history.update(_update_chunk(codes[i:i + chunk_size], force))
+    return history
+
+
+def _update_chunk(codes: List[str], force: bool) -> Dict[str, np.ndarray]:
+    """update_history() for one chunk of sorted codes, holding their locks throughout"""
+    locks = [_get_lock(code) for code in codes]
+
+    # Lock in sorted order so overlapping requests cannot deadlock
+    for lock in locks:
+        lock.acquire()
+
+    try:
+        stored = {code: load_bars(code) for code in codes}
+
+        missing = []
+        stale_by_start: Dict[str, List[str]] = {}
+
+        for code in codes:
+            bars = stored[code]
+            if delisted_registry.is_blocked(code):
+                continue
+            if bars is None or len(bars) == 0:
+                missing.append(code)
+            elif force or not _is_fresh(code):
+                start = str(bars['date'][-1])
+                stale_by_start.setdefault(start, []).append(code)
+
+        fetched: Dict[str, np.ndarray] = {}
+
+        if missing:
+            print(f"OHLCV store: downloading 1y for {len(missing)} new tickers")
+            throttled_before = yf_limiter.throttled
+            fetched.update(_download(missing, period="1y"))
+            _confirm_no_data([code for code in missing if code not in fetched], fetched, throttled_before)
+
+        # Stocks updated together share their last date, so this is usually one request
+        for start, group in stale_by_start.items():
+            print(f"OHLCV store: downloading bars since {start} for {len(group)} tickers")
+            fetched.update(_download(group, start=start))
+
+        for code in missing + [c for group in stale_by_start.values() for c in group]:
+            if code in fetched:
+                stored[code] = _merge_bars(stored[code], fetched[code])
+                save_bars(code, stored[code])
+            elif stored[code] is not None:
+                # Nothing new upstream: mark as checked so the TTL applies
+                os.utime(_bars_path(code))
+
+        delisted_registry.mark_success_many(fetched)
+
+        return {code: bars for code, bars in stored.items() if bars is not None}
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """Convert stored bars to an OHLCV DataFrame indexed by date"""
+    return pd.DataFrame(
+        {
+            'Open': bars['open'],
+            'High': bars['high'],
+            'Low': bars['low'],
+            'Close': bars['close'],
+            'Volume': bars['volume'],
+        },
+        index=pd.DatetimeIndex(bars['date'].astype('datetime64[ns]'), name='Date')
+    )
+
+
+def get_price_history(stock_list: List[str], days: int = DEFAULT_LOOKBACK_DAYS) -> Optional[pd.DataFrame]:
+    """
+    Get daily bars in the same layout as yf.download(..., group_by='ticker'):
+    columns are a (ticker, field) MultiIndex with tickers like 'BBCA.JK'.
+    Returns None if no bars are available.
+    """
+    history = update_history(stock_list)
+    cutoff = np.datetime64(datetime.now().date() - timedelta(days=days), 'D')
+
+    frames = {}
+    for code in stock_list:
+        bars = history.get(code)
+        if bars is None:
+            continue
+        frames[f"{code}.JK"] = bars_to_frame(bars[bars['date'] >= cutoff])
+
+    if not frames:
+        return None
+
+    return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
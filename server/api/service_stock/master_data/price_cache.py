@@ -1,30 +1,31 @@
 """
 Price Cache Manager for Indonesian Stocks
-Caches stock prices with 15-minute TTL to avoid yfinance rate limiting
+Caches stock prices with a per-entry TTL (in memory, persisted to JSON)
+to avoid yfinance rate limiting
 """
 
 import json
 import os
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List
 import yfinance as yf
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from api.helper.idx_data import load_idx_sectors_from_wiki
-import time
+from api.helper.single_flight import coalesce
+from api.helper.rate_limiter import yf_limiter
+from api.service_stock.master_data.bulk_quotes import fetch_bulk_quotes
+from api.service_stock.master_data.delisted_registry import delisted_registry, is_delisted_error
 
 
 # Cache file path
 CACHE_FILE = os.path.join(os.path.dirname(__file__), 'stock_prices_cache.json')
 
-# Cache TTL: 15 minutes
+# Default TTL per price entry: 15 minutes
 CACHE_TTL_MINUTES = 15
 
-# Known delisted/suspended stocks to skip (updated periodically)
-DELISTED_STOCKS = {
-    'NCKL', 'MTMH', 'ZONE', 'MAIN', 'CRAB', 'BIMA', 'KBLM', 'SQMI',
-    'PNSE', 'TRAM', 'WOMF', 'KARW', 'SRTG', 'CPGT', 'KOBX', 'MITI',
-    # Add more as discovered
-}
+# Failed lookups (price None) are retried sooner
+NEGATIVE_TTL_MINUTES = 5
 
 
 def normalize_stock_code(stock_code: str) -> str:
@@ -86,7 +87,7 @@ def get_idx_stock_list() -> List[str]:
         unique_stocks = list(set(all_stocks))
         
         # Filter out delisted stocks
-        active_stocks = [s for s in unique_stocks if s not in DELISTED_STOCKS]
+        active_stocks = delisted_registry.filter_active(unique_stocks)
         
         delisted_count = len(unique_stocks) - len(active_stocks)
         if delisted_count > 0:
@@ -106,60 +107,168 @@ def get_idx_stock_list() -> List[str]:
         ]
 
 
-def load_cache() -> Optional[Dict]:
-    """Load price cache from JSON file"""
-    try:
-        if not os.path.exists(CACHE_FILE):
-            return None
-        
-        with open(CACHE_FILE, 'r') as f:
-            cache = json.load(f)
-        
-        # Check if cache is still valid (within TTL)
-        last_updated = datetime.fromisoformat(cache.get('last_updated', ''))
+class PriceCache:
+    """
+    Price cache where every entry carries its own fetch time and TTL.
+
+    Memory tier in front of CACHE_FILE: the file is read once per process
+    and rewritten (atomically) only after new prices were fetched.
+    Entry format: {'price': float|None, 'fetched_at': ISO time, 'ttl_minutes': int}
+    """
+
+    def __init__(self, cache_file: str = CACHE_FILE):
+        self.cache_file = cache_file
+        self.entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self):
+        if self.entries is not None:
+            return
+
+        self.entries = {}
+        if not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+
+            if 'entries' in cache:
+                self.entries = cache['entries']
+            else:
+                # Old format: one global timestamp for all prices
+                fetched_at = cache.get('last_updated') or datetime.min.isoformat()
+                self.entries = {
+                    code: {'price': price, 'fetched_at': fetched_at, 'ttl_minutes': CACHE_TTL_MINUTES}
+                    for code, price in cache.get('prices', {}).items()
+                }
+
+            print(f"Price cache loaded ({len(self.entries)} entries)")
+        except Exception as e:
+            print(f"Error loading cache: {e}")
+
+    @staticmethod
+    def _is_fresh(entry: Dict[str, Any], now: datetime) -> bool:
+        try:
+            fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return now - fetched_at <= timedelta(minutes=entry.get('ttl_minutes', CACHE_TTL_MINUTES))
+
+    def get_fresh(self, stock_codes: List[str]) -> Dict[str, Optional[float]]:
+        """Prices of codes whose entry is still within its TTL"""
         now = datetime.now()
-        
-        if now - last_updated > timedelta(minutes=CACHE_TTL_MINUTES):
-            print(f"Cache expired (last updated: {last_updated})")
-            return None
-        
-        print(f"Cache loaded ({len(cache.get('prices', {}))} stocks, age: {(now - last_updated).seconds // 60} minutes)")
-        return cache
-    
-    except Exception as e:
-        print(f"Error loading cache: {e}")
+        fresh = {}
+
+        with self.lock:
+            self._ensure_loaded()
+            for code in stock_codes:
+                entry = self.entries.get(code)
+                if entry and self._is_fresh(entry, now):
+                    fresh[code] = entry['price']
+
+            self.hits += len(fresh)
+            self.misses += len(stock_codes) - len(fresh)
+
+        return fresh
+
+    def set_many(self, prices: Dict[str, Optional[float]], ttl_minutes: Optional[int] = None):
+        """Store freshly fetched prices and persist once"""
+        if not prices:
+            return
+
+        fetched_at = datetime.now().isoformat()
+
+        with self.lock:
+            self._ensure_loaded()
+            for code, price in prices.items():
+                ttl = ttl_minutes or (CACHE_TTL_MINUTES if price is not None else NEGATIVE_TTL_MINUTES)
+                self.entries[code] = {'price': price, 'fetched_at': fetched_at, 'ttl_minutes': ttl}
+            self._save()
+
+    def _save(self):
+        """Atomically write all entries (readers never see a half-written file)"""
+        try:
+            cache = {
+                'last_updated': datetime.now().isoformat(),
+                'total_stocks': len(self.entries),
+                'entries': self.entries
+            }
+
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving cache: {e}")
+
+    def oldest_age_minutes(self) -> int:
+        """Age of the oldest entry in minutes (999 if empty)"""
+        with self.lock:
+            self._ensure_loaded()
+            if not self.entries:
+                return 999
+
+            now = datetime.now()
+            ages = []
+            for entry in self.entries.values():
+                try:
+                    ages.append((now - datetime.fromisoformat(entry['fetched_at'])).total_seconds() // 60)
+                except (KeyError, TypeError, ValueError):
+                    return 999
+            return int(max(ages))
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = datetime.now()
+        with self.lock:
+            self._ensure_loaded()
+            fresh = sum(1 for entry in self.entries.values() if self._is_fresh(entry, now))
+            return {
+                'total_entries': len(self.entries),
+                'fresh_entries': fresh,
+                'stale_entries': len(self.entries) - fresh,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Global price cache instance
+price_cache = PriceCache()
+
+
+def load_cache() -> Optional[Dict]:
+    """Fresh cached prices as {'prices': {...}} (None if nothing is fresh)"""
+    with price_cache.lock:
+        price_cache._ensure_loaded()
+        codes = list(price_cache.entries.keys())
+
+    prices = price_cache.get_fresh(codes)
+    if not prices:
         return None
 
+    return {'prices': prices}
+
 
 def save_cache(prices: Dict[str, Optional[float]]):
-    """Save price cache to JSON file"""
-    try:
-        cache = {
-            'last_updated': datetime.now().isoformat(),
-            'ttl_minutes': CACHE_TTL_MINUTES,
-            'total_stocks': len(prices),
-            'prices': prices
-        }
-        
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache, f, indent=2)
-        
-        print(f"Cache saved: {len(prices)} stocks")
-    
-    except Exception as e:
-        print(f"Error saving cache: {e}")
+    """Store fetched prices (each entry gets its own timestamp)"""
+    price_cache.set_many(prices)
+    print(f"Cache saved: {len(prices)} stocks")
 
 
-def fetch_single_price(stock_code: str, retry_count: int = 0) -> Optional[float]:
+@coalesce("yfinance", "price")
+def fetch_single_price(stock_code: str) -> Optional[float]:
     """
-    Fetch single stock price with retry logic and delisted stock handling.
+    Fetch single stock price with delisted stock handling.
     Normalizes stock code to handle warrants and rights issues.
+    Rate limiting and 429 retries are handled by the shared yf_limiter.
     """
     # Normalize stock code (remove -W, rights suffixes, etc.)
     normalized_code = normalize_stock_code(stock_code)
     
     # Skip known delisted stocks
-    if normalized_code in DELISTED_STOCKS:
+    if delisted_registry.is_blocked(normalized_code):
         return None
     
     try:
@@ -167,52 +276,60 @@ def fetch_single_price(stock_code: str, retry_count: int = 0) -> Optional[float]
         stock = yf.Ticker(ticker_symbol)
         
         # Try to get current price
-        info = stock.info
+        info = yf_limiter.call(lambda: stock.info)
         current_price = info.get('currentPrice') or info.get('regularMarketPrice')
         
         if current_price:
+            delisted_registry.mark_success(normalized_code)
             return float(current_price)
         
         # Fallback: try history
-        hist = stock.history(period='1d')
+        hist = yf_limiter.call(stock.history, period='1d')
         if not hist.empty:
+            delisted_registry.mark_success(normalized_code)
             return float(hist['Close'].iloc[-1])
         
+        delisted_registry.mark_failed(normalized_code, 'no_price_data')
         return None
     
     except Exception as e:
-        error_msg = str(e)
-        
-        # Check if stock is delisted
-        if 'delisted' in error_msg.lower() or 'not found' in error_msg.lower():
-            # Add to delisted list and skip silently
-            DELISTED_STOCKS.add(normalized_code)
+        # Delisted stocks are recorded and skipped silently
+        if is_delisted_error(e):
+            delisted_registry.mark_failed(normalized_code, 'delisted')
             return None
         
-        # Handle rate limiting
-        if 'Too Many Requests' in error_msg and retry_count < 3:
-            wait_time = (2 ** retry_count) * 5  # 5s, 10s, 20s
-            print(f"Rate limited on {normalized_code}, retrying in {wait_time}s...")
-            time.sleep(wait_time)
-            return fetch_single_price(stock_code, retry_count + 1)
-        
-        # Only print error for non-delisted issues
-        if 'delisted' not in error_msg.lower() and 'not found' not in error_msg.lower():
-            print(f"Error fetching {normalized_code}: {e}")
-        
+        print(f"Error fetching {normalized_code}: {e}")
         return None
 
 
-def fetch_all_prices(stock_codes: List[str], max_workers: int = 5) -> Dict[str, Optional[float]]:
+def fetch_all_prices(stock_codes: List[str], max_workers: int = 5, bulk: bool = True) -> Dict[str, Optional[float]]:
     """
     Fetch prices for all stocks with rate limiting protection
     Uses smaller max_workers to avoid rate limiting
+    
+    With bulk=True prices come from batched yf.download bars (hundreds of
+    tickers per request); only tickers missing there use Ticker.info
     """
     prices = {}
     total = len(stock_codes)
     completed = 0
     
-    print(f"Fetching prices for {total} stocks (max {max_workers} concurrent)...")
+    if bulk and stock_codes:
+        normalized = {code: normalize_stock_code(code) for code in stock_codes}
+        active = set(delisted_registry.filter_active(set(normalized.values())))
+        quotes = fetch_bulk_quotes(sorted(active))
+        
+        for code in stock_codes:
+            quote = quotes.get(normalized[code])
+            if quote:
+                prices[code] = quote['current_price']
+            elif normalized[code] not in active:
+                prices[code] = None
+        
+        stock_codes = [code for code in stock_codes if code not in prices]
+        completed = len(prices)
+    
+    print(f"Fetching prices for {len(stock_codes)} stocks (max {max_workers} concurrent)...")
     
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_stock = {
@@ -252,31 +369,18 @@ def get_price(stock_code: str, force_refresh: bool = False) -> Optional[float]:
         Current stock price or None
     """
     # Skip delisted stocks
-    if stock_code in DELISTED_STOCKS:
+    if delisted_registry.is_blocked(normalize_stock_code(stock_code)):
         return None
     
-    # Load cache
     if not force_refresh:
-        cache = load_cache()
-        if cache and stock_code in cache.get('prices', {}):
-            return cache['prices'][stock_code]
+        cached = price_cache.get_fresh([stock_code])
+        if stock_code in cached:
+            return cached[stock_code]
     
-    # Cache miss or expired - fetch individual stock
+    # Entry missing or expired - fetch this stock only
     print(f"Fetching {stock_code} from API...")
     price = fetch_single_price(stock_code)
-    
-    # Update cache with new price
-    cache = load_cache()
-    if cache and cache.get('prices'):
-        cache['prices'][stock_code] = price
-    else:
-        cache = {
-            'prices': {stock_code: price},
-            'last_updated': datetime.now().isoformat(),
-            'ttl_minutes': CACHE_TTL_MINUTES
-        }
-    
-    save_cache(cache['prices'])
+    price_cache.set_many({stock_code: price})
     
     return price
 
@@ -304,7 +408,7 @@ def refresh_cache(stock_codes: Optional[List[str]] = None) -> Dict[str, Optional
 def get_multiple_prices(stock_codes: List[str]) -> Dict[str, Optional[float]]:
     """
     Get prices for multiple stocks using incremental caching.
-    Only fetches prices for stocks not in cache or if cache is expired.
+    Only fetches stocks whose cache entry is missing or past its TTL.
     
     Args:
         stock_codes: List of stock codes from broker data
@@ -312,62 +416,29 @@ def get_multiple_prices(stock_codes: List[str]) -> Dict[str, Optional[float]]:
     Returns:
         Dictionary mapping stock codes to prices
     """
-    # Load existing cache
-    cache = load_cache()
-    
-    prices = {}
-    missing_stocks = []
+    active_codes = delisted_registry.filter_active(stock_codes)
+    prices = {code: None for code in set(stock_codes) - set(active_codes)}
     
-    # Check which stocks are in valid cache
-    if cache and cache.get('prices'):
-        cached_prices = cache['prices']
-        
-        for code in stock_codes:
-            # Skip delisted stocks
-            if code in DELISTED_STOCKS:
-                prices[code] = None
-                continue
-            
-            # Use cached price if available
-            if code in cached_prices:
-                prices[code] = cached_prices[code]
-            else:
-                missing_stocks.append(code)
-    else:
-        # No valid cache, need to fetch all
-        missing_stocks = [s for s in stock_codes if s not in DELISTED_STOCKS]
+    prices.update(price_cache.get_fresh(active_codes))
+    stale_stocks = [code for code in active_codes if code not in prices]
     
-    # Fetch only missing stocks
-    if missing_stocks:
-        print(f"Cache miss for {len(missing_stocks)} stocks, fetching from API...")
-        new_prices = fetch_all_prices(missing_stocks, max_workers=5)
-        
-        # Merge with existing prices
+    # Fetch only stale/missing stocks
+    if stale_stocks:
+        print(f"Cache miss for {len(stale_stocks)} stocks, fetching from API...")
+        new_prices = fetch_all_prices(stale_stocks, max_workers=5)
         prices.update(new_prices)
-        
-        # Update cache with new prices
-        if cache and cache.get('prices'):
-            cache['prices'].update(new_prices)
-        else:
-            cache = {'prices': new_prices}
-        
-        cache['last_updated'] = datetime.now().isoformat()
-        cache['ttl_minutes'] = CACHE_TTL_MINUTES
-        save_cache(cache.get('prices', {}))
+        price_cache.set_many(new_prices)
     else:
-        print(f"All {len(stock_codes)} stocks found in cache (age: {get_cache_age(cache)} minutes)")
+        print(f"All {len(stock_codes)} stocks found in cache (age: {get_cache_age()} minutes)")
     
     return prices
 
 
-def get_cache_age(cache: Optional[Dict]) -> int:
-    """Get cache age in minutes"""
-    if not cache or 'last_updated' not in cache:
-        return 999
-    
-    try:
-        last_updated = datetime.fromisoformat(cache['last_updated'])
-        age = (datetime.now() - last_updated).seconds // 60
-        return age
-    except:
-        return 999
+def get_cache_age(cache: Optional[Dict] = None) -> int:
+    """Get age of the oldest cached entry in minutes"""
+    return price_cache.oldest_age_minutes()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get price cache statistics"""
+    return price_cache.get_stats()
@@ -0,0 +1,162 @@
+"""
+Reload Planner for Master Data
+Freshness-aware delta reloads: skip recently updated stocks, fetch the
+stalest and most-requested first, and checkpoint progress so an
+interrupted reload resumes where it stopped. A checkpoint belongs to one
+requested code set, so only a rerun of the same request resumes (or clears) it.
+"""
+
+import hashlib
+import math
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from api.service_stock.master_data.store import master_data_store
+
+
+# Stocks updated within this window are skipped by a reload
+DEFAULT_FRESH_MINUTES = {
+    'technical': 60,
+    'fundamental': 24 * 60,
+}
+
+# Request counts not yet written to the store
+_pending_requests: Counter = Counter()
+_pending_lock = threading.Lock()
+
+
+def record_stock_requests(stock_codes: List[str]):
+    """Count on-demand requests per stock (cheap, flushed when a reload is planned)"""
+    with _pending_lock:
+        _pending_requests.update(code for code in stock_codes if code)
+
+
+def flush_request_counts():
+    """Persist pending request counts"""
+    with _pending_lock:
+        counts = dict(_pending_requests)
+        _pending_requests.clear()
+
+    try:
+        master_data_store.add_request_counts(counts)
+    except Exception as e:
+        print(f"Error saving request counts: {e}")
+        with _pending_lock:
+            _pending_requests.update(counts)
+
+
+def get_request_counts() -> Dict[str, int]:
+    """Persisted plus pending request counts per stock"""
+    flush_request_counts()
+    return master_data_store.get_request_counts()
+
+
+def _age_minutes(entry: Optional[Dict[str, Any]], now: datetime) -> float:
+    """Minutes since the stock was last updated (inf if never)"""
+    if not entry or not entry.get('last_updated'):
+        return math.inf
+    try:
+        return (now - datetime.fromisoformat(entry['last_updated'])).total_seconds() / 60
+    except (TypeError, ValueError):
+        return math.inf
+
+
+def checkpoint_key(dataset: str, stock_codes: List[str]) -> str:
+    """Checkpoint key of a dataset + requested code set (order and duplicates ignored)"""
+    digest = hashlib.sha1("\n".join(sorted(set(stock_codes))).encode()).hexdigest()[:16]
+    return f"{dataset}:{digest}"
+
+
+def plan_reload(
+    dataset: str,
+    stock_codes: List[str],
+    existing_stocks: Dict[str, Dict[str, Any]],
+    fresh_minutes: Optional[int] = None,
+    resume: bool = True
+) -> Dict[str, Any]:
+    """
+    Decide which stocks a reload fetches and in which order.
+
+    Args:
+        dataset: 'technical' or 'fundamental'
+        stock_codes: Requested stock codes
+        existing_stocks: Current master data entries (for last_updated)
+        fresh_minutes: Skip stocks updated within this window (None = dataset default, 0 = refetch all)
+        resume: Continue an interrupted reload of the same code set from its checkpoint
+
+    Returns:
+        {'codes': ordered codes to fetch, 'skipped': fresh codes, 'resumed': bool,
+         'checkpoint': key to save/clear this run's checkpoint under}
+    """
+    if fresh_minutes is None:
+        fresh_minutes = DEFAULT_FRESH_MINUTES.get(dataset, 60)
+
+    requested = list(dict.fromkeys(stock_codes))
+    resumed = False
+    key = checkpoint_key(dataset, requested)
+
+    checkpoint = master_data_store.load_checkpoint(key) if resume else None
+    if checkpoint and checkpoint.get('pending'):
+        requested_set = set(requested)
+        pending = [code for code in checkpoint['pending'] if code in requested_set]
+        if pending:
+            print(f"Resuming {dataset} reload from checkpoint: {len(pending)} stocks pending")
+            requested = pending
+            resumed = True
+
+    now = datetime.now()
+    request_counts = get_request_counts()
+
+    to_fetch = []
+    skipped = []
+    for code in requested:
+        age = _age_minutes(existing_stocks.get(code), now)
+        if fresh_minutes and age < fresh_minutes:
+            skipped.append(code)
+        else:
+            to_fetch.append((code, age))
+
+    # Never-fetched first, then stalest weighted by how often the stock is requested
+    def priority(item):
+        code, age = item
+        if math.isinf(age):
+            return (0, -request_counts.get(code, 0), code)
+        return (1, -age * (1 + math.log1p(request_counts.get(code, 0))), code)
+
+    to_fetch.sort(key=priority)
+
+    return {
+        'codes': [code for code, _ in to_fetch],
+        'skipped': skipped,
+        'resumed': resumed,
+        'checkpoint': key
+    }
+
+
+def save_checkpoint(key: str, pending: List[str], stats: Dict[str, Any]):
+    """Record remaining stocks after a committed batch (key from plan_reload)"""
+    try:
+        master_data_store.save_checkpoint(key, {
+            'pending': pending,
+            'updated_at': datetime.now().isoformat(),
+            **stats
+        })
+    except Exception as e:
+        print(f"Error saving reload checkpoint {key}: {e}")
+
+
+def clear_checkpoint(key: str):
+    try:
+        master_data_store.clear_checkpoint(key)
+    except Exception as e:
+        print(f"Error clearing reload checkpoint {key}: {e}")
+
+
+def get_checkpoint(dataset: str) -> List[Dict[str, Any]]:
+    """Open checkpoints of a dataset (one per interrupted code set)"""
+    return [
+        {'key': key, **data}
+        for key, data in master_data_store.list_checkpoints(f"{dataset}:").items()
+    ]
@@ -0,0 +1,67 @@
+"""
+In-Process Master Data Repository
+Keeps parsed master data in memory and reloads only when the backing store changes
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class MasterDataRepository:
+    """
+    Process-wide cache of one master data document ({'last_updated', 'stocks'}).
+
+    - get(): parsed document, reloaded only when version() changes
+    - get_stock(): O(1) per-code lookup
+
+    The cached document is shared: callers must treat it as read-only.
+    """
+
+    def __init__(self, name: str, load: Callable[[], Dict[str, Any]], version: Callable[[], Any]):
+        self.name = name
+        self._load = load
+        self._version = version
+        self._data: Optional[Dict[str, Any]] = None
+        self._loaded_version: Any = None
+        self._lock = threading.Lock()
+
+        self.reloads = 0
+        self.hits = 0
+
+    def get(self) -> Dict[str, Any]:
+        """Current document (reparsed only if the source changed)"""
+        current_version = self._version()
+
+        data = self._data
+        if data is not None and current_version == self._loaded_version:
+            self.hits += 1
+            return data
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if self._data is not None and current_version == self._loaded_version:
+                self.hits += 1
+                return self._data
+
+            self._data = self._load()
+            self._loaded_version = current_version
+            self.reloads += 1
+            print(f"{self.name} master data loaded: {len(self._data.get('stocks', {}))} stocks")
+            return self._data
+
+    def get_stock(self, stock_code: str) -> Optional[Dict[str, Any]]:
+        """Single stock entry or None"""
+        return self.get().get('stocks', {}).get(stock_code)
+
+    def invalidate(self):
+        """Force a reload on next access"""
+        with self._lock:
+            self._data = None
+            self._loaded_version = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'loaded': self._data is not None,
+            'reloads': self.reloads,
+            'hits': self.hits
+        }
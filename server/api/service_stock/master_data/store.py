@@ -0,0 +1,284 @@
+"""
+Master Data Storage Engine
+Embedded SQLite (WAL mode) with per-stock upserts and one transaction per batch.
+Replaces whole-file JSON rewrites; existing JSON files are imported on first use.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+# Single database for all master data datasets (technical, fundamental)
+STORE_FILE = Path(__file__).parent.parent.parent / "data" / "master_data.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stocks (
+    dataset TEXT NOT NULL,
+    code TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (dataset, code)
+);
+CREATE TABLE IF NOT EXISTS datasets (
+    dataset TEXT PRIMARY KEY,
+    last_updated TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stock_requests (
+    code TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    last_requested TEXT
+);
+CREATE TABLE IF NOT EXISTS reload_checkpoints (
+    dataset TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS negative_cache (
+    code TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    retry_after TEXT NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 1
+);
+"""
+
+
+class MasterDataStore:
+    """
+    SQLite-backed store for master data documents.
+
+    - WAL mode: readers never block on (or observe) an in-progress batch
+    - upsert(): per-stock INSERT ... ON CONFLICT, committed atomically per call
+    - version(): bumped on every commit, used by the in-memory repository
+    - JSON sources are migrated once when a dataset is first touched
+    """
+
+    def __init__(self, db_path: Path = STORE_FILE):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._json_sources: Dict[str, Path] = {}
+        self._ready: set = set()
+        self._ready_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def register_json_source(self, dataset: str, json_path: Path):
+        """Legacy JSON file to import the first time a dataset is used"""
+        self._json_sources[dataset] = json_path
+
+    def _ensure_dataset(self, dataset: str):
+        if dataset in self._ready:
+            return
+
+        with self._ready_lock:
+            if dataset in self._ready:
+                return
+
+            conn = self._connect()
+            row = conn.execute("SELECT 1 FROM datasets WHERE dataset = ?", (dataset,)).fetchone()
+            if row is None:
+                self._migrate_json(dataset)
+            self._ready.add(dataset)
+
+    def _migrate_json(self, dataset: str):
+        """Import a legacy JSON document ({'last_updated', 'stocks'}) in one transaction"""
+        json_path = self._json_sources.get(dataset)
+        document = {'last_updated': None, 'stocks': {}}
+
+        if json_path and json_path.exists():
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    document = json.load(f)
+            except Exception as e:
+                print(f"Error reading {json_path.name} for migration: {e}")
+
+        stocks = document.get('stocks', {})
+        self._write(dataset, stocks, document.get('last_updated'))
+        if stocks:
+            print(f"Migrated {len(stocks)} {dataset} stocks from {json_path.name} to {self.db_path.name}")
+
+    def _write(self, dataset: str, entries: Dict[str, Dict[str, Any]], last_updated: Optional[str]):
+        now = datetime.now().isoformat()
+        rows = [
+            (dataset, code, json.dumps(entry, ensure_ascii=False), now)
+            for code, entry in entries.items()
+        ]
+
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO stocks (dataset, code, data, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(dataset, code) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+                    """,
+                    rows
+                )
+                conn.execute(
+                    """
+                    INSERT INTO datasets (dataset, last_updated, version) VALUES (?, ?, 1)
+                    ON CONFLICT(dataset) DO UPDATE SET last_updated = excluded.last_updated, version = version + 1
+                    """,
+                    (dataset, last_updated)
+                )
+
+    def upsert(self, dataset: str, entries: Dict[str, Dict[str, Any]], last_updated: Optional[str] = None):
+        """Insert or replace stocks and mark the dataset updated, atomically"""
+        self._ensure_dataset(dataset)
+        self._write(dataset, entries, last_updated or datetime.now().isoformat())
+
+    def load(self, dataset: str) -> Dict[str, Any]:
+        """Whole dataset as {'last_updated', 'stocks'} (same shape as the old JSON)"""
+        self._ensure_dataset(dataset)
+        conn = self._connect()
+
+        # Single read transaction so rows and last_updated come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            meta = conn.execute("SELECT last_updated FROM datasets WHERE dataset = ?", (dataset,)).fetchone()
+            rows = conn.execute("SELECT code, data FROM stocks WHERE dataset = ?", (dataset,)).fetchall()
+        finally:
+            conn.commit()
+
+        return {
+            'last_updated': meta[0] if meta else None,
+            'stocks': {code: json.loads(data) for code, data in rows}
+        }
+
+    def get(self, dataset: str, code: str) -> Optional[Dict[str, Any]]:
+        """Single stock entry or None"""
+        self._ensure_dataset(dataset)
+        row = self._connect().execute(
+            "SELECT data FROM stocks WHERE dataset = ? AND code = ?", (dataset, code)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def version(self, dataset: str) -> int:
+        """Commit counter for a dataset (changes on every upsert, from any process)"""
+        self._ensure_dataset(dataset)
+        row = self._connect().execute("SELECT version FROM datasets WHERE dataset = ?", (dataset,)).fetchone()
+        return row[0] if row else 0
+
+    # ---------- Request counts (reload priority) ----------
+
+    def add_request_counts(self, counts: Dict[str, int]):
+        """Add per-stock request counts in one transaction"""
+        if not counts:
+            return
+
+        now = datetime.now().isoformat()
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO stock_requests (code, count, last_requested) VALUES (?, ?, ?)
+                    ON CONFLICT(code) DO UPDATE SET count = count + excluded.count, last_requested = excluded.last_requested
+                    """,
+                    [(code, count, now) for code, count in counts.items()]
+                )
+
+    def get_request_counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT code, count FROM stock_requests").fetchall()
+        return {code: count for code, count in rows}
+
+    # ---------- Reload checkpoints ----------
+    # Keyed by "<dataset>:<code set hash>" (see reload_planner.checkpoint_key)
+
+    def save_checkpoint(self, key: str, data: Dict[str, Any]):
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO reload_checkpoints (dataset, data, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(dataset) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+                    """,
+                    (key, json.dumps(data), datetime.now().isoformat())
+                )
+
+    def load_checkpoint(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM reload_checkpoints WHERE dataset = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_checkpoints(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT dataset, data FROM reload_checkpoints WHERE substr(dataset, 1, ?) = ? ORDER BY updated_at DESC",
+            (len(prefix), prefix)
+        ).fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    def clear_checkpoint(self, key: str):
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM reload_checkpoints WHERE dataset = ?", (key,))
+
+    # ---------- Negative cache (delisted / unfetchable tickers) ----------
+
+    NEGATIVE_COLUMNS = ('code', 'reason', 'first_seen', 'last_seen', 'retry_after', 'failures')
+
+    def load_negative(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute(
+            f"SELECT {', '.join(self.NEGATIVE_COLUMNS)} FROM negative_cache"
+        ).fetchall()
+        return {row[0]: dict(zip(self.NEGATIVE_COLUMNS, row)) for row in rows}
+
+    def seed_negative(self, entries: Dict[str, Dict[str, Any]]) -> bool:
+        """Insert initial entries once per database (cleared entries are not re-seeded)"""
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                if conn.execute("SELECT 1 FROM datasets WHERE dataset = 'negative_cache'").fetchone():
+                    return False
+                conn.executemany(
+                    "INSERT OR IGNORE INTO negative_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    [tuple(entry[column] for column in self.NEGATIVE_COLUMNS) for entry in entries.values()]
+                )
+                conn.execute(
+                    "INSERT INTO datasets (dataset, last_updated, version) VALUES ('negative_cache', ?, 1)",
+                    (datetime.now().isoformat(),)
+                )
+        return True
+
+    def upsert_negative(self, entry: Dict[str, Any]):
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO negative_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    tuple(entry[column] for column in self.NEGATIVE_COLUMNS)
+                )
+
+    def delete_negative(self, codes: Optional[List[str]] = None):
+        """Delete entries for codes, or all entries"""
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                if codes is None:
+                    conn.execute("DELETE FROM negative_cache")
+                else:
+                    conn.executemany("DELETE FROM negative_cache WHERE code = ?", [(code,) for code in codes])
+
+
+# Global store instance
+master_data_store = MasterDataStore()
@@ -1,53 +1,60 @@
 """
 Master Data Loader for Technical Stock Data
-Loads from JSON cache with fallback to yfinance
+Backed by the SQLite master data store (migrated from the JSON cache).
+Parsed data is kept in memory and reloaded only when the store changes.
 """
 
-import json
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Any
 import time
 
-# Path to technical data JSON
+from api.service_stock.master_data.repository import MasterDataRepository
+from api.service_stock.master_data.store import master_data_store
+
+# Legacy technical data JSON (imported into the store on first use)
 TECHNICAL_DATA_FILE = Path(__file__).parent.parent.parent / "data" / "stock_technical_data.json"
 
 # Cache TTL: 24 hours for technical data
 CACHE_TTL_HOURS = 24
 
+DATASET = "technical"
+master_data_store.register_json_source(DATASET, TECHNICAL_DATA_FILE)
+
+# Process-wide repository (reloads only when the store version changes)
+technical_repository = MasterDataRepository(
+    "Technical", lambda: master_data_store.load(DATASET), lambda: master_data_store.version(DATASET)
+)
+
 
 def load_technical_data() -> Dict[str, Any]:
-    """Load technical data from JSON file"""
-    if not TECHNICAL_DATA_FILE.exists():
-        return {
-            'last_updated': None,
-            'stocks': {}
-        }
-    
-    try:
-        with open(TECHNICAL_DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading technical data: {e}")
-        return {
-            'last_updated': None,
-            'stocks': {}
-        }
+    """
+    Load technical data (served from memory unless the store changed).
+    Returns a copy whose 'stocks' dict can be modified and passed to save_technical_data.
+    """
+    data = dict(technical_repository.get())
+    data['stocks'] = dict(data.get('stocks', {}))
+    return data
 
 
 def save_technical_data(data: Dict[str, Any]):
-    """Save technical data to JSON file"""
+    """Upsert every stock in a technical data document"""
+    data['last_updated'] = datetime.now().isoformat()
+    upsert_technical_data(data.get('stocks', {}), data['last_updated'])
+
+
+def upsert_technical_data(entries: Dict[str, Dict[str, Any]], last_updated: Optional[str] = None) -> bool:
+    """Insert or replace technical data for the given stocks in one atomic commit; False if the commit failed"""
+    if not entries:
+        return True
+
     try:
-        TECHNICAL_DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-        
-        data['last_updated'] = datetime.now().isoformat()
-        
-        with open(TECHNICAL_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        print(f"Technical data saved: {len(data.get('stocks', {}))} stocks")
+        master_data_store.upsert(DATASET, entries, last_updated)
+        print(f"Technical data saved: {len(entries)} stocks upserted")
+        return True
     except Exception as e:
         print(f"Error saving technical data: {e}")
+        return False
 
 
 def get_stock_technical_data(stock_code: str) -> Optional[Dict[str, Any]]:
@@ -55,8 +62,7 @@ def get_stock_technical_data(stock_code: str) -> Optional[Dict[str, Any]]:
     Get technical data for a single stock
     Returns None if not found
     """
-    data = load_technical_data()
-    return data.get('stocks', {}).get(stock_code)
+    return technical_repository.get_stock(stock_code)
 
 
 def get_current_price(stock_code: str) -> Optional[float]:
@@ -77,7 +83,7 @@ def get_multiple_prices(stock_codes: List[str]) -> Dict[str, Optional[float]]:
     Returns:
         Dictionary mapping stock codes to prices
     """
-    data = load_technical_data()
+    data = technical_repository.get()
     prices = {}
     
     for code in stock_codes:
@@ -92,7 +98,7 @@ def get_multiple_prices(stock_codes: List[str]) -> Dict[str, Optional[float]]:
 
 def is_data_stale(hours: int = CACHE_TTL_HOURS) -> bool:
     """Check if technical data is stale"""
-    data = load_technical_data()
+    data = technical_repository.get()
     
     if not data.get('last_updated'):
         return True
@@ -107,7 +113,7 @@ def is_data_stale(hours: int = CACHE_TTL_HOURS) -> bool:
 
 def get_data_age() -> Optional[str]:
     """Get human-readable age of technical data"""
-    data = load_technical_data()
+    data = technical_repository.get()
     
     if not data.get('last_updated'):
         return None
@@ -128,9 +134,19 @@ def get_data_age() -> Optional[str]:
         return None
 
 
+def get_version() -> int:
+    """Store commit counter of the technical dataset (changes on every write)"""
+    return master_data_store.version(DATASET)
+
+
+def get_stats_version() -> tuple:
+    """Changes whenever get_stats() would: a write, or the age label / staleness rolling over"""
+    return (get_version(), get_data_age(), is_data_stale())
+
+
 def get_stats() -> Dict[str, Any]:
     """Get statistics about technical data"""
-    data = load_technical_data()
+    data = technical_repository.get()
     
     return {
         'total_stocks': len(data.get('stocks', {})),
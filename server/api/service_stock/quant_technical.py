@@ -1,22 +1,28 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+from api.service_stock.master_data import get_price_history
 
 def calculate_quant_metrics(stock_list: list):
+    if not stock_list:
+        return []
+
+    data = get_price_history(stock_list)
+    if data is None:
+        return []
+
+    return analyze_quant_history(data, stock_list)
+
+
+def analyze_quant_history(data: pd.DataFrame, stock_list: list):
+    """
+    Compute quant metrics from downloaded history (CPU-bound, picklable
+    so it can run on the process pool)
+    """
     results = []
     tickers = [f"{s}.JK" for s in stock_list]
     
     market_ticker = "^JKSE"
     all_tickers = tickers + [market_ticker]
-    
-    if not tickers:
-        return []
-
-    try:
-        data = yf.download(tickers, period="1y", group_by='ticker', progress=False)
-    except Exception as e:
-        print(f"Error fetching yfinance: {e}")
-        return []
 
     for stock in stock_list:
         try:
@@ -48,12 +54,6 @@ def calculate_quant_metrics(stock_list: list):
             # Handle std 0 agar tidak error division
             df['z_score'] = np.where(df['std'] == 0, 0, (df['Close'] - df['mean']) / df['std'])
             current_z = round(float(df['z_score'].iloc[-1]), 2)
-            
-            z_status = "Normal"
-            if current_z > 2.0: z_status = "Statistically Expensive (Sell Zone)"
-            elif current_z > 1.0: z_status = "Slightly Expensive"
-            elif current_z < -2.0: z_status = "Statistically Cheap (Buy Zone)"
-            elif current_z < -1.0: z_status = "Slightly Cheap"
 
             # --- 2. QUANT: ATR / Volatility ---
             df['prev_close'] = df['Close'].shift(1)
@@ -73,14 +73,6 @@ def calculate_quant_metrics(stock_list: list):
             high = float(last_row['High'])
             low = float(last_row['Low'])
             close = float(last_row['Close'])
-            
-            pivot = (high + low + close) / 3
-            r1 = (2 * pivot) - low
-            s1 = (2 * pivot) - high
-            
-            posisi = "Inside Range"
-            if close > r1: posisi = "Breakout Resistance"
-            elif close < s1: posisi = "Breakdown Support"
 
             # --- 4. QUANT: TTM SQUEEZE DETECTION ---
             # Deteksi ketika Bollinger Bands masuk ke dalam Keltner Channel
@@ -101,10 +93,6 @@ def calculate_quant_metrics(stock_list: list):
             # Cek kondisi Squeeze hari ini
             # Squeeze terjadi jika BB Upper < KC Upper DAN BB Lower > KC Lower
             is_squeeze = (bb_upper.iloc[-1] < kc_upper.iloc[-1]) and (bb_lower.iloc[-1] > kc_lower.iloc[-1])
-            
-            squeeze_status = "Normal Volatility"
-            if is_squeeze:
-                squeeze_status = "⚠️ SQUEEZE (Ready to Explode)"
 
             # Ambil data IHSG untuk quant beta, VaR dan KER
             try:
@@ -120,21 +108,46 @@ def calculate_quant_metrics(stock_list: list):
             except:
                 market_returns = pd.Series()
 
-            results.append({
-                "stock": stock,
-                "last_price": int(close),
-                "z_score": current_z,
-                "z_status": z_status,
-                "volatility_atr": int(current_atr),
-                "algo_support_s1": int(s1),
-                "algo_resistance_r1": int(r1),
-                "technical_bias": posisi,
-                # Field Baru Ditambahkan:
-                "volatility_status": squeeze_status
-            })
+            results.append(build_quant_result(stock, high, low, close, current_z, current_atr, is_squeeze))
 
         except Exception as e:
             print(f"Error processing {stock}: {str(e)}")
             continue
 
-    return results
\ No newline at end of file
+    return results
+
+
+def build_quant_result(stock: str, high: float, low: float, close: float,
+                       current_z: float, current_atr: float, is_squeeze: bool):
+    """Turn latest quant values (last bar, Z-Score, ATR, squeeze) into the quant analysis dict"""
+    z_status = "Normal"
+    if current_z > 2.0: z_status = "Statistically Expensive (Sell Zone)"
+    elif current_z > 1.0: z_status = "Slightly Expensive"
+    elif current_z < -2.0: z_status = "Statistically Cheap (Buy Zone)"
+    elif current_z < -1.0: z_status = "Slightly Cheap"
+
+    # Algorithmic S/R (Pivot Points)
+    pivot = (high + low + close) / 3
+    r1 = (2 * pivot) - low
+    s1 = (2 * pivot) - high
+    
+    posisi = "Inside Range"
+    if close > r1: posisi = "Breakout Resistance"
+    elif close < s1: posisi = "Breakdown Support"
+
+    squeeze_status = "Normal Volatility"
+    if is_squeeze:
+        squeeze_status = "⚠️ SQUEEZE (Ready to Explode)"
+
+    return {
+        "stock": stock,
+        "last_price": int(close),
+        "z_score": current_z,
+        "z_status": z_status,
+        "volatility_atr": int(current_atr),
+        "algo_support_s1": int(s1),
+        "algo_resistance_r1": int(r1),
+        "technical_bias": posisi,
+        # Field Baru Ditambahkan:
+        "volatility_status": squeeze_status
+    }
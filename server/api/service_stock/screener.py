@@ -0,0 +1,284 @@
+"""
+Universe Screener
+Evaluates predicates like "z_score < -2 AND squeeze AND ichimoku above cloud"
+across every stock using precomputed indicator snapshots
+"""
+
+import json
+import math
+import operator
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from api.service_stock.indicators import indicator_states, refresh_indicator_states
+from api.service_stock.master_data import get_all_stock_codes
+
+
+# Snapshot rows for the whole universe (rebuilt after each universe refresh)
+SNAPSHOT_FILE = Path(__file__).parent.parent / "data" / "screener_snapshot.json"
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 500
+
+OPERATORS = {
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '=': operator.eq,
+    '<': operator.lt,
+    '>': operator.gt,
+}
+
+# Numeric fields available for comparisons and sorting
+NUMERIC_FIELDS = [
+    'close', 'z_score', 'atr', 'stoch_rsi', 'vwap', 'vwap_distance_pct',
+    'span_a', 'span_b', 'macd', 'macd_signal', 'macd_hist',
+    'obv_slope', 'price_slope', 'volume'
+]
+
+# Boolean fields usable as bare predicates (NOT <field> negates)
+BOOLEAN_FIELDS = [
+    'squeeze', 'above_cloud', 'below_cloud', 'in_cloud',
+    'above_vwap', 'macd_bullish', 'macd_momentum_up',
+    'stoch_oversold', 'stoch_overbought', 'bullish_divergence', 'bearish_divergence'
+]
+
+# Natural phrases mapped to boolean fields
+PHRASES = {
+    'ichimoku above cloud': 'above_cloud',
+    'ichimoku below cloud': 'below_cloud',
+    'ichimoku in cloud': 'in_cloud',
+    'ttm squeeze': 'squeeze',
+    'squeeze on': 'squeeze',
+    'above vwap': 'above_vwap',
+    'below vwap': '!above_vwap',
+    'macd bullish': 'macd_bullish',
+    'macd bearish': '!macd_bullish',
+    'stoch oversold': 'stoch_oversold',
+    'stoch overbought': 'stoch_overbought',
+}
+
+CLAUSE_PATTERN = re.compile(r'^([a-z_]+)\s*(<=|>=|==|!=|=|<|>)\s*(-?\d+(?:\.\d+)?)$')
+
+_snapshot: Optional[Dict[str, Any]] = None
+_snapshot_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def _clean(value: float) -> Optional[float]:
+    """NaN/inf -> None so rows stay JSON-safe"""
+    if value is None or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+def build_snapshot_row(stock: str) -> Optional[Dict[str, Any]]:
+    """Flatten one ticker's indicator state into a screener row"""
+    state = indicator_states.get(stock)
+    if state is None or state.bars < 2:
+        return None
+
+    technical = state.technical(stock)
+    if technical is None:
+        return None
+
+    values = state.technical_values()
+    quant = state.quant_values()
+
+    close = values['last_close']
+    cloud_top = max(values['span_a'], values['span_b'])
+    cloud_bottom = min(values['span_a'], values['span_b'])
+    vwap = values['vwap']
+    stoch = values['stoch']
+
+    return {
+        'stock': stock,
+        'date': state.last_date,
+        'close': _clean(close),
+        'z_score': _clean(quant['z_score']),
+        'atr': _clean(quant['atr']),
+        'stoch_rsi': _clean(stoch),
+        'vwap': _clean(vwap),
+        'vwap_distance_pct': _clean((close - vwap) / vwap * 100) if vwap else None,
+        'span_a': _clean(values['span_a']),
+        'span_b': _clean(values['span_b']),
+        'macd': _clean(values['macd']),
+        'macd_signal': _clean(values['signal']),
+        'macd_hist': _clean(values['last_hist']),
+        'obv_slope': _clean(values['obv_slope']),
+        'price_slope': _clean(values['price_slope']),
+        'volume': _clean(state.volumes[-1]),
+        'squeeze': quant['is_squeeze'],
+        'above_cloud': bool(close > cloud_top),
+        'below_cloud': bool(close < cloud_bottom),
+        'in_cloud': bool(cloud_bottom <= close <= cloud_top),
+        'above_vwap': bool(close > vwap),
+        'macd_bullish': bool(values['macd'] > values['signal']),
+        'macd_momentum_up': bool(values['last_hist'] > values['prev_hist']),
+        'stoch_oversold': bool(stoch < 0.2),
+        'stoch_overbought': bool(stoch > 0.8),
+        'bullish_divergence': bool(values['price_slope'] < 0 and values['obv_slope'] > 0),
+        'bearish_divergence': bool(values['price_slope'] > 0 and values['obv_slope'] < 0),
+        'technical': technical,
+        'quant': state.quant(stock)
+    }
+
+
+def _save_snapshot(snapshot: Dict[str, Any]):
+    SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = SNAPSHOT_FILE.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp_file, SNAPSHOT_FILE)
+
+
+def rebuild_snapshot(stock_codes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Rebuild screener rows from stored indicator states (no network)"""
+    global _snapshot
+
+    codes = stock_codes if stock_codes is not None else indicator_states.codes()
+    rows = []
+    for code in sorted(codes):
+        try:
+            row = build_snapshot_row(code)
+        except Exception as e:
+            print(f"Error building screener row for {code}: {e}")
+            continue
+        if row:
+            rows.append(row)
+
+    snapshot = {
+        'generated_at': datetime.now().isoformat(),
+        'rows': rows
+    }
+    _save_snapshot(snapshot)
+
+    with _snapshot_lock:
+        _snapshot = snapshot
+
+    print(f"Screener snapshot rebuilt: {len(rows)} stocks")
+    return snapshot
+
+
+def get_snapshot() -> Dict[str, Any]:
+    """Current snapshot (memory first, then disk)"""
+    global _snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = {'generated_at': None, 'rows': []}
+            if SNAPSHOT_FILE.exists():
+                try:
+                    with open(SNAPSHOT_FILE, 'r', encoding='utf-8') as f:
+                        _snapshot = json.load(f)
+                except Exception as e:
+                    print(f"Error loading screener snapshot: {e}")
+        return _snapshot
+
+
+def is_refresh_running() -> bool:
+    return _refresh_lock.locked()
+
+
+def refresh_universe(stock_codes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Update OHLCV bars and indicator states for the universe, then rebuild the snapshot.
+    Only new bars are applied per ticker, so daily refreshes are cheap.
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        return {'error': 'Universe refresh already in progress'}
+
+    try:
+        codes = stock_codes or get_all_stock_codes()
+        summary = refresh_indicator_states(codes)
+        snapshot = rebuild_snapshot(codes)
+        summary['snapshot_rows'] = len(snapshot['rows'])
+        return summary
+    finally:
+        _refresh_lock.release()
+
+
+def _compile_clause(clause: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compile one predicate clause into a row -> bool function"""
+    text = ' '.join(clause.lower().split())
+
+    negate = False
+    if text.startswith('not '):
+        negate = True
+        text = text[4:].strip()
+
+    field = PHRASES.get(text, text)
+    if field.startswith('!'):
+        negate = not negate
+        field = field[1:]
+
+    if field in BOOLEAN_FIELDS:
+        return lambda row: bool(row.get(field)) != negate
+
+    match = CLAUSE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Predikat tidak dikenali: '{clause}'")
+
+    field, op, raw_value = match.groups()
+    if field not in NUMERIC_FIELDS:
+        raise ValueError(f"Field tidak dikenali: '{field}'. Field numerik: {', '.join(NUMERIC_FIELDS)}")
+
+    compare = OPERATORS[op]
+    value = float(raw_value)
+
+    def predicate(row: Dict[str, Any]) -> bool:
+        current = row.get(field)
+        return current is not None and compare(current, value) != negate
+
+    return predicate
+
+
+def compile_predicate(where: Optional[str]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Compile an AND-joined predicate, e.g. "z_score < -2 AND squeeze AND ichimoku above cloud".
+    Raises ValueError for unknown fields or malformed clauses.
+    """
+    if not where or not where.strip():
+        return lambda row: True
+
+    clauses = [c for c in re.split(r'\s+and\s+', where.strip(), flags=re.IGNORECASE) if c.strip()]
+    compiled = [_compile_clause(c) for c in clauses]
+    return lambda row: all(predicate(row) for predicate in compiled)
+
+
+def screen(
+    where: Optional[str] = None,
+    sort_by: str = 'z_score',
+    order: str = 'asc',
+    limit: int = DEFAULT_LIMIT
+) -> Dict[str, Any]:
+    """
+    Filter the snapshot and return the top-N rows sorted by a numeric metric.
+    Rows without a value for sort_by are placed last.
+    """
+    if sort_by not in NUMERIC_FIELDS:
+        raise ValueError(f"sort_by tidak dikenali: '{sort_by}'. Field numerik: {', '.join(NUMERIC_FIELDS)}")
+    if order not in ('asc', 'desc'):
+        raise ValueError("order harus 'asc' atau 'desc'")
+
+    predicate = compile_predicate(where)
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    snapshot = get_snapshot()
+    matched = [row for row in snapshot['rows'] if predicate(row)]
+
+    with_value = [row for row in matched if row.get(sort_by) is not None]
+    without_value = [row for row in matched if row.get(sort_by) is None]
+    with_value.sort(key=lambda row: row[sort_by], reverse=(order == 'desc'))
+
+    return {
+        'generated_at': snapshot.get('generated_at'),
+        'universe_size': len(snapshot['rows']),
+        'total_matched': len(matched),
+        'rows': (with_value + without_value)[:limit]
+    }
@@ -1,20 +1,35 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+from api.service_stock.master_data import get_price_history
+from api.service_stock.indicators import compute_technical_panel
 
 def calculate_advanced_technical(stock_list: list):
-    results = []
-    tickers = [f"{s}.JK" for s in stock_list]
-    
-    if not tickers:
+    if not stock_list:
         return []
 
-    try:
-        data = yf.download(tickers, period="1y", group_by='ticker', progress=False)
-    except Exception as e:
-        print(f"Error fetching yfinance: {e}")
+    data = get_price_history(stock_list)
+    if data is None:
         return []
 
+    return analyze_technical_history(data, stock_list)
+
+
+def analyze_technical_history(data: pd.DataFrame, stock_list: list):
+    """
+    Compute technical indicators from downloaded history (CPU-bound, picklable
+    so it can run on the process pool).
+    Uses the vectorized panel engine: all stocks are computed in one pass.
+    """
+    return compute_technical_panel(data, stock_list)
+
+
+def analyze_technical_per_stock(data: pd.DataFrame, stock_list: list):
+    """
+    Reference per-stock implementation of analyze_technical_history.
+    Kept as the parity baseline for the panel engine (see examples/benchmark_technical_engine.py).
+    """
+    results = []
+
     for stock in stock_list:
         try:
             # --- 0. Persiapan Data (KODE LAMA ANDA TETAP SAMA) ---